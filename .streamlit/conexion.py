@@ -1,7 +1,18 @@
+import os
+import sys
+
 import streamlit as st
-import firebase_admin
-from firebase_admin import credentials
-from firebase_admin import firestore
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Este script vive en .streamlit/: se agrega la raíz del proyecto al path para usar el paquete reciclaje
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reciclaje.cargador import leer_pagina  # noqa: E402
+from reciclaje.escritura import documentos_desde_jsonl, escribir_en_lotes, escribir_lote  # noqa: E402
+from reciclaje.memoria import PRESUPUESTO_SESION  # noqa: E402
+
+COLECCION = 'usuarios'
+TAMANOS_PAGINA = (10, 25, 50, 100)
 
 
 # Usamos stcache_resource para inicializar la conexión una sola vez
@@ -10,7 +21,21 @@ def init_firebase_connection():
     """
     Inicializa la conexión con Firebase usando las credenciales
     almacenadas en stsecrets.
+
+    Con la variable de entorno RECICLAJE_FIRESTORE_LOCAL=1 usa, en cambio, el
+    cliente en memoria de reciclaje/firestore_local.py (para pruebas, sin
+    credenciales ni red).
     """
+    if os.environ.get("RECICLAJE_FIRESTORE_LOCAL") == "1":
+        from reciclaje.firestore_local import cliente_por_defecto
+        print("Usando el cliente de Firestore local (en memoria).")
+        return cliente_por_defecto()
+
+    # Firebase se importa aquí (y no arriba) para que la página se pinte antes de pagar su importación
+    import firebase_admin
+    from firebase_admin import credentials
+    from firebase_admin import firestore
+
     try:
         # Intenta obtener la app de Firebase por defecto
         # (para evitar reinicializar si ya existe)
@@ -33,44 +58,76 @@ def init_firebase_connection():
 
 # --- INICIO DE TU APP DE STREAMLIT ---
 
-# 1. Llama a la función para obtener el cliente de Firestore
+# 1. Primero el título (se pinta de inmediato), luego el cliente de Firestore
+st.title("Mi App de Streamlit con Firebase 🔥")
+
 try:
     db = init_firebase_connection()
 
-    st.title("Mi App de Streamlit con Firebase 🔥")
+    # 2. Ejemplo: Leer datos de Firestore, UNA página a la vez
+    # En vez de traer la colección completa en cada rerun, se pide solo la página
+    # visible con un cursor (el último documento de la página anterior). Los
+    # cursores de las páginas ya vistas se guardan en session_state para poder
+    # regresar.
+    st.subheader(f"Datos de mi colección '{COLECCION}':")
 
-    # 2. Ejemplo: Leer datos de Firestore
-    st.subheader("Datos de mi colección 'usuarios':")
+    tam_pagina = st.selectbox("Documentos por página:", TAMANOS_PAGINA, index=1)
+    # Los cursores son documentos completos: si el presupuesto de la sesión los expulsa se vuelve a la página 1
+    if st.session_state.get("tam_pagina") != tam_pagina or "cursores" not in st.session_state:
+        st.session_state.tam_pagina = tam_pagina
+        st.session_state.cursores = [None]  # cursores[i] = último documento antes de la página i
 
-    # Reemplaza 'usuarios' con el nombre de tu colección
-    docs_ref = db.collection('usuarios')
-    docs = docs_ref.stream()
+    cursores = st.session_state.cursores
+    pagina = leer_pagina(db, COLECCION, tam_pagina, despues_de=cursores[-1])
+    if pagina:
+        # Una sola tabla por página en lugar de un st.json por documento
+        st.dataframe([{"id": doc.id, **doc.to_dict()} for doc in pagina], hide_index=True)
+    else:
+        st.info("No hay documentos en esta página.")
 
-    # Itera sobre los documentos y muéstralos
-    for doc in docs:
-        st.write(f"Documento ID: {doc.id}")
-        st.json(doc.to_dict())
-        st.divider()
+    col_anterior, col_pagina, col_siguiente = st.columns(3)
+    col_pagina.caption(f"Página {len(cursores)}")
+    if col_anterior.button("⬅️ Anterior", disabled=len(cursores) == 1):
+        cursores.pop()
+        st.rerun()
+    # Una página incompleta es la última
+    if col_siguiente.button("Siguiente ➡️", disabled=len(pagina) < tam_pagina):
+        cursores.append(pagina[-1])
+        st.rerun()
 
     # 3. Ejemplo: Escribir datos en Firestore
+    # Las escrituras pasan por reciclaje/escritura.py: en lotes (WriteBatch) y con
+    # reintentos con espera exponencial si Firestore responde con un error transitorio.
     st.subheader("Escribir nuevos datos:")
 
     nuevo_nombre = st.text_input("Nombre de usuario:")
     if st.button("Guardar en Firebase"):
         if nuevo_nombre:
-            # Crea un nuevo documento en la colección 'usuarios'
-            doc_ref = db.collection('usuarios').document()
-            doc_ref.set({
+            # Un lote de un solo documento (id automático)
+            escribir_lote(db, COLECCION, [(None, {
                 'nombre': nuevo_nombre,
                 'creado_por': 'Streamlit'
-            })
+            })])
             st.success(f"¡Usuario '{nuevo_nombre}' guardado con éxito!")
             st.balloons()
             # st.rerun() # Opcional: para refrescar la lista de arriba
         else:
             st.warning("Por favor, ingresa un nombre.")
 
+    # 4. Ejemplo: Importación masiva (un documento JSON por línea; "id" es opcional)
+    archivo = st.file_uploader("Importar usuarios desde JSON Lines:", type=["jsonl"])
+    if archivo is not None and st.button("Importar"):
+        lineas = (linea.decode("utf-8") for linea in archivo)
+        informe = escribir_en_lotes(db, COLECCION, documentos_desde_jsonl(lineas))
+        st.success(f"Se importaron {informe.documentos} documentos en {informe.lotes} lotes "
+                   f"({informe.segundos:.1f} s, {informe.reintentos} reintentos).")
+
 except Exception as e:
     st.error("Error al conectar o interactuar con Firebase:")
     st.error(f"Detalle: {e}")
-    st.warning("Asegúrate de haber configurado 'secrets.toml' correctamente.")
\ No newline at end of file
+    st.warning("Asegúrate de haber configurado 'secrets.toml' correctamente.")
+
+# 5. Presupuesto de memoria de la sesión (ver reciclaje/memoria.py)
+contexto = get_script_run_ctx()
+if contexto is not None:
+    PRESUPUESTO_SESION.revisar(contexto.session_id, st.session_state, protegidas={"tam_pagina"})
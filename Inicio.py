@@ -1,8 +1,11 @@
 # Importamos la librería Streamlit, fundamental para crear la interfaz web.
 import streamlit as st
-# Importamos el módulo 'os' para interactuar con el sistema operativo,
-# específicamente para manejar rutas de archivos de forma robusta.
-import os
+# Variantes ligeras (redimensionadas, en JPEG o PNG) de las imágenes de la carpeta 'assets'.
+from reciclaje.recursos import cargar_recursos
+# Perfil de memoria por página (apagado salvo con RECICLAJE_PERFIL_MEMORIA)
+from reciclaje.memoria import PERFIL_MEMORIA
+
+inicio_memoria = PERFIL_MEMORIA.iniciar_rerun()
 
 # --- CONFIGURACIÓN INICIAL DE LA PÁGINA ---
 # Es una buena práctica que st.set_page_config() sea el primer comando de Streamlit.
@@ -26,23 +29,25 @@ GOOGLE_ANALYTICS_SCRIPT= """
 """
 st.markdown(GOOGLE_ANALYTICS_SCRIPT, unsafe_allow_html=True)
 
-# --- GESTIÓN DE RUTAS A RECURSOS (ASSETS) ---
-# Definimos una carpeta base para los recursos gráficos.
-assets_dir = "assets"
-# Usamos os.path.join para construir rutas. Esto asegura que el código sea compatible
-# con diferentes sistemas operativos (Windows usa '\', Linux/macOS usan '/').
-header_image = os.path.join(assets_dir, "photo-1532996122724-e3c354a0b15b.jpeg")
-icon_ubicate = os.path.join(assets_dir, "3477113.png")
-icon_filtra = os.path.join(assets_dir, "3500826.png")
-icon_encuentra = os.path.join(assets_dir, "search_24dp_000000_FILL0_wght400_GRAD0_opsz24.png")
+# --- GESTIÓN DE RECURSOS (ASSETS) ---
+# En vez de los originales (la foto de cabecera pesa ~3.4 MB y st.image la reducía en cada
+# rerun), se usan variantes del tamaño en que se muestran, generadas una vez con `python -m reciclaje.recursos`
+# (ver reciclaje/recursos.py). st.cache_resource las guarda en memoria para todo el
+# proceso: en cada rerun ya no se toca el disco.
+@st.cache_resource
+def obtener_recursos():
+    return cargar_recursos()
+
+
+recursos = obtener_recursos()
 
 # --- SECCIÓN DE ENCABEZADO ---
 # Verificamos si la imagen de cabecera existe antes de intentar mostrarla.
 # Esto previene que la aplicación falle si el archivo no se encuentra.
-if os.path.exists(header_image):
-    # Mostramos la imagen. El argumento 'use_column_width=True' es preferible a un ancho fijo
+if "cabecera" in recursos:
+    # Mostramos la imagen. El argumento width='stretch' es preferible a un ancho fijo
     # para que la imagen se ajuste de forma responsiva al ancho de la columna o página.
-    st.image(header_image, width='stretch')
+    st.image(recursos["cabecera"], width='stretch')
 else:
     # Si la imagen no existe, mostramos una advertencia útil para el desarrollador.
     st.warning("No se encontró la imagen de cabecera en la carpeta 'assets'.")
@@ -60,20 +65,20 @@ col1, col2, col3 = st.columns(3, gap="large")
 # Usamos un bloque 'with' para asignar contenido a cada columna.
 with col1:
     # Verificamos la existencia de cada ícono antes de mostrarlo.
-    if os.path.exists(icon_ubicate):
-        st.image(icon_ubicate, width=100) # Usamos un ancho fijo para íconos pequeños.
+    if "icono_ubicate" in recursos:
+        st.image(recursos["icono_ubicate"], width=100) # Usamos un ancho fijo para íconos pequeños.
     st.subheader("1. Ubícate")
     st.write("Permite el acceso a tu ubicación para encontrar las opciones más cercanas a ti.")
 
 with col2:
-    if os.path.exists(icon_filtra):
-        st.image(icon_filtra, width=100)
+    if "icono_filtra" in recursos:
+        st.image(recursos["icono_filtra"], width=100)
     st.subheader("2. Filtra")
     st.write("Selecciona los materiales específicos que deseas reciclar (plástico, vidrio, etc.).")
 
 with col3:
-    if os.path.exists(icon_encuentra):
-        st.image(icon_encuentra, width=100)
+    if "icono_encuentra" in recursos:
+        st.image(recursos["icono_encuentra"], width=100)
     st.subheader("3. Encuentra")
     st.write("Visualiza los centros en el mapa, ordenados por distancia, y elige el mejor para ti.")
 
@@ -109,4 +114,6 @@ st.sidebar.info(
     - Marquez Mejía Araceli
     - Santillán López Mireya
     """
-)
\ No newline at end of file
+)
+
+PERFIL_MEMORIA.terminar_rerun("Inicio", inicio_memoria)
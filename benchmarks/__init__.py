@@ -0,0 +1 @@
+# Benchmarks del motor de reciclaje. Se ejecutan con: python -m benchmarks.<modulo>
@@ -0,0 +1,75 @@
+"""
+Compara el filtro lineal original de Recomendador.filter_by_materials contra
+el índice invertido de materiales (reciclaje/indices.py).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.bench_filtro_materiales --centros 10000 50000
+"""
+import argparse
+import random
+import time
+
+from reciclaje.indices import IndiceMateriales
+from reciclaje.modelos import CentroReciclaje
+
+MATERIALES = ["pet", "vidrio", "papel", "cartón", "aluminio", "electrónicos", "pilas",
+              "aceite", "tetrapak", "hdpe", "ropa", "metal", "unicel", "llantas"]
+
+
+def generar_centros(n: int, rng: random.Random):
+    return [
+        CentroReciclaje(nombre=f"Centro {i}", lat=19.4, lon=-99.1,
+                        materiales=", ".join(rng.sample(MATERIALES, rng.randint(1, 6))))
+        for i in range(n)
+    ]
+
+
+def filtro_lineal(centros, selected_materials):
+    """Implementación original (antes del índice) usada como referencia."""
+    selected_mats_lower = [m.lower() for m in selected_materials]
+    return list(filter(
+        lambda centro: all(item in centro.materiales for item in selected_mats_lower),
+        centros
+    ))
+
+
+def filtro_indexado(centros, indice, selected_materials):
+    return list(map(centros.__getitem__, indice.ids_con_materiales(selected_materials)))
+
+
+def medir(fn, consultas):
+    inicio = time.perf_counter()
+    for consulta in consultas:
+        fn(consulta)
+    return (time.perf_counter() - inicio) / len(consultas) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--centros", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--consultas", type=int, default=50)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.semilla)
+    print(f"{'centros':>8} {'lineal ms':>10} {'índice ms':>10} {'aceleración':>12} {'construir ms':>13}")
+    for n in args.centros:
+        centros = generar_centros(n, rng)
+        consultas = [[m.capitalize() for m in rng.sample(MATERIALES, rng.randint(1, 3))]
+                     for _ in range(args.consultas)]
+
+        inicio = time.perf_counter()
+        indice = IndiceMateriales(centros)
+        t_construir = (time.perf_counter() - inicio) * 1000
+
+        # El índice debe devolver exactamente los mismos centros y en el mismo orden
+        for consulta in consultas:
+            assert filtro_indexado(centros, indice, consulta) == filtro_lineal(centros, consulta), consulta
+
+        t_lineal = medir(lambda c: filtro_lineal(centros, c), consultas)
+        t_indice = medir(lambda c: filtro_indexado(centros, indice, c), consultas)
+        print(f"{n:>8} {t_lineal:>10.3f} {t_indice:>10.3f} {t_lineal / t_indice:>11.1f}x {t_construir:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Prueba de carga: muchas sesiones simultáneas de las páginas de Streamlit.
+
+Cada sesión es un AppTest (la API de pruebas de Streamlit, sin navegador) que
+corre Inicio.py o pages/Mapa.py y después hace reruns con interacciones al
+azar: materiales de la multiselect, filtro de horario, búsqueda de texto y
+cercanía. Las sesiones corren en hilos de un mismo proceso, como las de un
+servidor de Streamlit (cache_resource, catálogo e índices compartidos), contra
+el Firestore local sembrado con datos sintéticos (RECICLAJE_FIRESTORE_LOCAL=1).
+
+AppTest no se puede correr en varios hilos a la vez (cada corrida instala y
+luego borra un Runtime global), así que las corridas de las sesiones toman
+turnos. En el servidor el GIL ya las serializa casi igual (el trabajo de las
+páginas es Python), y la latencia medida incluye la espera del turno, que es lo
+que ve el usuario cuando hay muchas sesiones.
+
+Para cada nivel de concurrencia se reporta la latencia por rerun (p50/p95/p99)
+de cada página, el throughput total (reruns/s) y el RSS máximo del proceso.
+Abrir un st.expander no provoca un rerun (se resuelve en el navegador), así que
+no se cuenta como interacción.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.carga_sesiones
+    python -m benchmarks.carga_sesiones --centros 20000 --sesiones 1 4 16 32 --reruns 20
+    python -m benchmarks.carga_sesiones --json carga.jsonl
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.datos_sinteticos import COLONIAS, MATERIALES, generar_documentos_centros, generar_documentos_reglas
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGINAS = ["pages/Mapa.py", "Inicio.py"]  # Con una sola sesión se prueba Mapa
+SESIONES_POR_DEFECTO = [1, 2, 4, 8, 16]
+TIMEOUT_RERUN_S = 120
+
+_turno = threading.Lock()  # Una corrida de AppTest a la vez (ver arriba)
+
+
+def rss_mb() -> float:
+    """RSS actual del proceso (Linux); en otros sistemas, el máximo que reporta getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class MuestreoRSS:
+    """Hilo que muestrea el RSS mientras dura el bloque `with` y guarda el máximo."""
+
+    def __init__(self, intervalo_s: float = 0.05):
+        self.intervalo_s = intervalo_s
+        self.maximo_mb = 0.0
+        self._detener = threading.Event()
+
+    def _ciclo(self):
+        while True:
+            self.maximo_mb = max(self.maximo_mb, rss_mb())
+            if self._detener.wait(self.intervalo_s):
+                return
+
+    def __enter__(self):
+        self._hilo = threading.Thread(target=self._ciclo, name="muestreo-rss", daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._detener.set()
+        self._hilo.join()
+        self.maximo_mb = max(self.maximo_mb, rss_mb())
+        return False
+
+
+def interactuar_mapa(at, rng: random.Random):
+    """Una interacción al azar en la barra lateral de Mapa.py (el rerun lo hace quien llama)."""
+    accion = rng.choice(["materiales", "materiales", "horario", "texto", "cercania"])
+    if accion == "materiales":
+        # Las opciones de la multiselect llevan el conteo en la etiqueta; el valor es el material capitalizado
+        opciones = [m.capitalize() for m in MATERIALES[:12]]
+        at.sidebar.multiselect[0].set_value(rng.sample(opciones, rng.randint(0, 3)))
+    elif accion == "horario":
+        at.sidebar.radio[0].set_value(rng.choice(["Cualquiera", "Abierto ahora", "Abierto en..."]))
+    elif accion == "texto":
+        at.sidebar.text_input[0].set_value(rng.choice(["", rng.choice(COLONIAS), "punto limpo"]))
+    else:
+        casilla = at.sidebar.checkbox[0]
+        casilla.set_value(not casilla.value)
+
+
+def sesion(pagina: str, reruns: int, semilla: int) -> Dict[str, list]:
+    """Corre una sesión completa; devuelve las latencias (ms) de cada rerun y los errores."""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(semilla)
+    at = AppTest.from_file(os.path.join(RAIZ, pagina), default_timeout=TIMEOUT_RERUN_S)
+    latencias, errores = [], []
+    for i in range(reruns + 1):
+        if i > 0 and pagina == "pages/Mapa.py":
+            interactuar_mapa(at, rng)
+        inicio = time.perf_counter()
+        with _turno:
+            at.run()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        errores.extend(str(e.value) for e in at.exception)
+    return {"latencias_ms": latencias, "errores": errores}
+
+
+def correr_nivel(n_sesiones: int, paginas: List[str], reruns: int, semilla: int) -> List[dict]:
+    """n_sesiones a la vez, repartidas entre las páginas; un registro por página."""
+    asignacion = [paginas[i % len(paginas)] for i in range(n_sesiones)]
+    with MuestreoRSS() as muestreo, ThreadPoolExecutor(max_workers=n_sesiones) as pool:
+        inicio = time.perf_counter()
+        futuros = [pool.submit(sesion, pagina, reruns, semilla + i) for i, pagina in enumerate(asignacion)]
+        resultados = [f.result() for f in futuros]
+        segundos = time.perf_counter() - inicio
+
+    total_reruns = sum(len(r["latencias_ms"]) for r in resultados)
+    registros = []
+    for pagina in paginas:
+        de_pagina = [r for pagina_r, r in zip(asignacion, resultados) if pagina_r == pagina]
+        if not de_pagina:
+            continue
+        latencias = np.array([ms for r in de_pagina for ms in r["latencias_ms"]])
+        registros.append({
+            "sesiones": n_sesiones,
+            "pagina": pagina,
+            "reruns": len(latencias),
+            "p50_ms": float(np.percentile(latencias, 50)),
+            "p95_ms": float(np.percentile(latencias, 95)),
+            "p99_ms": float(np.percentile(latencias, 99)),
+            "errores": sum(len(r["errores"]) for r in de_pagina),
+            "reruns_s": total_reruns / segundos,
+            "rss_max_mb": muestreo.maximo_mb,
+        })
+    return registros
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--centros", type=int, default=1000)
+    parser.add_argument("--reglas", type=int, default=50)
+    parser.add_argument("--sesiones", type=int, nargs="+", default=SESIONES_POR_DEFECTO,
+                        help="Niveles de concurrencia a probar, en orden")
+    parser.add_argument("--reruns", type=int, default=10, help="Interacciones por sesión (además de la carga)")
+    parser.add_argument("--paginas", nargs="+", default=PAGINAS)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--json", help="Agrega los resultados como JSON Lines a este archivo")
+    parser.add_argument("--verboso", action="store_true", help="No ocultar los print() de las páginas")
+    args = parser.parse_args()
+
+    # Antes de importar las páginas: Firestore local sembrado y una instantánea desechable
+    os.environ["RECICLAJE_FIRESTORE_LOCAL"] = "1"
+    os.environ.setdefault("RECICLAJE_DIR_INSTANTANEA", tempfile.mkdtemp(prefix="carga_instantanea_"))
+    os.chdir(RAIZ)  # Las páginas abren assets/ con rutas relativas
+    from reciclaje.firestore_local import cliente_por_defecto
+    cliente_por_defecto({
+        "centros_reciclaje": generar_documentos_centros(args.centros, args.semilla),
+        "reglas": generar_documentos_reglas(args.reglas, args.semilla + 1),
+    })
+
+    silencio = contextlib.nullcontext() if args.verboso else contextlib.redirect_stdout(io.StringIO())
+    with silencio:
+        # Una sesión sola primero: la carga del catálogo (cache_resource) no cuenta en los niveles
+        inicio = time.perf_counter()
+        for pagina in args.paginas:
+            sesion(pagina, 0, args.semilla)
+        arranque_ms = (time.perf_counter() - inicio) * 1000
+    print(f"{args.centros} centros, {args.reglas} reglas; arranque {arranque_ms:.0f} ms, RSS {rss_mb():.0f} MB")
+    print(f"{'sesiones':>8} {'página':<24} {'reruns':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'errores':>8} {'reruns/s':>9} {'RSS máx MB':>11}")
+
+    todos = []
+    for n in args.sesiones:
+        with silencio:
+            registros = correr_nivel(n, args.paginas, args.reruns, args.semilla)
+        for r in registros:
+            print(f"{r['sesiones']:>8} {r['pagina']:<24} {r['reruns']:>7} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} "
+                  f"{r['p99_ms']:>9.1f} {r['errores']:>8} {r['reruns_s']:>9.1f} {r['rss_max_mb']:>11.0f}")
+            r.update(centros=args.centros, reglas=args.reglas)
+        todos.extend(registros)
+
+    if args.json:
+        with open(args.json, "a", encoding="utf-8") as f:
+            for r in todos:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Generador de datos sintéticos con la misma forma que los documentos de Firebase.
+
+- Centros: documentos de 'centros_reciclaje' (nombre, lat, lon, horario,
+  materiales como texto separado por comas, ubicacion, updated_at).
+- Reglas: documentos de 'reglas' con campos 'condicion1', 'condicion2', ... y
+  'conclusion', tal como los lee regla_desde_documento().
+
+Todo es determinista dada la semilla.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Tuple
+
+from reciclaje.catalogo import Catalogo
+from reciclaje.firestore_local import ClienteFirestoreLocal
+from reciclaje.modelos import CentroReciclaje, regla_desde_documento
+
+# Materiales ordenados de más a menos común; se eligen con una distribución tipo Zipf
+MATERIALES = [
+    "pet", "cartón", "papel", "vidrio", "aluminio", "hdpe", "latas", "periódico", "tetrapak",
+    "electrónicos", "pilas", "aceite usado", "metal", "chatarra", "ropa", "unicel", "llantas",
+    "pp", "ldpe", "cobre", "baterías de auto", "medicamentos", "cd y dvd", "focos", "tóner",
+    "madera", "muebles", "colchones", "celulares", "cables",
+]
+PESOS_MATERIALES = [1.0 / (rango + 1) for rango in range(len(MATERIALES))]
+
+HORARIOS = [
+    "Lunes a Viernes 9:00-18:00", "Lunes a Sábado 8:00-20:00", "Sábado 10:00-14:00",
+    "Lunes a Domingo 7:00-22:00", "24 horas", "Martes y Jueves 10:00-16:00",
+    "Domingo 9:00-13:00", "Lunes a Viernes 8:00-15:00, Sábado 9:00-13:00",
+]
+
+# (ciudad, lat, lon, dispersión en grados, peso)
+CIUDADES = [
+    ("CDMX", 19.4326, -99.1332, 0.12, 0.45), ("Guadalajara", 20.6597, -103.3496, 0.10, 0.15),
+    ("Monterrey", 25.6866, -100.3161, 0.10, 0.15), ("Puebla", 19.0414, -98.2063, 0.06, 0.10),
+    ("Querétaro", 20.5888, -100.3899, 0.05, 0.08), ("Mérida", 20.9674, -89.5926, 0.05, 0.07),
+]
+COLONIAS = [
+    "Polanco", "Roma", "Condesa", "Coyoacán", "Del Valle", "Narvarte", "Doctores", "Santa Fe",
+    "Tlalpan", "Iztapalapa", "Xochimilco", "Azcapotzalco", "Centro", "Providencia", "Chapultepec",
+    "San Pedro", "Cumbres", "Angelópolis", "Juriquilla", "Montejo", "Lindavista", "Escandón",
+]
+TIPOS = ["Centro de Acopio", "Punto Limpio", "Recicladora", "Eco-Punto", "Planta de Reciclaje"]
+
+FECHA_BASE = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _ubicacion(rng: random.Random) -> str:
+    # Unas pocas colonias muy frecuentes y una cola larga (colonia + sector)
+    colonia = rng.choice(COLONIAS)
+    return colonia if rng.random() < 0.6 else f"{colonia} Sector {rng.randint(1, 40)}"
+
+
+def iterar_documentos_centros(n: int, semilla: int = 42) -> Iterator[Tuple[str, dict]]:
+    """Genera (doc_id, datos) uno por uno, en orden de id, sin tener todos en memoria."""
+    rng = random.Random(semilla)
+    pesos_ciudades = [c[4] for c in CIUDADES]
+    for i in range(n):
+        _, lat, lon, dispersion, _ = rng.choices(CIUDADES, weights=pesos_ciudades)[0]
+        materiales = set(rng.choices(MATERIALES, weights=PESOS_MATERIALES, k=rng.randint(1, 8)))
+        ubicacion = _ubicacion(rng)
+        yield f"centro{i:07d}", {
+            "nombre": f"{rng.choice(TIPOS)} {ubicacion} {i}",
+            "lat": round(rng.gauss(lat, dispersion), 6),
+            "lon": round(rng.gauss(lon, dispersion), 6),
+            "horario": rng.choice(HORARIOS),
+            "materiales": ", ".join(m.capitalize() for m in materiales),
+            "ubicacion": ubicacion,
+            "updated_at": FECHA_BASE + timedelta(seconds=i),
+        }
+
+
+def generar_documentos_centros(n: int, semilla: int = 42) -> Dict[str, dict]:
+    return dict(iterar_documentos_centros(n, semilla))
+
+
+def generar_documentos_reglas(m: int, semilla: int = 7) -> Dict[str, dict]:
+    rng = random.Random(semilla)
+    documentos = {}
+    for i in range(m):
+        condiciones = []
+        for clave in rng.sample(["material", "ubicacion", "horario"], rng.randint(1, 3)):
+            if clave == "material":
+                valor = rng.choices(MATERIALES, weights=PESOS_MATERIALES)[0]
+            elif clave == "ubicacion":
+                valor = _ubicacion(rng).lower()
+            else:
+                valor = rng.choice(["sábado", "domingo", "24 horas", "lunes"])
+            condiciones.append(f"{clave}:{valor}")
+        doc = {f"condicion{j + 1}": cond for j, cond in enumerate(condiciones)}
+        doc["conclusion"] = f"Recomendación {i}: " + ", ".join(condiciones)
+        doc["updated_at"] = FECHA_BASE
+        documentos[f"regla{i:06d}"] = doc
+    return documentos
+
+
+def crear_catalogo(n_centros: int, n_reglas: int, semilla: int = 42) -> Catalogo:
+    """Catálogo listo para usar, convirtiendo los documentos como lo hace el sincronizador."""
+    centros = [CentroReciclaje(**d) for _, d in iterar_documentos_centros(n_centros, semilla)]
+    reglas = [regla for _, d in sorted(generar_documentos_reglas(n_reglas, semilla + 1).items())
+              if (regla := regla_desde_documento(d)) is not None]
+    return Catalogo(centros, reglas)
+
+
+def crear_cliente_local(n_centros: int, n_reglas: int, semilla: int = 42) -> ClienteFirestoreLocal:
+    """Cliente de Firestore en memoria sembrado con datos sintéticos."""
+    return ClienteFirestoreLocal({
+        "centros_reciclaje": generar_documentos_centros(n_centros, semilla),
+        "reglas": generar_documentos_reglas(n_reglas, semilla + 1),
+    })
+
+
+def selecciones_aleatorias(cantidad: int, semilla: int = 3, max_materiales: int = 3) -> List[List[str]]:
+    """Selecciones de la multiselect tal como llegan de la UI (capitalizadas)."""
+    rng = random.Random(semilla)
+    return [[m.capitalize() for m in rng.sample(MATERIALES[:12], rng.randint(1, max_materiales))]
+            for _ in range(cantidad)]
+
+
+def posicion_aleatoria(rng: random.Random) -> Tuple[float, float]:
+    _, lat, lon, dispersion, _ = rng.choice(CIUDADES)
+    return rng.gauss(lat, dispersion), rng.gauss(lon, dispersion)
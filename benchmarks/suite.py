@@ -0,0 +1,154 @@
+"""
+Suite de benchmarks del motor de Mapa.py (sin Firebase ni Streamlit).
+
+Para cada tamaño de catálogo genera datos sintéticos, construye los índices y
+mide latencia (p50/p95/p99) y throughput de las operaciones que corren en cada
+rerun de la página: filter_by_materials, aplicar_motor_logico,
+get_all_materials, DataFrames del mapa y de la página de la tabla, búsqueda de cercanos y
+combinación de centros para selecciones amplias (cubrir_materiales).
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.suite                                # 100 .. 1M centros
+    python -m benchmarks.suite --tamanos 100 10000 --json base.jsonl
+    python -m benchmarks.suite --tamanos 100 10000 --comparar base.jsonl
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.datos_sinteticos import MATERIALES, crear_catalogo, posicion_aleatoria, selecciones_aleatorias
+from reciclaje.almacen import TAM_PAGINA_TABLA
+from reciclaje.motor import Recomendador
+
+TAMANOS_POR_DEFECTO = [100, 1_000, 10_000, 100_000, 1_000_000]
+
+
+def medir(operacion, entradas, presupuesto_s: float, min_iter: int = 3):
+    """Ejecuta `operacion` sobre las entradas (en ciclo) hasta agotar el presupuesto de tiempo."""
+    latencias = []
+    inicio = time.perf_counter()
+    i = 0
+    while i < min_iter or (time.perf_counter() - inicio < presupuesto_s and i < len(entradas) * 20):
+        entrada = entradas[i % len(entradas)]
+        t0 = time.perf_counter()
+        operacion(entrada)
+        latencias.append(time.perf_counter() - t0)
+        i += 1
+    latencias_ms = np.array(latencias) * 1000
+    return {
+        "n": len(latencias),
+        "p50_ms": float(np.percentile(latencias_ms, 50)),
+        "p95_ms": float(np.percentile(latencias_ms, 95)),
+        "p99_ms": float(np.percentile(latencias_ms, 99)),
+        "ops_s": len(latencias) / (latencias_ms.sum() / 1000),
+    }
+
+
+def cronometrar(funcion):
+    t0 = time.perf_counter()
+    resultado = funcion()
+    return resultado, (time.perf_counter() - t0) * 1000
+
+
+def correr_tamano(n: int, n_reglas: int, presupuesto_s: float, semilla: int):
+    """Devuelve una lista de registros {tamano, operacion, ...} para un tamaño de catálogo."""
+    registros = []
+    catalogo, t_generar = cronometrar(lambda: crear_catalogo(n, n_reglas, semilla))
+    registros.append({"operacion": "generar_datos", "construccion_ms": t_generar})
+    for indice in ("indice_materiales", "indice_reglas", "indice_espacial", "almacen"):
+        _, t = cronometrar(lambda: getattr(catalogo, indice))
+        registros.append({"operacion": f"construir_{indice}", "construccion_ms": t})
+
+    recomendador = Recomendador(catalogo)
+    selecciones = selecciones_aleatorias(50, semilla)
+    rng = random.Random(semilla)
+    posiciones = [posicion_aleatoria(rng) for _ in range(50)]
+    # Selecciones amplias (12 materiales) que casi nunca acepta un solo centro
+    amplias = [[m.capitalize() for m in rng.sample(MATERIALES, 12)] for _ in range(50)]
+    filtrados = [recomendador.filter_ids_by_materials(s) for s in selecciones]
+    centros_filtrados = [recomendador.get_centros_por_ids(ids) for ids in filtrados]
+    almacen = recomendador.get_almacen()
+
+    def construir_dataframes(ids):
+        # Lo que arma Mapa.py en cada rerun: la vista general del mapa y la página visible de la tabla
+        recomendador.get_vista_mapa(ids).a_dataframe()
+        almacen.pagina_de(ids, 0)
+        almacen.pagina_de(ids, len(ids) // (2 * TAM_PAGINA_TABLA), orden_por="nombre")
+
+    operaciones = [
+        ("filter_by_materials", recomendador.filter_by_materials, selecciones),
+        ("aplicar_motor_logico", recomendador.aplicar_motor_logico, centros_filtrados),
+        ("get_all_materials", lambda _: recomendador.get_all_materials(), [None]),
+        ("construir_dataframes", construir_dataframes, filtrados),
+        ("k_cercanos_10", lambda p: recomendador.sort_by_distance(filtrados[0], p[0], p[1], k=10), posiciones),
+        ("cobertura_12_materiales", recomendador.cubrir_materiales, amplias),
+    ]
+    for nombre, operacion, entradas in operaciones:
+        resultado = medir(operacion, entradas, presupuesto_s)
+        registros.append({"operacion": nombre, **resultado})
+
+    for registro in registros:
+        registro["tamano"] = n
+        registro["reglas"] = n_reglas
+    return registros
+
+
+def imprimir(registros):
+    for r in registros:
+        if "construccion_ms" in r:
+            print(f"{r['tamano']:>9} {r['operacion']:<32} {'':>9} {'':>9} {'':>9} {'':>10} "
+                  f"{r['construccion_ms']:>11.1f}")
+        else:
+            print(f"{r['tamano']:>9} {r['operacion']:<32} {r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} "
+                  f"{r['p99_ms']:>9.3f} {r['ops_s']:>10.0f}")
+
+
+def comparar(registros, ruta_base: str, umbral: float) -> int:
+    """Marca como regresión cualquier p50 que empeore más de `umbral` (fracción) contra la base."""
+    with open(ruta_base, encoding="utf-8") as f:
+        base = {(r["tamano"], r["operacion"]): r for r in map(json.loads, f) if "p50_ms" in r}
+    regresiones = 0
+    for r in registros:
+        anterior = base.get((r["tamano"], r["operacion"]))
+        if anterior and "p50_ms" in r and r["p50_ms"] > anterior["p50_ms"] * (1 + umbral):
+            regresiones += 1
+            print(f"REGRESIÓN {r['operacion']} con {r['tamano']} centros: "
+                  f"p50 {anterior['p50_ms']:.3f} ms -> {r['p50_ms']:.3f} ms")
+    if not regresiones:
+        print(f"Sin regresiones mayores a {umbral:.0%} contra {ruta_base}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS_POR_DEFECTO)
+    parser.add_argument("--reglas", type=int, default=500, help="Número de reglas sintéticas")
+    parser.add_argument("--presupuesto", type=float, default=1.0, help="Segundos por operación y tamaño")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--json", help="Agrega los resultados como JSON Lines a este archivo")
+    parser.add_argument("--comparar", help="Archivo JSON Lines de una corrida anterior")
+    parser.add_argument("--umbral", type=float, default=0.2, help="Tolerancia de regresión (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    print(f"{'centros':>9} {'operación':<32} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>10} "
+          f"{'construir ms':>11}")
+    todos = []
+    for n in args.tamanos:
+        registros = correr_tamano(n, args.reglas, args.presupuesto, args.semilla)
+        imprimir(registros)
+        todos.extend(registros)
+
+    if args.json:
+        with open(args.json, "a", encoding="utf-8") as f:
+            for r in todos:
+                f.write(json.dumps(r) + "\n")
+    if args.comparar and comparar(todos, args.comparar, args.umbral):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
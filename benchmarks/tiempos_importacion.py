@@ -0,0 +1,100 @@
+"""
+Costo de importación de cada página de la app, por paquete.
+
+Para cada página se toman sus importaciones de nivel superior (lo que se paga
+antes de que la página pinte algo) y se ejecutan en un proceso nuevo con
+`python -X importtime`, después de importar Streamlit (que ya está cargado en
+el servidor). El tiempo propio de cada módulo se suma por paquete raíz
+(numpy, pandas, google, ...). Se repite varias veces y se reporta la mediana.
+
+Uso (desde la raíz del proyecto):
+    python -m benchmarks.tiempos_importacion
+    python -m benchmarks.tiempos_importacion --repeticiones 7 --detalle 15
+    python -m benchmarks.tiempos_importacion --presupuesto-ms 150   # sale con 1 si alguna página se pasa
+    python -m benchmarks.tiempos_importacion --json importaciones.jsonl
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGINAS = ["Inicio.py", "pages/Mapa.py", "pages/Buenas_Practicas.py"]
+BASE = "import streamlit"  # Ya importado por el servidor antes de correr cualquier página
+MARCA = "--- fin de la base ---"
+
+
+def importaciones_de(ruta: str) -> List[str]:
+    """Las sentencias import de nivel superior de un script, como código fuente."""
+    with open(ruta, encoding="utf-8") as f:
+        fuente = f.read()
+    arbol = ast.parse(fuente)
+    return [ast.get_source_segment(fuente, nodo) for nodo in arbol.body
+            if isinstance(nodo, (ast.Import, ast.ImportFrom))]
+
+
+def medir_una_vez(importaciones: List[str]) -> Dict[str, float]:
+    """{paquete raíz: ms propios} de las importaciones, en un intérprete nuevo (sin caché de módulos)."""
+    codigo = "\n".join([BASE, f"import sys; sys.stderr.write({MARCA!r} + '\\n')"] + importaciones)
+    proceso = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo],
+                             cwd=RAIZ, capture_output=True, text=True)
+    if proceso.returncode != 0:
+        raise RuntimeError(proceso.stderr.strip().splitlines()[-1])
+    lineas = proceso.stderr.splitlines()
+    por_paquete: Dict[str, float] = {}
+    for linea in lineas[lineas.index(MARCA) + 1:]:
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, _, modulo = linea[len("import time:"):].split("|")
+        paquete = modulo.strip().split(".")[0]
+        por_paquete[paquete] = por_paquete.get(paquete, 0.0) + int(propio) / 1000
+    return por_paquete
+
+
+def medir_pagina(pagina: str, repeticiones: int) -> Dict[str, float]:
+    """Mediana por paquete (y total) de varias corridas."""
+    importaciones = importaciones_de(os.path.join(RAIZ, pagina))
+    corridas = [medir_una_vez(importaciones) for _ in range(repeticiones)]
+    paquetes = set().union(*corridas)
+    medianas = {p: statistics.median(c.get(p, 0.0) for c in corridas) for p in paquetes}
+    medianas["total"] = statistics.median(sum(c.values()) for c in corridas)
+    return medianas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paginas", nargs="+", default=PAGINAS)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--detalle", type=int, default=10, help="Paquetes más caros a mostrar por página")
+    parser.add_argument("--presupuesto-ms", type=float, help="Falla si alguna página pasa de este total")
+    parser.add_argument("--json", help="Agrega los resultados a este archivo JSON Lines")
+    args = parser.parse_args()
+
+    excedidas = []
+    registros = []
+    for pagina in args.paginas:
+        medianas = medir_pagina(pagina, args.repeticiones)
+        total = medianas.pop("total")
+        print(f"\n{pagina}: {total:.1f} ms de importaciones (además de streamlit)")
+        for paquete, ms in sorted(medianas.items(), key=lambda x: -x[1])[:args.detalle]:
+            print(f"  {paquete:<40} {ms:8.1f} ms")
+        registros.append({"pagina": pagina, "total_ms": round(total, 2),
+                          "paquetes_ms": {p: round(ms, 2) for p, ms in medianas.items()}})
+        if args.presupuesto_ms is not None and total > args.presupuesto_ms:
+            excedidas.append(pagina)
+
+    if args.json:
+        with open(args.json, "a", encoding="utf-8") as f:
+            for registro in registros:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    if excedidas:
+        print(f"\n--- Se pasan del presupuesto de {args.presupuesto_ms:.0f} ms: {', '.join(excedidas)} ---")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,8 @@
 import streamlit as st
+# Perfil de memoria por página (apagado salvo con RECICLAJE_PERFIL_MEMORIA)
+from reciclaje.memoria import PERFIL_MEMORIA
+
+inicio_memoria = PERFIL_MEMORIA.iniciar_rerun()
 
 # Configuración de la página, usando 'layout="wide"' para que el contenido ocupe_todo el ancho de la pantalla.
 st.set_page_config(
@@ -77,4 +81,6 @@ with col2:
 
 st.markdown("---")
 # st.success crea una caja verde, perfecta para un mensaje final de conclusión o éxito.
-st.success("¡Cada pequeña acción cuenta para construir un futuro más sostenible! Gracias por tu esfuerzo.")
\ No newline at end of file
+st.success("¡Cada pequeña acción cuenta para construir un futuro más sostenible! Gracias por tu esfuerzo.")
+
+PERFIL_MEMORIA.terminar_rerun("Buenas_Practicas", inicio_memoria)
@@ -2,16 +2,32 @@
 # --- BLOQUE 1: IMPORTACIONES ---
 # ====================================================================
 import streamlit as st
-import pandas as pd
-from typing import List
+import numpy as np
+import os
+import time
+from datetime import time as dt_time
+from typing import Optional
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 # Se eliminaron las importaciones de math, folium y geolocation
 
 # Componentes de UI
 # (Ya no se necesita streamlit_geolocation)
 
-# Firebase (para la base de datos)
-import firebase_admin
-from firebase_admin import credentials, firestore
+# Firebase, pandas y pyarrow se importan en el primer acceso a datos (dentro de
+# init_firebase y de los módulos de reciclaje), no al cargar la página: son la
+# mayor parte del tiempo de arranque. Medir con: python -m benchmarks.tiempos_importacion
+
+# Motor, catálogo y sincronización (sin dependencias de Streamlit)
+from reciclaje.agrupamiento import ZOOM_MAX, ZOOM_MIN
+from reciclaje.almacen import TAM_PAGINA_TABLA
+from reciclaje.cache import CacheLRU
+from reciclaje.catalogo import Catalogo
+from reciclaje.horarios import DIAS, minuto_de_semana, momento_actual
+from reciclaje.instrumentacion import METRICAS
+from reciclaje.memoria import PERFIL_MEMORIA, PRESUPUESTO_SESION
+from reciclaje.motor import Recomendador
+from reciclaje.instantanea import Instantanea
+from reciclaje.sincronizacion import SincronizadorCatalogo
 
 st.set_page_config(layout="wide")
 
@@ -38,8 +54,18 @@ def init_firebase():
     """
     Inicializa la conexión con Firebase usando las credenciales
     guardadas en el archivo secrets.toml (st.secrets).
+
+    Con RECICLAJE_FIRESTORE_LOCAL=1 usa el cliente en memoria de reciclaje/firestore_local.py
+    (pruebas de carga y desarrollo sin credenciales ni red).
     """
+    if os.environ.get("RECICLAJE_FIRESTORE_LOCAL") == "1":
+        from reciclaje.firestore_local import cliente_por_defecto
+        print("--- Usando el cliente de Firestore local (en memoria) ---")
+        return cliente_por_defecto()
     try:
+        import firebase_admin
+        from firebase_admin import credentials, firestore
+
         if not firebase_admin._apps:
             secret_creds = st.secrets["firebase_credentials"]
             creds_dict = dict(secret_creds)
@@ -62,274 +88,352 @@ def init_firebase():
 
 
 @st.cache_resource
-def load_and_create_centros(_db) -> List['CentroReciclaje']:
-    """Lee la colección 'centros_reciclaje' de Firebase y la convierte en objetos CentroReciclaje."""
+def iniciar_sincronizacion(_db):
+    """
+    Carga 'centros_reciclaje' y 'reglas' UNA vez por proceso (desde la instantánea en disco si
+    hay una válida, si no desde Firebase) y deja un hilo en segundo plano que aplica solo los
+    documentos agregados, cambiados o borrados.
+
+    Con RECICLAJE_DIR_COMPARTIDO (varios procesos en la misma máquina), solo un proceso
+    sincroniza y publica cada versión en ese directorio; los demás la leen con memory-map en
+    lugar de tener su propia copia (ver reciclaje/compartido.py).
+    """
     if _db is None:
         st.error("No se pudo conectar a Firebase. La aplicación no puede cargar datos.")
-        return []
+        return None
 
     print("--- LEYENDO DATOS DESDE FIREBASE ---")
-    centros_ref = _db.collection('centros_reciclaje')
-    docs = centros_ref.stream()
-
-    lista_centros = []
+    dir_compartido = os.environ.get("RECICLAJE_DIR_COMPARTIDO")
+    if dir_compartido:
+        # Solo en modo compartido: usa candados de archivo de POSIX (fcntl)
+        from reciclaje.compartido import CatalogoCompartido, SegmentoCompartido
+        sincronizador = CatalogoCompartido(SegmentoCompartido(dir_compartido),
+                                           lambda segmento, version: SincronizadorCatalogo(
+                                               _db, instantanea=segmento, version_inicial=version))
+    else:
+        sincronizador = SincronizadorCatalogo(_db, instantanea=Instantanea())
     try:
-        for doc in docs:
-            data = doc.to_dict()
-            lista_centros.append(CentroReciclaje(**data))
-
-        if not lista_centros:
-            print("--- ADVERTENCIA: Se conectó a Firebase pero no se encontraron documentos en 'centros_reciclaje' ---")
-            st.warning("Se conectó a Firebase, pero la colección 'centros_reciclaje' está vacía o no se pudo leer.")
-            return []
-
-        print(f"--- Se cargaron {len(lista_centros)} centros desde Firebase ---")
-        return lista_centros
-
+        catalogo = sincronizador.arrancar()
     except Exception as e:
         st.error(f"Error al leer datos de Firebase. Revisa la estructura de tus documentos: {e}")
         st.exception(e)
-        return []
+        return None
 
+    if not catalogo.centros:
+        print("--- ADVERTENCIA: Se conectó a Firebase pero no se encontraron documentos en 'centros_reciclaje' ---")
+        st.warning("Se conectó a Firebase, pero la colección 'centros_reciclaje' está vacía o no se pudo leer.")
+    if not catalogo.reglas:
+        print("ADVERTENCIA: La colección 'reglas' está vacía o ningún documento tiene 'conclusion' y 'condicion...'.")
 
-# ====================================================================
-# --- BLOQUE 3: PARADIGMA POO (Modelos de Datos) ---
-# ====================================================================
-
-class CentroReciclaje:
-    """Clase que representa un único centro de reciclaje. Modela la estructura de nuestros datos."""
-
-    def __init__(self, nombre=None, lat=None, lon=None, horario=None, materiales=None, ubicacion=None, **kwargs):
-        """Constructor robusto que acepta campos opcionales de Firebase."""
-        self.nombre = nombre if nombre else "Nombre no disponible"
-        self.lat = float(lat) if lat is not None else 0.0
-        self.lon = float(lon) if lon is not None else 0.0
-        self.horario = horario if horario else "No disponible"
-        self.ubicacion = ubicacion if ubicacion else self.nombre
-        self.distance = None  # Este campo ya no se usará, pero no daña tenerlo
-
-        # Convierte el STRING 'materiales' en una LISTA
-        if isinstance(materiales, str):
-            temp_list = materiales.lower().split(',')
-            self.materiales = [m.strip() for m in temp_list if m.strip()]
-        elif isinstance(materiales, list):
-            self.materiales = [str(m).lower().strip() for m in materiales]
-        else:
-            self.materiales = []
+    sincronizador.iniciar_en_segundo_plano()
+    return sincronizador
 
 
 # ====================================================================
-# --- BLOQUE 4: PARADIGMA LÓGICO (Motor de Reglas) ---
+# --- BLOQUE 3, 4 Y 5: MODELOS, MOTOR DE REGLAS Y LÓGICA DE NEGOCIO ---
 # ====================================================================
+# CentroReciclaje y Regla viven en reciclaje/modelos.py y Recomendador en
+# reciclaje/motor.py, sin dependencias de Streamlit (los usan también los
+# benchmarks). Los índices derivados (materiales, reglas, espacial y almacén
+# columnar) los construye reciclaje/catalogo.py una vez por versión de los datos.
 
-class Regla:
-    """Clase que modela una regla 'SI-ENTONCES' leída de Firebase."""
-
-    def __init__(self, condicions_str: str, conclusiones: str):
-        self.conclusiones = conclusiones
-        self.condiciones_list = []
-
-        # Parsea el string combinado de condiciones
-        # Ej: "material:pet;ubicacion:polanco"
-        for cond in condicions_str.split(';'):
-            if ':' in cond:
-                key, val = cond.split(':', 1)
-                self.condiciones_list.append((key.strip().lower(), val.strip().lower()))
-
-    def checar_condiciones(self, centro: CentroReciclaje) -> bool:
-        """Compara este centro (hecho) con las condiciones de esta regla."""
-        for key, value in self.condiciones_list:
-            if key == 'material':
-                if value not in centro.materiales:
-                    return False
-            elif key == 'horario':
-                if value not in centro.horario.lower():
-                    return False
-            elif key == 'ubicacion':
-                if value != centro.ubicacion.lower():
-                    return False
-            else:
-                pass
-        return True
+def obtener_catalogo(db_client) -> Catalogo:
+    """Versión vigente del catálogo (vacía si no se pudo cargar)."""
+    sincronizador = iniciar_sincronizacion(db_client)
+    return sincronizador.catalogo if sincronizador else Catalogo([], [])
 
 
 @st.cache_resource
-def load_rules(_db) -> List[Regla]:
-    """Lee la colección 'reglas' de Firebase y la convierte en objetos Regla."""
-    if _db is None:
-        return []
+def iniciar_cache_resultados(_db) -> CacheLRU:
+    """
+    Caché LRU de resultados por selección de materiales, compartida por todas las sesiones.
+    Se vacía cada vez que el sincronizador publica una versión nueva de centros o reglas.
+    """
+    cache = CacheLRU()
+    sincronizador = iniciar_sincronizacion(_db)
+    if sincronizador:
+        sincronizador.suscribir(cache.invalidar)
+    return cache
 
-    print("--- LEYENDO REGLAS DESDE FIREBASE ---")
-    reglas_ref = _db.collection('reglas')
-    docs = reglas_ref.stream()
 
-    lista_reglas = []
-    try:
-        doc_count = 0
-        for doc in docs:
-            doc_count += 1
-            data = doc.to_dict()
-            print(f"Documento {doc_count} encontrado. Campos: {data.keys()}")
-
-            # Lógica mejorada para leer campos 'condicion1', 'condicion2', etc.
-            if 'conclusion' in data:
-                lista_condiciones_str = []
-                for key, value in data.items():
-                    if key.startswith('condicion'):
-                        lista_condiciones_str.append(str(value))
-
-                if lista_condiciones_str:
-                    string_condiciones_combinadas = ";".join(lista_condiciones_str)
-                    print(
-                        f"¡Éxito! Documento {doc_count} COINCIDE. Añadiendo regla con {len(lista_condiciones_str)} condiciones.")
-                    lista_reglas.append(Regla(string_condiciones_combinadas, data['conclusion']))
-                else:
-                    print(
-                        f"AVISO: Documento {doc_count} tiene 'conclusion' pero CERO campos 'condicion...'. Omitiendo.")
-            else:
-                print(f"AVISO: El Documento {doc_count} fue OMITIDO. No tiene el campo 'conclusion'.")
+RESULTADOS_POR_SESION = 3  # Consultas recientes cuyos resultados guarda cada sesión
 
-        if doc_count == 0:
-            print("ADVERTENCIA: La colección 'reglas' existe pero está COMPLETAMENTE VACÍA.")
 
-        print(f"--- Se cargaron {len(lista_reglas)} reglas lógicas desde Firebase ---")
-        return lista_reglas
-
-    except Exception as e:
-        st.error(f"Error al leer la colección 'reglas' de Firebase: {e}")
-        return []
+def resultados_de_sesion(consulta: tuple, calcular):
+    """
+    Resultados de `consulta` guardados en session_state (los de las últimas RESULTADOS_POR_SESION
+    consultas de la sesión). Es lo que crece por sesión en esta página: con miles de centros son
+    arreglos de ids y distancias. El presupuesto por sesión puede expulsarlos; solo se recalculan.
+    """
+    recientes = st.session_state.setdefault("resultados_recientes", {})
+    if consulta in recientes:
+        METRICAS.contar("resultados_sesion.aciertos")
+        recientes[consulta] = recientes.pop(consulta)  # Pasa a ser la más reciente
+    else:
+        recientes[consulta] = calcular()
+        while len(recientes) > RESULTADOS_POR_SESION:
+            del recientes[next(iter(recientes))]
+    return recientes[consulta]
 
 
 # ====================================================================
-# --- BLOQUE 5: PARADIGMA POO (Lógica de Negocio) Y FUNCIONAL ---
+# --- BLOQUE 6: DIAGNÓSTICO (oculto, se abre con ?diagnostico=1) ---
 # ====================================================================
 
-# --- La función haversine() fue eliminada ---
-
-class Recomendador:
-    """Encapsula toda la lógica de negocio: cargar, filtrar y ordenar los centros."""
-
-    def __init__(self, db_client):
-        self._centros: List[CentroReciclaje] = load_and_create_centros(db_client)
-        self._reglas: List[Regla] = load_rules(db_client)
-
-    def get_all_centros(self) -> List[CentroReciclaje]:
-        return self._centros
-
-    def get_all_materials(self) -> List[str]:
-        all_mats = set()
-        for centro in self._centros:
-            for material in centro.materiales:
-                all_mats.add(material.capitalize())
-        return sorted(list(all_mats))
-
-    # --- DEMOSTRACIÓN DE PARADIGMA FUNCIONAL ---
-    def filter_by_materials(self, selected_materials: List[str]) -> List[CentroReciclaje]:
-        if not selected_materials:
-            return self._centros
-        selected_mats_lower = [m.lower() for m in selected_materials]
-        filtered_iterator = filter(
-            lambda centro: all(item in centro.materiales for item in selected_mats_lower),
-            self._centros
-        )
-        return list(filtered_iterator)
-
-    # --- El método sort_by_distance() fue eliminado ---
-
-    # --- METODO DEL MOTOR DE INFERENCIA LÓGICA ---
-    def aplicar_motor_logico(self, centros_filtrados: List[CentroReciclaje]):
-        print(f"--- Ejecutando motor lógico con {len(self._reglas)} reglas sobre {len(centros_filtrados)} centros ---")
-        resultados_logicos = {}
-        for centro in centros_filtrados:
-            conclusiones_encontradas = []
-            for regla in self._reglas:
-                if regla.checar_condiciones(centro):
-                    conclusiones_encontradas.append(regla.conclusiones)
-            if conclusiones_encontradas:
-                resultados_logicos[centro.nombre] = conclusiones_encontradas
-        return resultados_logicos
+def mostrar_diagnostico(cache: Optional[CacheLRU] = None):
+    """Tramos de tiempo, histogramas y contadores del proceso (todas las sesiones)."""
+    st.markdown("---")
+    st.header("🩺 Diagnóstico de rendimiento")
+    resumen = METRICAS.resumen()
+    if not resumen:
+        st.info("Todavía no hay tramos registrados.")
+        return
+    st.dataframe(resumen, width='stretch')
+    st.subheader("Contadores")
+    st.json(METRICAS.contadores())
+    if cache is not None:
+        st.subheader("Caché de resultados")
+        st.json(cache.estadisticas())
+    tramo = st.selectbox("Histograma del tramo:", [fila["tramo"] for fila in resumen])
+    st.dataframe([{"cubeta": cubeta, "cuenta": cuenta} for cubeta, cuenta in METRICAS.histograma(tramo).items()],
+                 width='stretch')
+    st.download_button("Descargar métricas (JSON Lines)", METRICAS.a_jsonl(),
+                       file_name="metricas_mapa.jsonl", mime="application/jsonl")
+
+    st.subheader("Memoria")
+    # Lo que guardan las sesiones en session_state (sumado a la memoria base del proceso da el tamaño de réplica)
+    st.json(PRESUPUESTO_SESION.resumen())
+    if not PERFIL_MEMORIA.activo:
+        st.info("El perfil de asignaciones está apagado: arranca con RECICLAJE_PERFIL_MEMORIA=1 "
+                "(o más marcos de pila, p. ej. 10, para ver los retenedores de cada página; es mucho más lento).")
+        return
+    st.dataframe(PERFIL_MEMORIA.resumen_paginas(), width='stretch')
+    origen = st.selectbox("Retenedores de:", ["Todo el proceso", "pages/Mapa.py", "Inicio.py",
+                                              "pages/Buenas_Practicas.py"])
+    st.dataframe(PERFIL_MEMORIA.retenedores(archivo=None if origen == "Todo el proceso" else origen),
+                 width='stretch')
+    if st.button("Tomar nueva base de comparación"):
+        PERFIL_MEMORIA.reiniciar_base()
 
 
 # ====================================================================
-# --- BLOQUE 6: INTERFAZ DE STREAMLIT (App Principal) ---
+# --- BLOQUE 7: INTERFAZ DE STREAMLIT (App Principal) ---
 # ====================================================================
+inicio_rerun = time.perf_counter()
+inicio_memoria = PERFIL_MEMORIA.iniciar_rerun()
+METRICAS.contar("reruns")
 st.title("♻️ Buscador Inteligente de Centros de Reciclaje")
 st.info("Motor Lógico con Reglas desde Firebase | Conexión segura con st.secrets")
 
 try:
     # 1. INICIALIZACIÓN (POO)
-    db_client = init_firebase()
+    with METRICAS.tramo("firebase_init"):
+        db_client = init_firebase()
     if db_client:
-        recomendador = Recomendador(db_client)
+        with METRICAS.tramo("carga_datos"):
+            recomendador = Recomendador(obtener_catalogo(db_client), iniciar_cache_resultados(db_client))
     else:
         st.error("No se pudo inicializar la base de datos. La aplicación se detendrá.")
         st.stop()
 
     # 2. BARRA LATERAL (INPUTS DEL USUARIO)
     st.sidebar.header("👇 Filtra tu Búsqueda")
+    texto_busqueda = st.sidebar.text_input("🔎 Buscar por nombre o colonia:",
+                                           placeholder="Ej. Polanco, Punto Limpio...").strip()
     all_materials = recomendador.get_all_materials()
 
     if not all_materials:
         st.error("No se pudieron cargar datos desde Firebase. Revisa la conexión y la configuración.")
     else:
+        # Junto a cada material, cuántos centros quedan si se agrega a la selección actual (la selección
+        # ya está en session_state al empezar el rerun, antes de pintar el widget)
+        conteos = recomendador.conteos_materiales(st.session_state.get("materiales", []))
         selected_materials = st.sidebar.multiselect(
             "1. Selecciona los materiales:",
             options=all_materials,
+            format_func=lambda material: f"{material} ({conteos.get(material.lower(), 0)})",
+            key="materiales",
             placeholder="Elige uno o más materiales"
         )
-
-        # 3. LÓGICA FUNCIONAL (filter)
-        filtered_centros = recomendador.filter_by_materials(selected_materials)
-
-        # --- Se eliminó la barra lateral de geolocalización ---
+        # Si ningún centro acepta toda la selección, se puede pedir una combinación de centros
+        combinar = len(selected_materials) > 1 and st.sidebar.toggle(
+            "Combinar varios centros", help="Pocos centros que, entre todos, aceptan todos los materiales elegidos.")
+
+        # 3b. HORARIO (índice de intervalos sobre los horarios ya interpretados)
+        st.sidebar.markdown("---")
+        modo_horario = st.sidebar.radio("2. Horario de apertura:", ["Cualquiera", "Abierto ahora", "Abierto en..."],
+                                        horizontal=True)
+        minuto_semana = None
+        if modo_horario != "Cualquiera":
+            if modo_horario == "Abierto ahora":
+                minuto_semana = momento_actual()
+            else:
+                dia = st.sidebar.selectbox("Día", range(len(DIAS)), format_func=lambda d: DIAS[d].capitalize())
+                hora = st.sidebar.time_input("Hora", value=dt_time(10, 0), step=900)
+                minuto_semana = minuto_de_semana(dia, hora.hour, hora.minute)
+        aviso_horario = st.sidebar.empty()  # Se llena cuando se sabe cuántos horarios no se reconocieron
+
+        # 4. UBICACIÓN DEL USUARIO (lat/lon manual, sin geolocalización del navegador)
+        st.sidebar.markdown("---")
+        ubicacion = (None, None)
+        k, radio_km = None, None
+        cercania = st.sidebar.checkbox("3. Ordenar por cercanía a mi ubicación")
+        if cercania:
+            user_lat = st.sidebar.number_input("Latitud", min_value=-90.0, max_value=90.0,
+                                               value=19.4326, format="%.5f")
+            user_lon = st.sidebar.number_input("Longitud", min_value=-180.0, max_value=180.0,
+                                               value=-99.1332, format="%.5f")
+            ubicacion = (user_lat, user_lon)
+            modo_cercania = st.sidebar.radio("Mostrar:", ["Los más cercanos", "Dentro de un radio"])
+            if modo_cercania == "Dentro de un radio":
+                radio_km = st.sidebar.slider("Radio (km)", min_value=1, max_value=50, value=5)
+            elif combinar:
+                # Quedarse con los k más cercanos podría dejar fuera centros de la combinación
+                st.sidebar.caption("Al combinar centros se muestran todos los de la combinación, por cercanía.")
+            else:
+                k = st.sidebar.slider("Número de centros", min_value=1, max_value=50, value=10)
+
+        def calcular_resultados():
+            """Filtros, combinación y cercanía: (ids, distancias_km, materiales sin cubrir, horarios desconocidos)."""
+            # 3. LÓGICA FUNCIONAL (filter)
+            with METRICAS.tramo("filtrado", materiales=len(selected_materials)):
+                # Al combinar, los materiales se resuelven después (4b), sobre lo que dejen los demás filtros
+                ids = recomendador.filter_ids_by_materials([] if combinar else selected_materials)
+            distancias, sin_cubrir, desconocidos = None, [], 0
+
+            # 3b. HORARIO
+            if minuto_semana is not None:
+                desconocidos = recomendador.contar_horarios_desconocidos(ids)
+                with METRICAS.tramo("filtro_horario"):
+                    ids = recomendador.filter_ids_abiertos(ids, minuto_semana)
+
+            # 3c. BÚSQUEDA DE TEXTO (índice de palabras y trigramas; tolera errores de dedo)
+            if texto_busqueda:
+                with METRICAS.tramo("busqueda_texto"):
+                    ids = recomendador.buscar_texto(texto_busqueda, ids)
+
+            # 5a. RADIO (índice espacial): antes de combinar, para que la combinación salga de los centros del radio
+            if radio_km is not None:
+                with METRICAS.tramo("cercania", modo="radio"):
+                    ids, distancias = recomendador.sort_by_distance(ids, *ubicacion, radio_km=radio_km)
+
+            # 4b. COMBINACIÓN DE CENTROS (cobertura voraz sobre las máscaras de materiales; con ubicación,
+            # entre dos centros que cubren lo mismo se prefiere el más cercano)
+            if combinar:
+                with METRICAS.tramo("cobertura", materiales=len(selected_materials)):
+                    ids, sin_cubrir = recomendador.cubrir_materiales(selected_materials, ids, *ubicacion)
+
+            # 5. ORDENAR POR DISTANCIA (índice espacial): los k más cercanos, o la combinación completa en orden
+            if cercania and (radio_km is None or combinar):
+                with METRICAS.tramo("cercania", modo="k"):
+                    ids, distancias = recomendador.sort_by_distance(ids, *ubicacion, k=k)
+            return ids, distancias, sin_cubrir, desconocidos
+
+        # Cambiar de página, de orden o de zoom vuelve a correr la página con la misma consulta: sus
+        # resultados se toman de los guardados en la sesión en lugar de filtrar de nuevo
+        consulta = (recomendador.get_version(), tuple(selected_materials), combinar, minuto_semana,
+                    texto_busqueda, ubicacion, k, radio_km)
+        filtered_ids, distancias_km, sin_cubrir, desconocidos = resultados_de_sesion(consulta, calcular_resultados)
+
+        if desconocidos:
+            aviso_horario.caption(f"{desconocidos} centros con horario no reconocido quedan fuera de este filtro.")
+        if combinar:
+            if len(filtered_ids):
+                cubiertos = "el resto de los materiales elegidos" if sin_cubrir else "los materiales elegidos"
+                st.info(f"Estos {len(filtered_ids)} centros, juntos, aceptan {cubiertos}.")
+            if sin_cubrir:
+                st.warning("Ningún centro (con estos filtros) acepta: "
+                           + ", ".join(m.capitalize() for m in sin_cubrir))
 
         # 6. VISUALIZACIÓN DE RESULTADOS (Métricas)
-        st.metric(label="Centros Encontrados", value=len(filtered_centros))
+        st.metric(label="Centros Encontrados", value=len(filtered_ids))
         st.markdown("---")
 
         # 7. VISUALIZACIÓN DE RESULTADOS (Mapa y Tabla)
-        if filtered_centros:
+        almacen = recomendador.get_almacen()
+        if len(filtered_ids):
             col_map, col_data = st.columns([0.6, 0.4])
 
             with col_map:
                 st.subheader("Ubicación en el Mapa")
 
-                # --- REEMPLAZO CON st.map ---
-                # 1. Preparamos los datos para st.map
-                map_data = pd.DataFrame(
-                    [{'lat': centro.lat, 'lon': centro.lon} for centro in filtered_centros
-                     if centro.lat is not None and centro.lon is not None]  # Filtro de seguridad
-                )
+                # --- st.map CON AGRUPAMIENTO POR ZOOM ---
+                # 1. Vista general: el zoom que encuadra todos los resultados. Con zoom bajo se mandan
+                #    grupos (uno por celda de la rejilla) y con zoom alto centros sueltos; así el número
+                #    de puntos que viaja al navegador no depende del tamaño del catálogo.
+                vista_general = recomendador.get_vista_mapa(filtered_ids)
+                opciones_vista = {"Todos los resultados": (None, None)}
+                if distancias_km is not None:
+                    opciones_vista["Mi ubicación"] = ((user_lat, user_lon), vista_general.zoom)
+                for i in np.argsort(vista_general.cuentas, kind='stable')[::-1][:10]:
+                    if vista_general.cuentas[i] > 1:
+                        lat_grupo, lon_grupo = float(vista_general.lats[i]), float(vista_general.lons[i])
+                        etiqueta = f"Grupo de {vista_general.cuentas[i]} centros ({lat_grupo:.3f}, {lon_grupo:.3f})"
+                        opciones_vista[etiqueta] = ((lat_grupo, lon_grupo), min(vista_general.zoom + 3, ZOOM_MAX))
+
+                centrar_en = st.selectbox("Centrar el mapa en:", list(opciones_vista))
+                zoom_elegido = st.select_slider("Acercamiento:", options=["Auto"] + list(range(ZOOM_MIN, ZOOM_MAX + 1)),
+                                                value="Auto")
+                centro_mapa, zoom_auto = opciones_vista[centrar_en]
+                zoom_mapa = zoom_auto if zoom_elegido == "Auto" else zoom_elegido
+
+                with METRICAS.tramo("construir_df.mapa", filas=len(filtered_ids)):
+                    if centro_mapa is None and zoom_mapa is None:
+                        vista = vista_general
+                    else:
+                        vista = recomendador.get_vista_mapa(filtered_ids, zoom_mapa, centro_mapa)
+                    map_data = vista.a_dataframe()
 
                 # 2. Mostramos el mapa (solo si hay datos válidos)
                 if not map_data.empty:
-                    st.map(map_data, zoom=10)
+                    if vista.agrupado:
+                        st.caption(f"{vista.total} centros en la vista, agrupados en {len(vista)} puntos. "
+                                   "Acerca el mapa para ver cada centro.")
+                    with METRICAS.tramo("render_mapa", puntos=len(map_data)):
+                        st.map(map_data, latitude="lat", longitude="lon", size="radio_m", color="color",
+                               zoom=vista.zoom)
                 else:
-                    st.warning("Centros filtrados no tienen coordenadas para mostrar en el mapa.")
+                    st.warning("No hay centros en esta zona del mapa.")
 
             with col_data:
                 st.subheader("Detalles de los Centros")
-                df_display_data = []
-                for centro in filtered_centros:
-                    data = vars(centro).copy()
-                    # Se elimina el 'distance' de los datos
-                    data.pop('distance', None)
-                    data['materiales'] = ", ".join(m.capitalize() for m in data['materiales'])
-                    df_display_data.append(data)
-
-                df_display = pd.DataFrame(df_display_data)
-
-                # Se quita 'distance' del orden de columnas
-                st.dataframe(df_display, width='stretch',
-                             column_order=("nombre", "ubicacion", "horario", "materiales"))
+                # Tabla paginada: solo se arman las filas de la página visible (orden y desplazamiento
+                # se resuelven en el almacén sobre los ids filtrados)
+                columnas_orden = {"Sin ordenar": None, "Nombre": "nombre", "Ubicación": "ubicacion",
+                                  "Horario": "horario"}
+                if distancias_km is not None:
+                    columnas_orden = {"Distancia": "distancia_km", **columnas_orden}
+                col_orden, col_sentido = st.columns([0.6, 0.4])
+                orden_por = columnas_orden[col_orden.selectbox("Ordenar por:", list(columnas_orden))]
+                descendente = col_sentido.toggle("Descendente", disabled=orden_por is None)
+                total_paginas = max(1, -(-len(filtered_ids) // TAM_PAGINA_TABLA))
+                pagina = st.number_input(f"Página (de {total_paginas})", min_value=1, max_value=total_paginas,
+                                         value=1, step=1)
+
+                with METRICAS.tramo("construir_df.tabla", filas=len(filtered_ids)):
+                    df_display = almacen.pagina_de(filtered_ids, pagina - 1, TAM_PAGINA_TABLA, orden_por,
+                                                   descendente, distancias_km)
+                    column_order = ("nombre", "ubicacion", "horario", "materiales")
+                    if distancias_km is not None:
+                        column_order = ("distancia_km",) + column_order
+
+                with METRICAS.tramo("render_tabla", filas=len(df_display)):
+                    st.dataframe(df_display, width='stretch', column_order=column_order, hide_index=True)
+                primera_fila = (pagina - 1) * TAM_PAGINA_TABLA
+                st.caption(f"Filas {primera_fila + 1}–{primera_fila + len(df_display)} de {len(filtered_ids)}")
         else:
             st.warning("No se encontraron centros de reciclaje con esos filtros.")
 
         # 8. VISUALIZACIÓN DE PROGRAMACIÓN LÓGICA (Motor de Reglas)
         st.markdown("---")
         with st.expander("Ver Recomendaciones del Motor Lógico (de Firebase)"):
-            if filtered_centros:
-                resultados_logicos = recomendador.aplicar_motor_logico(filtered_centros)
+            if len(filtered_ids):
+                # Las conclusiones ya están calculadas por centro (vista materializada del catálogo);
+                # sin cercanía, horario ni búsqueda dependen solo de la selección y se sirven de la caché
+                if distancias_km is None and modo_horario == "Cualquiera" and not texto_busqueda and not combinar:
+                    resultados_logicos = recomendador.get_conclusiones_por_materiales(selected_materials)
+                else:
+                    resultados_logicos = recomendador.get_conclusiones_por_ids(filtered_ids)
                 st.info("El motor comparó los centros filtrados contra las reglas de Firebase.")
 
                 if resultados_logicos:
@@ -345,5 +449,19 @@ try:
                 st.warning("No hay centros para aplicar el motor lógico.")
 
 except Exception as e:
+    METRICAS.contar("errores")
     st.error(f"Ocurrió un error inesperado en la aplicación: {e}")
-    st.exception(e)
\ No newline at end of file
+    st.exception(e)
+finally:
+    METRICAS.observar("rerun", (time.perf_counter() - inicio_rerun) * 1000)
+    PERFIL_MEMORIA.terminar_rerun("Mapa", inicio_memoria)
+    contexto = get_script_run_ctx()
+    if contexto is not None:
+        # Lo que crece son los resultados guardados (ver resultados_de_sesion); la selección de
+        # materiales es un widget: nunca se expulsa
+        PRESUPUESTO_SESION.revisar(contexto.session_id, st.session_state, protegidas={"materiales"})
+
+# 9. DIAGNÓSTICO OCULTO (no aparece en la navegación; se abre agregando ?diagnostico=1 a la URL)
+if st.query_params.get("diagnostico") == "1":
+    db_diagnostico = init_firebase()
+    mostrar_diagnostico(iniciar_cache_resultados(db_diagnostico) if db_diagnostico else None)
\ No newline at end of file
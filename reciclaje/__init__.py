@@ -0,0 +1 @@
+# Motor del buscador de centros de reciclaje (modelos e índices), independiente de Streamlit.
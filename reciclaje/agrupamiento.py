@@ -0,0 +1,180 @@
+# ====================================================================
+# --- AGRUPAMIENTO DEL MAPA POR NIVEL DE ZOOM ---
+# ====================================================================
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:  # pandas se importa al armar el primer DataFrame, no al cargar la página
+    import pandas as pd
+
+NIVEL_MAX = 24            # Resolución de la rejilla precalculada: 2^24 celdas por lado del mundo
+PIXELES_TESELA = 256      # Tamaño de una tesela de mapa web (Web Mercator)
+ANCHO_MAPA_PX = 800       # Tamaño aproximado del mapa en pantalla
+ALTO_MAPA_PX = 500
+MARGEN_VISTA = 0.5        # Se envía también medio mapa extra por lado, para que un paneo corto no quede vacío
+NIVELES_POR_GRUPO = 2     # Celda de grupo = 256 / 2^2 = 64 px en pantalla
+UMBRAL_PUNTOS = 300       # Si en la vista caben menos centros que esto, se mandan sueltos
+ZOOM_PUNTOS = 15          # Desde este zoom se mandan sueltos (mientras no pasen de MAX_PUNTOS)
+MAX_PUNTOS = 2000         # Tope de filas que se mandan al navegador en cualquier caso
+ZOOM_MIN, ZOOM_MAX = 1, 18
+LAT_MAX_MERCATOR = 85.05112878
+
+COLOR_GRUPO = "#e67e22"
+COLOR_CENTRO = "#27ae60"
+
+
+def a_mundo(lat, lon) -> Tuple[np.ndarray, np.ndarray]:
+    """Coordenadas Web Mercator normalizadas: x, y en [0, 1) (y crece hacia el sur)."""
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -LAT_MAX_MERCATOR, LAT_MAX_MERCATOR)
+    x = (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0
+    seno = np.sin(np.radians(lat))
+    y = 0.5 - np.log((1 + seno) / (1 - seno)) / (4 * np.pi)
+    return x, y
+
+
+def desde_mundo(x, y) -> Tuple[np.ndarray, np.ndarray]:
+    lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * np.asarray(y, dtype=np.float64)))))
+    return lat, np.asarray(x, dtype=np.float64) * 360.0 - 180.0
+
+
+def metros_por_pixel(lat: float, zoom: int) -> float:
+    return 156543.03392 * np.cos(np.radians(lat)) / (2 ** zoom)
+
+
+class VistaMapa:
+    """Lo que se dibuja en el mapa: grupos (con su cuenta) o centros sueltos, ya recortados a la vista."""
+
+    def __init__(self, lats: np.ndarray, lons: np.ndarray, cuentas: np.ndarray, zoom: int,
+                 centro: Tuple[float, float], agrupado: bool, total: int):
+        self.lats = lats
+        self.lons = lons
+        self.cuentas = cuentas
+        self.zoom = zoom
+        self.centro = centro
+        self.agrupado = agrupado
+        self.total = total  # Centros dentro de la vista (antes de agrupar)
+
+    def __len__(self):
+        return len(self.lats)
+
+    def a_dataframe(self) -> 'pd.DataFrame':
+        """lat, lon, centros, radio_m y color, listo para st.map(size="radio_m", color="color")."""
+        import pandas as pd
+
+        # Radio en pantalla: 5 px para un centro, crece con el logaritmo del tamaño del grupo
+        radio_px = np.clip(5 + 3 * np.log2(np.maximum(self.cuentas, 1)), 5, 30)
+        return pd.DataFrame({
+            "lat": self.lats,
+            "lon": self.lons,
+            "centros": self.cuentas,
+            "radio_m": radio_px * metros_por_pixel(self.centro[0], self.zoom),
+            "color": np.where(self.cuentas > 1, COLOR_GRUPO, COLOR_CENTRO),
+        }, copy=False)
+
+
+class AgrupadorMapa:
+    """
+    Rejilla jerárquica (tipo quadtree) sobre las coordenadas de los centros.
+
+    Cada centro se cuantiza UNA vez a enteros (qx, qy) en una rejilla Web
+    Mercator de 2^NIVEL_MAX por lado. La celda de cualquier nivel de zoom más
+    grueso sale de un corrimiento de bits, así que agrupar es un conteo
+    (np.bincount) sobre los centros que caen en la vista. El número de filas enviadas depende del
+    tamaño del mapa en pantalla, no del tamaño del catálogo.
+    """
+
+    def __init__(self, lats: np.ndarray, lons: np.ndarray):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        escala = 1 << NIVEL_MAX
+        x, y = a_mundo(self.lats, self.lons)
+        self._qx = np.clip((x * escala).astype(np.int64), 0, escala - 1)
+        self._qy = np.clip((y * escala).astype(np.int64), 0, escala - 1)
+
+    def a_arreglos(self) -> Dict[str, np.ndarray]:
+        return {"qx": self._qx, "qy": self._qy}
+
+    @classmethod
+    def desde_arreglos(cls, arreglos: Dict[str, np.ndarray], lats: np.ndarray, lons: np.ndarray) -> 'AgrupadorMapa':
+        agrupador = cls.__new__(cls)
+        agrupador.lats, agrupador.lons = lats, lons
+        agrupador._qx, agrupador._qy = arreglos["qx"], arreglos["qy"]
+        return agrupador
+
+    def __len__(self):
+        return len(self.lats)
+
+    def zoom_para(self, ids: np.ndarray, ancho_px: int = ANCHO_MAPA_PX, alto_px: int = ALTO_MAPA_PX) -> int:
+        """El zoom más alto en el que todos los centros indicados caben en el mapa."""
+        if len(ids) == 0:
+            return ZOOM_MIN
+        qx, qy = self._qx[ids], self._qy[ids]
+        ancho = (int(qx.max()) - int(qx.min()) + 1) / (1 << NIVEL_MAX) * PIXELES_TESELA
+        alto = (int(qy.max()) - int(qy.min()) + 1) / (1 << NIVEL_MAX) * PIXELES_TESELA
+        zoom = int(np.floor(np.log2(min(ancho_px / ancho, alto_px / alto))))
+        return int(np.clip(zoom, ZOOM_MIN, ZOOM_MAX))
+
+    def centro_de(self, ids: np.ndarray) -> Tuple[float, float]:
+        """Centro del rectángulo que encierra a los centros indicados."""
+        if len(ids) == 0:
+            return 0.0, 0.0
+        qx, qy = self._qx[ids], self._qy[ids]
+        escala = float(1 << NIVEL_MAX)
+        lat, lon = desde_mundo((int(qx.min()) + int(qx.max())) / 2 / escala,
+                               (int(qy.min()) + int(qy.max())) / 2 / escala)
+        return float(lat), float(lon)
+
+    def _en_vista(self, ids: np.ndarray, zoom: int, centro: Tuple[float, float],
+                  ancho_px: int, alto_px: int) -> np.ndarray:
+        # Pixeles de pantalla -> unidades de la rejilla a este zoom
+        unidades_por_px = (1 << NIVEL_MAX) / (PIXELES_TESELA * 2 ** zoom)
+        medio_ancho = ancho_px * (0.5 + MARGEN_VISTA) * unidades_por_px
+        medio_alto = alto_px * (0.5 + MARGEN_VISTA) * unidades_por_px
+        cx, cy = a_mundo(centro[0], centro[1])
+        cx, cy = float(cx) * (1 << NIVEL_MAX), float(cy) * (1 << NIVEL_MAX)
+        qx, qy = self._qx[ids], self._qy[ids]
+        dentro = (np.abs(qx - cx) <= medio_ancho) & (np.abs(qy - cy) <= medio_alto)
+        return ids[dentro]
+
+    def vista(self, ids: np.ndarray, zoom: Optional[int] = None, centro: Optional[Tuple[float, float]] = None,
+              ancho_px: int = ANCHO_MAPA_PX, alto_px: int = ALTO_MAPA_PX) -> VistaMapa:
+        """
+        Grupos o centros sueltos para dibujar `ids` con el zoom y centro dados
+        (por defecto, los que encuadran a todos los ids).
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if zoom is None:
+            zoom = self.zoom_para(ids, ancho_px, alto_px)
+        if centro is None:
+            centro = self.centro_de(ids)
+        zoom = int(np.clip(zoom, ZOOM_MIN, ZOOM_MAX))
+        visibles = self._en_vista(ids, zoom, centro, ancho_px, alto_px)
+        total = len(visibles)
+
+        if total <= MAX_PUNTOS and (total <= UMBRAL_PUNTOS or zoom >= ZOOM_PUNTOS):
+            return VistaMapa(self.lats[visibles], self.lons[visibles], np.ones(total, dtype=np.int64),
+                             zoom, centro, agrupado=False, total=total)
+
+        qx, qy = self._qx[visibles], self._qy[visibles]
+        nivel = min(zoom + NIVELES_POR_GRUPO, NIVEL_MAX)
+        while True:
+            corrimiento = NIVEL_MAX - nivel
+            # Celdas relativas a la esquina de la vista: el rango es chico (del tamaño de la pantalla),
+            # así que se cuentan con bincount en lugar de ordenar con np.unique
+            cx, cy = qx >> corrimiento, qy >> corrimiento
+            cx -= cx.min()
+            cy -= cy.min()
+            alto_celdas = int(cy.max()) + 1
+            conteos = np.bincount(cx * alto_celdas + cy)
+            ocupadas = np.flatnonzero(conteos)
+            # Con la vista acotada esto casi nunca se repite; es solo un tope duro por si acaso
+            if len(ocupadas) <= MAX_PUNTOS or nivel == 0:
+                break
+            nivel -= 1
+        claves = cx * alto_celdas + cy
+        cuentas = conteos[ocupadas]
+        # Cada grupo se dibuja en el promedio de sus centros, no en el centro de la celda
+        lats = np.bincount(claves, weights=self.lats[visibles])[ocupadas] / cuentas
+        lons = np.bincount(claves, weights=self.lons[visibles])[ocupadas] / cuentas
+        return VistaMapa(lats, lons, cuentas, zoom, centro, agrupado=True, total=total)
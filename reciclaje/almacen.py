@@ -0,0 +1,163 @@
+# ====================================================================
+# --- ALMACÉN COLUMNAR DE CENTROS (para la interfaz) ---
+# ====================================================================
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:  # pandas se importa al construir el almacén (primer acceso a datos)
+    import pandas as pd
+
+from reciclaje.modelos import CentroReciclaje
+
+COLUMNAS_TABLA = ("nombre", "lat", "lon", "horario", "ubicacion", "materiales")
+COLUMNAS_ORDENABLES = ("nombre", "ubicacion", "horario")
+TAM_PAGINA_TABLA = 50
+
+
+def posiciones_ordenadas(claves: np.ndarray, inicio: int, fin: int) -> np.ndarray:
+    """
+    Posiciones que ocuparían los lugares inicio..fin-1 si se ordenara `claves`, sin ordenar todo:
+    argpartition deja en su lugar final los extremos de la página (O(n)) y solo se ordena la página.
+    """
+    if fin <= inicio:
+        return np.empty(0, dtype=np.int64)
+    particion = np.argpartition(claves, sorted({inicio, fin - 1}))
+    pagina = particion[inicio:fin]
+    return pagina[np.argsort(claves[pagina], kind='stable')]
+
+
+class AlmacenCentros:
+    """
+    Guarda los centros en columnas (arreglos NumPy) en lugar de un objeto por fila.
+
+    Los materiales se guardan como ids enteros en formato CSR: los del centro i
+    son `material_ids[offsets[i]:offsets[i + 1]]`. La tabla que se muestra en la
+    interfaz (con el texto de materiales ya capitalizado) se construye UNA vez;
+    en cada rerun solo se toman las filas filtradas por posición.
+    """
+
+    def __init__(self, centros: List[CentroReciclaje]):
+        n = len(centros)
+        self.nombre = np.array([c.nombre for c in centros], dtype=object)
+        self.lat = np.fromiter((c.lat for c in centros), dtype=np.float64, count=n)
+        self.lon = np.fromiter((c.lon for c in centros), dtype=np.float64, count=n)
+        self.horario = np.array([c.horario for c in centros], dtype=object)
+        self.ubicacion = np.array([c.ubicacion for c in centros], dtype=object)
+
+        self.vocabulario: List[str] = []
+        ids_por_material: Dict[str, int] = {}
+        offsets = [0]
+        material_ids = []
+        for centro in centros:
+            for material in centro.materiales:
+                if material not in ids_por_material:
+                    ids_por_material[material] = len(self.vocabulario)
+                    self.vocabulario.append(material)
+                material_ids.append(ids_por_material[material])
+            offsets.append(len(material_ids))
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.material_ids = np.array(material_ids, dtype=np.int32)
+
+        # Texto de materiales para la tabla, formateado una sola vez por centro
+        materiales_texto = np.array(
+            [", ".join(m.capitalize() for m in c.materiales) for c in centros], dtype=object)
+
+        import pandas as pd
+
+        self.tabla = pd.DataFrame({
+            "nombre": self.nombre,
+            "lat": self.lat,
+            "lon": self.lon,
+            "horario": self.horario,
+            "ubicacion": self.ubicacion,
+            "materiales": materiales_texto,
+        }, columns=COLUMNAS_TABLA, copy=False)
+        self._rangos: Dict[str, np.ndarray] = {}
+
+    def a_arreglos(self) -> Dict[str, np.ndarray]:
+        """
+        Columnas numéricas y rangos de orden como arreglos planos (ver reciclaje/compartido.py).
+        El texto (nombre, horario, ubicación, materiales) viaja aparte, como tabla Arrow.
+        """
+        arreglos = {"lat": self.lat, "lon": self.lon, "offsets": self.offsets, "material_ids": self.material_ids,
+                    "vocabulario": np.array(self.vocabulario, dtype=str)}
+        for columna in COLUMNAS_ORDENABLES:
+            arreglos[f"rango_{columna}"] = self._rango(columna)
+        return arreglos
+
+    @classmethod
+    def desde_arreglos(cls, arreglos: Dict[str, np.ndarray], tabla: 'pd.DataFrame') -> 'AlmacenCentros':
+        """
+        Reconstruye el almacén sobre arreglos y una tabla ya existentes (p. ej. en memoria compartida),
+        sin copiarlos. Los rangos de orden vienen precalculados.
+        """
+        almacen = cls.__new__(cls)
+        almacen.lat, almacen.lon = arreglos["lat"], arreglos["lon"]
+        almacen.offsets, almacen.material_ids = arreglos["offsets"], arreglos["material_ids"]
+        almacen.vocabulario = arreglos["vocabulario"].tolist()
+        almacen.tabla = tabla
+        almacen.nombre = tabla["nombre"].array
+        almacen.horario = tabla["horario"].array
+        almacen.ubicacion = tabla["ubicacion"].array
+        almacen._rangos = {columna: arreglos[f"rango_{columna}"] for columna in COLUMNAS_ORDENABLES}
+        return almacen
+
+    def __len__(self):
+        return len(self.lat)
+
+    def materiales_de(self, idx: int) -> List[str]:
+        ids = self.material_ids[self.offsets[idx]:self.offsets[idx + 1]]
+        return [self.vocabulario[i] for i in ids]
+
+    def conteo_materiales(self, ids: np.ndarray) -> Dict[str, int]:
+        """Cuántos de los centros `ids` aceptan cada material (solo los distintos de cero)."""
+        inicios, fines = self.offsets[ids], self.offsets[np.asarray(ids) + 1]
+        largos = fines - inicios
+        # Posiciones de material_ids de todos los centros pedidos, sin un ciclo por centro
+        posiciones = np.repeat(fines - np.cumsum(largos), largos) + np.arange(int(largos.sum()))
+        conteos = np.bincount(self.material_ids[posiciones], minlength=len(self.vocabulario))
+        return {self.vocabulario[i]: int(conteos[i]) for i in np.flatnonzero(conteos)}
+
+    def _es_todo(self, ids: np.ndarray) -> bool:
+        """True si `ids` son todas las filas en su orden original (no hace falta tomar nada)."""
+        return len(ids) == len(self) and (len(ids) == 0 or bool(np.all(ids[1:] > ids[:-1])))
+
+    def tabla_de(self, ids: np.ndarray) -> 'pd.DataFrame':
+        """Filas de la tabla para los ids filtrados (sin copiar nada si el filtro no descartó ningún centro)."""
+        if self._es_todo(ids):
+            return self.tabla
+        return self.tabla.take(ids).reset_index(drop=True)
+
+    def _rango(self, columna: str) -> np.ndarray:
+        """Lugar de cada centro al ordenar por `columna`; se calcula una vez por catálogo y columna."""
+        rango = self._rangos.get(columna)
+        if rango is None:
+            orden = np.argsort(getattr(self, columna), kind='stable')
+            rango = np.empty(len(orden), dtype=np.int64)
+            rango[orden] = np.arange(len(orden))
+            self._rangos[columna] = rango
+        return rango
+
+    def pagina_de(self, ids: np.ndarray, pagina: int, tam_pagina: int = TAM_PAGINA_TABLA,
+                  orden_por: Optional[str] = None, descendente: bool = False,
+                  distancias: Optional[np.ndarray] = None) -> 'pd.DataFrame':
+        """
+        Solo las filas de la página `pagina` (0 = primera) de los ids filtrados.
+
+        El orden se resuelve aquí sobre enteros (el rango precalculado de la columna, o la
+        distancia) y únicamente se toman de la tabla las filas visibles, así que la página N
+        de 100k resultados cuesta lo mismo que la primera. `orden_por=None` respeta el orden
+        de `ids`; "distancia_km" ordena por `distancias` (alineadas con `ids`).
+        """
+        inicio = min(pagina * tam_pagina, len(ids))
+        fin = min(inicio + tam_pagina, len(ids))
+        if orden_por is None:
+            posiciones = np.arange(inicio, fin)
+        else:
+            claves = distancias if orden_por == "distancia_km" else self._rango(orden_por)[ids]
+            posiciones = posiciones_ordenadas(-claves if descendente else claves, inicio, fin)
+        filas = self.tabla.take(ids[posiciones]).reset_index(drop=True)
+        if distancias is not None:
+            filas = filas.assign(distancia_km=np.round(distancias[posiciones], 2))
+        return filas
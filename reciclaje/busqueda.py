@@ -0,0 +1,209 @@
+# ====================================================================
+# --- BÚSQUEDA DE TEXTO (nombre y ubicación) TOLERANTE A ERRORES ---
+# ====================================================================
+import bisect
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from reciclaje.modelos import CentroReciclaje
+
+_PALABRA = re.compile(r"[a-z0-9ñ]+")
+
+# Puntaje de un término según cómo coincide con una palabra del centro
+PUNTAJE_EXACTO = 3.0
+PUNTAJE_PREFIJO = 2.0
+PUNTAJE_APROXIMADO = 1.0
+BONO_UBICACION = 0.5  # La colonia pesa un poco más que el nombre
+
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas y sin acentos ("Coyoacán" -> "coyoacan"); la ñ se conserva."""
+    texto = texto.lower().replace("ñ", "\0")
+    sin_acentos = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in sin_acentos if not unicodedata.combining(c)).replace("\0", "ñ")
+
+
+def palabras(texto: str) -> List[str]:
+    return _PALABRA.findall(normalizar_texto(texto or ""))
+
+
+def _trigramas(palabra: str) -> List[str]:
+    # Relleno solo al inicio: así los trigramas de un prefijo son un subconjunto de los de la palabra
+    relleno = "$$" + palabra
+    return [relleno[i:i + 3] for i in range(len(palabra))]
+
+
+def _distancia_prefijo(termino: str, palabra: str, maximo: int) -> int:
+    """
+    Menor distancia de edición entre `termino` y un inicio de `palabra` (de len(termino) ± maximo
+    letras, o la palabra completa si es más corta), contando el intercambio de dos letras vecinas
+    como un solo error: "cntro", "centtro" y "cetnro" están a 1 de "centro". Corta en cuanto se
+    sabe que pasa de `maximo`.
+    """
+    if len(palabra) < len(termino) - maximo:
+        return maximo + 1
+    # Los inicios más largos que len(termino) + maximo ya no pueden quedar a <= maximo
+    b = palabra[:len(termino) + maximo]
+    antepenultima, previa = None, list(range(len(b) + 1))
+    for i, ca in enumerate(termino, 1):
+        actual = [i]
+        for j, cb in enumerate(b, 1):
+            costo = min(previa[j] + 1, actual[j - 1] + 1, previa[j - 1] + (ca != cb))
+            if antepenultima is not None and j > 1 and ca == b[j - 2] and termino[i - 2] == cb:
+                costo = min(costo, antepenultima[j - 2] + 1)
+            actual.append(costo)
+        if min(actual) > maximo and min(previa) > maximo:
+            return maximo + 1
+        antepenultima, previa = previa, actual
+    # La última fila tiene la distancia del término a cada inicio b[:j]
+    return min(previa[max(0, len(termino) - maximo):])
+
+
+def errores_permitidos(termino: str) -> int:
+    """Los números (p. ej. el de sucursal) se buscan solo por prefijo: un "error" ahí es otro centro."""
+    if termino.isdigit():
+        return 0
+    return 0 if len(termino) < 4 else 1 if len(termino) < 7 else 2
+
+
+class IndiceTexto:
+    """
+    Índice invertido de palabras de `nombre` y `ubicacion`.
+
+    - Vocabulario ordenado: los prefijos se resuelven con búsqueda binaria.
+    - Trigramas del vocabulario: para un término con errores solo se calcula la
+      distancia de edición contra las palabras que comparten suficientes trigramas.
+    - Cada palabra apunta a los centros que la contienen (formato CSR).
+
+    El puntaje se acumula en un arreglo por centro, así que combinarlo con el
+    filtro de materiales es una máscara.
+    """
+
+    def __init__(self, centros: List[CentroReciclaje]):
+        self._n = len(centros)
+        postings: Dict[str, Dict[int, bool]] = {}
+        palabras_ubicacion: Dict[str, List[str]] = {}  # Las colonias se repiten: se normalizan una vez
+        for idx, centro in enumerate(centros):
+            for palabra in palabras(centro.nombre):
+                postings.setdefault(palabra, {}).setdefault(idx, False)
+            ubicacion = palabras_ubicacion.get(centro.ubicacion)
+            if ubicacion is None:
+                ubicacion = palabras_ubicacion[centro.ubicacion] = palabras(centro.ubicacion)
+            for palabra in ubicacion:
+                postings.setdefault(palabra, {})[idx] = True  # True = aparece en la ubicación
+
+        self.vocabulario: List[str] = sorted(postings)
+        offsets = [0]
+        ids, en_ubicacion = [], []
+        for palabra in self.vocabulario:
+            centros_palabra = postings[palabra]
+            ids.extend(centros_palabra)
+            en_ubicacion.extend(centros_palabra.values())
+            offsets.append(len(ids))
+        self._offsets = np.array(offsets, dtype=np.int64)
+        self._ids = np.array(ids, dtype=np.int64)
+        self._en_ubicacion = np.array(en_ubicacion, dtype=bool)
+
+        por_trigrama: Dict[str, List[int]] = {}
+        for idx, palabra in enumerate(self.vocabulario):
+            if palabra.isdigit():
+                continue
+            for trigrama in set(_trigramas(palabra)):
+                por_trigrama.setdefault(trigrama, []).append(idx)
+        self._por_trigrama = {t: np.array(p, dtype=np.int32) for t, p in por_trigrama.items()}
+
+    def a_arreglos(self) -> Dict[str, np.ndarray]:
+        trigramas = sorted(self._por_trigrama)
+        palabras_trigrama = [self._por_trigrama[t] for t in trigramas]
+        return {
+            "n": np.array([self._n]), "vocabulario": np.array(self.vocabulario, dtype=str),
+            "offsets": self._offsets, "ids": self._ids, "en_ubicacion": self._en_ubicacion,
+            "trigramas": np.array(trigramas, dtype=str),
+            "trigramas_offsets": np.cumsum([0] + [len(p) for p in palabras_trigrama], dtype=np.int64),
+            "trigramas_palabras": np.concatenate(palabras_trigrama) if palabras_trigrama
+            else np.empty(0, dtype=np.int32),
+        }
+
+    @classmethod
+    def desde_arreglos(cls, arreglos: Dict[str, np.ndarray]) -> 'IndiceTexto':
+        """Reconstruye el índice: los postings quedan en los arreglos tal cual; el vocabulario vuelve a ser lista."""
+        indice = cls.__new__(cls)
+        indice._n = int(arreglos["n"][0])
+        indice.vocabulario = arreglos["vocabulario"].tolist()
+        indice._offsets, indice._ids = arreglos["offsets"], arreglos["ids"]
+        indice._en_ubicacion = arreglos["en_ubicacion"]
+        offsets, palabras_trigrama = arreglos["trigramas_offsets"], arreglos["trigramas_palabras"]
+        indice._por_trigrama = {t: palabras_trigrama[offsets[i]:offsets[i + 1]]
+                                for i, t in enumerate(arreglos["trigramas"].tolist())}
+        return indice
+
+    def _prefijo(self, termino: str) -> Tuple[int, int]:
+        """Rango [inicio, fin) del vocabulario con las palabras que empiezan con `termino`."""
+        inicio = bisect.bisect_left(self.vocabulario, termino)
+        fin = bisect.bisect_left(self.vocabulario, termino + "\uffff")
+        return inicio, fin
+
+    def _sumar_palabras(self, puntajes: np.ndarray, desde: int, hasta: int, puntaje: float):
+        """Aplica `puntaje` a los centros de las palabras desde..hasta-1 (contiguas en el CSR)."""
+        inicio, fin = self._offsets[desde], self._offsets[hasta]
+        valor = puntaje + BONO_UBICACION * self._en_ubicacion[inicio:fin]
+        # maximum.at: un centro puede aparecer varias veces (varias palabras con el mismo prefijo)
+        np.maximum.at(puntajes, self._ids[inicio:fin], valor.astype(np.float32))
+
+    def _aproximadas(self, termino: str) -> List[Tuple[int, int]]:
+        """(id de palabra, errores) de las palabras cuyo inicio está a <= errores_permitidos del término."""
+        maximo = errores_permitidos(termino)
+        if maximo == 0:
+            return []
+        trigramas = [self._por_trigrama[t] for t in set(_trigramas(termino)) if t in self._por_trigrama]
+        if not trigramas:
+            return []
+        # Lema de q-gramas: cada error destruye a lo más 3 trigramas (4 si es un intercambio de letras)
+        compartidos = np.bincount(np.concatenate(trigramas), minlength=len(self.vocabulario))
+        minimo = max(1, len(set(_trigramas(termino))) - 4 * maximo)
+        resultado = []
+        for idx in np.flatnonzero(compartidos >= minimo):
+            palabra = self.vocabulario[idx]
+            errores = _distancia_prefijo(termino, palabra, maximo)
+            if errores <= maximo:
+                resultado.append((int(idx), errores))
+        return resultado
+
+    def _puntajes_termino(self, termino: str) -> np.ndarray:
+        puntajes = np.zeros(self._n, dtype=np.float32)
+        inicio, fin = self._prefijo(termino)
+        # Todas las palabras con el prefijo son un solo tramo del vocabulario (y de los postings)
+        if inicio < fin:
+            self._sumar_palabras(puntajes, inicio, fin, PUNTAJE_PREFIJO)
+            if self.vocabulario[inicio] == termino:
+                self._sumar_palabras(puntajes, inicio, inicio + 1, PUNTAJE_EXACTO)
+        for idx, errores in self._aproximadas(termino):
+            if not inicio <= idx < fin:
+                self._sumar_palabras(puntajes, idx, idx + 1, PUNTAJE_APROXIMADO - 0.25 * errores)
+        return puntajes
+
+    def buscar(self, texto: str, permitidos: Optional[np.ndarray] = None,
+               limite: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Centros que coinciden con TODAS las palabras de `texto` (por prefijo o con pocos errores),
+        de mayor a menor puntaje. `permitidos` es una máscara booleana opcional (p. ej. el filtro
+        de materiales). Devuelve (ids, puntajes).
+        """
+        terminos = palabras(texto)
+        if not terminos or self._n == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        total = np.zeros(self._n, dtype=np.float32)
+        validos = np.ones(self._n, dtype=bool) if permitidos is None else permitidos.copy()
+        for termino in terminos:
+            puntajes = self._puntajes_termino(termino)
+            validos &= puntajes > 0
+            total += puntajes
+        ids = np.flatnonzero(validos)
+        # Mayor puntaje primero; a igual puntaje, el orden original
+        orden = np.lexsort((ids, -total[ids]))
+        if limite is not None:
+            orden = orden[:limite]
+        return ids[orden], total[ids[orden]]
@@ -0,0 +1,101 @@
+# ====================================================================
+# --- CACHÉ LRU DE RESULTADOS (compartida entre sesiones) ---
+# ====================================================================
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Tuple
+
+import numpy as np
+
+PRESUPUESTO_POR_DEFECTO = 64 * 1024 * 1024  # 64 MB
+
+
+def normalizar_seleccion(materiales: Iterable[str]) -> Tuple[str, ...]:
+    """["Vidrio", "pet", "Pet"] -> ("pet", "vidrio"): el orden y las mayúsculas no cambian el resultado."""
+    return tuple(sorted({m.lower() for m in materiales}))
+
+
+def tamano_aproximado(valor) -> int:
+    """Bytes aproximados de un resultado (arreglos NumPy, dicts/listas/tuplas de ellos y texto)."""
+    if isinstance(valor, np.ndarray):
+        return sys.getsizeof(valor) + (0 if valor.base is None else valor.nbytes)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamano_aproximado(k) + tamano_aproximado(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(tamano_aproximado(v) for v in valor)
+    return sys.getsizeof(valor)
+
+
+class CacheLRU:
+    """
+    Caché LRU acotada por memoria (no por número de entradas).
+
+    Pensada para los resultados que dependen solo de la selección de materiales y de
+    la versión del catálogo; la clave debe incluir esa versión. invalidar() la vacía
+    cuando el sincronizador publica datos nuevos. Los arreglos guardados se marcan
+    de solo lectura porque los comparten todas las sesiones.
+    """
+
+    def __init__(self, presupuesto_bytes: int = PRESUPUESTO_POR_DEFECTO):
+        self.presupuesto_bytes = presupuesto_bytes
+        self._lock = threading.Lock()
+        self._entradas: 'OrderedDict[Hashable, Tuple[object, int]]' = OrderedDict()
+        self.bytes_usados = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self.invalidaciones = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def obtener(self, clave: Hashable, calcular: Callable[[], object]):
+        """Devuelve el valor guardado para `clave` o lo calcula (fuera del candado) y lo guarda."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return entrada[0]
+            self.fallos += 1
+
+        valor = calcular()
+        if isinstance(valor, np.ndarray):
+            valor.flags.writeable = False
+        tamano = tamano_aproximado(valor)
+        if tamano > self.presupuesto_bytes:
+            return valor  # No cabe ni sola: no se guarda
+
+        with self._lock:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self.bytes_usados -= anterior[1]
+            self._entradas[clave] = (valor, tamano)
+            self.bytes_usados += tamano
+            while self.bytes_usados > self.presupuesto_bytes:
+                _, (_, tamano_viejo) = self._entradas.popitem(last=False)
+                self.bytes_usados -= tamano_viejo
+                self.expulsiones += 1
+        return valor
+
+    def invalidar(self, *_):
+        """Vacía la caché (se puede registrar directamente con SincronizadorCatalogo.suscribir)."""
+        with self._lock:
+            self._entradas.clear()
+            self.bytes_usados = 0
+            self.invalidaciones += 1
+
+    def estadisticas(self) -> Dict[str, float]:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "bytes_usados": self.bytes_usados,
+                "presupuesto_bytes": self.presupuesto_bytes,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 3) if consultas else 0.0,
+                "expulsiones": self.expulsiones,
+                "invalidaciones": self.invalidaciones,
+            }
@@ -0,0 +1,85 @@
+# ====================================================================
+# --- CARGA CONCURRENTE Y PAGINADA DESDE FIRESTORE ---
+# ====================================================================
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+# Solo los campos que usa CentroReciclaje (más 'updated_at' para la sincronización incremental).
+CAMPOS_CENTROS = ('nombre', 'lat', 'lon', 'horario', 'materiales', 'ubicacion', 'updated_at')
+# Las reglas no se proyectan: sus condiciones viven en campos 'condicion1', 'condicion2', ... sin
+# límite fijo, y Firestore no permite proyectar por prefijo de nombre.
+CAMPOS_REGLAS = None
+
+TAM_PAGINA = 500
+
+
+class InformeCarga:
+    """Cuántos documentos y páginas se leyeron de una colección y cuánto tardó."""
+
+    def __init__(self, coleccion: str):
+        self.coleccion = coleccion
+        self.documentos = 0
+        self.paginas = 0
+        self.segundos = 0.0
+
+    def __repr__(self):
+        return (f"{self.coleccion}: {self.documentos} documentos en {self.paginas} páginas "
+                f"({self.segundos * 1000:.0f} ms)")
+
+
+def leer_pagina(db, coleccion: str, tam_pagina: int = TAM_PAGINA, despues_de=None,
+                campos: Optional[Sequence[str]] = None) -> List:
+    """
+    Una sola página de `coleccion`: a lo más `tam_pagina` documentos, a partir del documento
+    `despues_de` (el último de la página anterior; None para la primera). Pensada para mostrar
+    una colección grande de a poco, guardando el cursor entre reruns.
+    """
+    consulta = db.collection(coleccion)
+    if campos is not None:
+        consulta = consulta.select(list(campos))
+    consulta = consulta.limit(tam_pagina)
+    if despues_de is not None:
+        consulta = consulta.start_after(despues_de)
+    return list(consulta.stream())
+
+
+def leer_paginado(db, coleccion: str, campos: Optional[Sequence[str]] = None, tam_pagina: int = TAM_PAGINA,
+                  informe: Optional[InformeCarga] = None) -> Iterator:
+    """
+    Recorre una colección completa en páginas de `tam_pagina` documentos usando cursores
+    (start_after del último documento), en lugar de un único .stream() sin límite.
+    """
+    ultimo = None
+    while True:
+        pagina = leer_pagina(db, coleccion, tam_pagina, ultimo, campos)
+        if informe is not None:
+            informe.paginas += 1
+            informe.documentos += len(pagina)
+        yield from pagina
+        if len(pagina) < tam_pagina:
+            return
+        ultimo = pagina[-1]
+
+
+def cargar_colecciones(db, destinos: Dict[str, Callable[[str, dict], object]],
+                       campos: Optional[Dict[str, Optional[Sequence[str]]]] = None,
+                       tam_pagina: int = TAM_PAGINA) -> Dict[str, InformeCarga]:
+    """
+    Lee varias colecciones AL MISMO TIEMPO (un hilo por colección), cada una paginada.
+    `destinos[coleccion]` recibe (doc_id, datos) por cada documento leído.
+    """
+    campos = campos or {}
+
+    def cargar(coleccion: str) -> InformeCarga:
+        informe = InformeCarga(coleccion)
+        inicio = time.perf_counter()
+        aplicar = destinos[coleccion]
+        for doc in leer_paginado(db, coleccion, campos.get(coleccion), tam_pagina, informe):
+            aplicar(doc.id, doc.to_dict())
+        informe.segundos = time.perf_counter() - inicio
+        return informe
+
+    with ThreadPoolExecutor(max_workers=len(destinos), thread_name_prefix="carga") as pool:
+        futuros = {coleccion: pool.submit(cargar, coleccion) for coleccion in destinos}
+        return {coleccion: futuro.result() for coleccion, futuro in futuros.items()}
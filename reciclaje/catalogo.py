@@ -0,0 +1,77 @@
+# ====================================================================
+# --- CATÁLOGO: FOTO INMUTABLE DE CENTROS + REGLAS E ÍNDICES ---
+# ====================================================================
+from functools import cached_property
+from typing import Dict, List, Optional
+
+from reciclaje.agrupamiento import AgrupadorMapa
+from reciclaje.almacen import AlmacenCentros
+from reciclaje.busqueda import IndiceTexto
+from reciclaje.conclusiones import VistaConclusiones
+from reciclaje.espacial import IndiceEspacial
+from reciclaje.horarios import IndiceHorarios
+from reciclaje.indices import IndiceMateriales, IndiceReglas
+from reciclaje.modelos import CentroReciclaje, Regla
+
+
+class Catalogo:
+    """
+    Una versión ("generación") de los datos cargados.
+
+    Nunca se modifica después de creada: cuando llegan cambios de Firebase se
+    publica un Catalogo nuevo con `version + 1`. Así un rerun que ya tomó una
+    versión ve siempre centros, reglas e índices consistentes entre sí. Los
+    índices se construyen la primera vez que alguien los pide.
+
+    Con `anterior`, la vista de conclusiones se deriva de la de esa versión
+    (solo se recalcula lo que cambió) en lugar de correr el motor completo.
+    """
+
+    def __init__(self, centros: List[CentroReciclaje], reglas: List[Regla], version: int = 0,
+                 indices: Optional[Dict[str, object]] = None, anterior: Optional['Catalogo'] = None):
+        self.centros = centros
+        self.reglas = reglas
+        self.version = version
+        # Solo se guarda la VISTA anterior (no el catálogo) para no encadenar todas las versiones en memoria
+        self._vista_anterior: Optional[VistaConclusiones] = None
+        if anterior is not None:
+            self._vista_anterior = anterior.__dict__.get('vista_conclusiones') or anterior._vista_anterior
+        # Índices ya calculados (p. ej. restaurados de disco): ocupan el lugar del cached_property
+        for nombre, indice in (indices or {}).items():
+            setattr(self, nombre, indice)
+
+    @cached_property
+    def indice_materiales(self) -> IndiceMateriales:
+        return IndiceMateriales(self.centros)
+
+    @cached_property
+    def indice_reglas(self) -> IndiceReglas:
+        return IndiceReglas(self.reglas)
+
+    @cached_property
+    def indice_espacial(self) -> IndiceEspacial:
+        return IndiceEspacial.desde_centros(self.centros)
+
+    @cached_property
+    def indice_horarios(self) -> IndiceHorarios:
+        return IndiceHorarios(self.centros)
+
+    @cached_property
+    def indice_texto(self) -> IndiceTexto:
+        return IndiceTexto(self.centros)
+
+    @cached_property
+    def almacen(self) -> AlmacenCentros:
+        return AlmacenCentros(self.centros)
+
+    @cached_property
+    def agrupador_mapa(self) -> AgrupadorMapa:
+        return AgrupadorMapa(self.almacen.lat, self.almacen.lon)
+
+    @cached_property
+    def vista_conclusiones(self) -> VistaConclusiones:
+        anterior, self._vista_anterior = self._vista_anterior, None
+        if anterior is None:
+            return VistaConclusiones.construir(self.centros, self.reglas, self.indice_reglas)
+        return VistaConclusiones.derivar(anterior, self.centros, self.reglas, self.indice_reglas,
+                                         self.indice_materiales)
@@ -0,0 +1,273 @@
+# ====================================================================
+# --- CATÁLOGO COMPARTIDO ENTRE PROCESOS (memory-map + generaciones) ---
+# ====================================================================
+# Con varios procesos de Streamlit en la misma máquina, st.cache_resource le da
+# a cada uno su propia copia de centros, reglas e índices: la memoria crece con
+# el número de procesos. Aquí UN proceso (el que obtiene el candado del
+# directorio) sincroniza con Firestore y publica cada versión del catálogo como
+# una "generación" en disco:
+#
+#     <directorio>/GENERACION          número de la generación vigente
+#     <directorio>/gen-00000042/       instantánea Arrow (ver instantanea.py)
+#                       arreglos/*.npy  índices como arreglos planos
+#                       tabla.arrow     texto de la tabla de la interfaz
+#
+# Los demás procesos abren esos archivos con memory-map (solo lectura): las
+# páginas las comparte el sistema operativo y no se copian al proceso. Cada
+# proceso revisa el número de generación y, cuando cambia, arma un Catalogo
+# nuevo sobre la generación nueva y lo cambia de un solo golpe, igual que con
+# las versiones del sincronizador. Si el proceso que publica termina, otro toma
+# el candado y sigue sincronizando desde la última generación.
+#
+# Se activa en pages/Mapa.py con la variable de entorno RECICLAJE_DIR_COMPARTIDO.
+import math
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from reciclaje.agrupamiento import AgrupadorMapa
+from reciclaje.almacen import AlmacenCentros
+from reciclaje.busqueda import IndiceTexto
+from reciclaje.catalogo import Catalogo
+from reciclaje.conclusiones import VistaConclusiones
+from reciclaje.espacial import IndiceEspacial
+from reciclaje.horarios import IndiceHorarios
+from reciclaje.instantanea import DatosInstantanea, Instantanea, _escribir_tabla, _leer_tabla
+from reciclaje.instrumentacion import METRICAS
+
+GENERACIONES_CONSERVADAS = 2  # La vigente y la anterior (un proceso puede estar cambiándose todavía)
+ESPERA_PRIMERA_GENERACION_S = 60.0
+
+# Índice del catálogo -> prefijo de sus arreglos en la generación
+_INDICES = {
+    "almacen": "almacen",
+    "indice_espacial": "espacial",
+    "agrupador_mapa": "agrupador",
+    "indice_horarios": "horarios",
+    "indice_texto": "texto",
+    "vista_conclusiones": "conclusiones",
+}
+
+
+class SegmentoCompartido:
+    """
+    Directorio de generaciones del catálogo. Tiene la misma interfaz que Instantanea (guardar/cargar),
+    así que el proceso que publica se lo pasa a SincronizadorCatalogo en su lugar: cada versión nueva
+    se publica desde el hilo de sincronización, con los índices ya construidos.
+    """
+
+    def __init__(self, directorio: str):
+        self.directorio = directorio
+        self._candado = None  # Archivo abierto con el candado exclusivo (solo en el proceso que publica)
+        os.makedirs(directorio, exist_ok=True)
+
+    @property
+    def ruta_generacion(self) -> str:
+        return os.path.join(self.directorio, "GENERACION")
+
+    def ruta_de(self, generacion: int) -> str:
+        return os.path.join(self.directorio, f"gen-{generacion:08d}")
+
+    def generacion(self) -> int:
+        """Número de la generación vigente (0 si todavía no se publica ninguna)."""
+        try:
+            with open(self.ruta_generacion, encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    # --- Proceso que publica ---
+    def intentar_publicar(self) -> bool:
+        """Toma el candado del directorio si está libre. Solo un proceso a la vez publica generaciones."""
+        if self._candado is not None:
+            return True
+        try:
+            import fcntl
+        except ImportError:
+            raise RuntimeError("El catálogo compartido (RECICLAJE_DIR_COMPARTIDO) necesita candados de archivo "
+                               "de POSIX (fcntl), que no existen en este sistema operativo") from None
+        archivo = open(os.path.join(self.directorio, "publicador.lock"), 'w')
+        try:
+            fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            archivo.close()
+            return False
+        self._candado = archivo  # El candado dura lo que el proceso (o hasta cerrar el archivo)
+        return True
+
+    def guardar(self, catalogo: Catalogo, ids_centros: List[str], ids_reglas: List[str],
+                cursores: Dict[str, Optional[datetime]], marcas: Optional[Dict[str, list]] = None):
+        """Escribe una generación nueva completa y solo entonces la marca como vigente."""
+        import pyarrow as pa
+
+        generacion = self.generacion() + 1
+        ruta = self.ruta_de(generacion)
+        with METRICAS.tramo("compartido.publicar", centros=len(catalogo.centros)):
+            Instantanea(ruta).guardar(catalogo, ids_centros, ids_reglas, cursores, marcas)
+            os.makedirs(os.path.join(ruta, "arreglos"))
+            for atributo, prefijo in _INDICES.items():
+                for nombre, arreglo in getattr(catalogo, atributo).a_arreglos().items():
+                    np.save(os.path.join(ruta, "arreglos", f"{prefijo}.{nombre}.npy"), np.ascontiguousarray(arreglo))
+            tabla = catalogo.almacen.tabla
+            _escribir_tabla(os.path.join(ruta, "tabla.arrow"), pa.Table.from_pandas(tabla, preserve_index=False))
+
+            temporal = self.ruta_generacion + ".tmp"
+            with open(temporal, 'w', encoding='utf-8') as f:
+                f.write(f"{generacion}\n")
+            os.replace(temporal, self.ruta_generacion)  # El cambio de generación es atómico
+        self._limpiar(generacion)
+        print(f"--- Generación {generacion} publicada en {self.directorio} ---")
+
+    def _limpiar(self, vigente: int):
+        # Un proceso que todavía tiene abiertos los archivos de una generación borrada los sigue leyendo sin
+        # problema (el sistema operativo libera el espacio cuando se cierra el último memory-map)
+        for nombre in os.listdir(self.directorio):
+            if nombre.startswith("gen-") and int(nombre[4:]) <= vigente - GENERACIONES_CONSERVADAS:
+                shutil.rmtree(os.path.join(self.directorio, nombre), ignore_errors=True)
+
+    def cargar(self) -> Optional[DatosInstantanea]:
+        """La generación vigente como instantánea normal (objetos propios, para seguir sincronizando)."""
+        generacion = self.generacion()
+        if generacion == 0:
+            return None
+        return Instantanea(self.ruta_de(generacion), ttl_s=math.inf).cargar()
+
+    # --- Procesos que solo leen ---
+    def adjuntar(self, generacion: Optional[int] = None) -> Optional[Catalogo]:
+        """
+        Catalogo de solo lectura sobre los archivos de la generación (vigente, si no se indica), sin
+        copiar los datos: centros, tabla e índices quedan en memory-map. La versión es la generación.
+        """
+        import pandas as pd
+
+        generacion = self.generacion() if generacion is None else generacion
+        if generacion == 0:
+            return None
+        ruta = self.ruta_de(generacion)
+        with METRICAS.tramo("compartido.adjuntar"):
+            datos = Instantanea(ruta, ttl_s=math.inf).cargar(perezosa=True)
+            if datos is None:
+                return None
+            arreglos: Dict[str, Dict[str, np.ndarray]] = {prefijo: {} for prefijo in _INDICES.values()}
+            for archivo in os.listdir(os.path.join(ruta, "arreglos")):
+                prefijo, nombre, _ = archivo.split(".")
+                # np.asarray quita la subclase memmap sin copiar
+                arreglos[prefijo][nombre] = np.asarray(np.load(os.path.join(ruta, "arreglos", archivo), mmap_mode='r'))
+
+            tabla = _leer_tabla(os.path.join(ruta, "tabla.arrow")).to_pandas(types_mapper=pd.ArrowDtype)
+            almacen = AlmacenCentros.desde_arreglos(arreglos["almacen"], tabla)
+            centros, reglas = datos.catalogo.centros, datos.catalogo.reglas
+            indices = {
+                "indice_materiales": datos.catalogo.indice_materiales,
+                "almacen": almacen,
+                "indice_espacial": IndiceEspacial.desde_arreglos(arreglos["espacial"], almacen.lat, almacen.lon),
+                "agrupador_mapa": AgrupadorMapa.desde_arreglos(arreglos["agrupador"], almacen.lat, almacen.lon),
+                "indice_horarios": IndiceHorarios.desde_arreglos(arreglos["horarios"]),
+                "indice_texto": IndiceTexto.desde_arreglos(arreglos["texto"]),
+                "vista_conclusiones": VistaConclusiones.desde_arreglos(arreglos["conclusiones"], centros, reglas),
+            }
+        return Catalogo(centros, reglas, version=generacion, indices=indices)
+
+
+class CatalogoCompartido:
+    """
+    Fuente del catálogo en modo compartido, con la misma interfaz que usa la página del
+    sincronizador (arrancar, catalogo, suscribir, iniciar_en_segundo_plano, detener).
+
+    Si este proceso obtiene el candado del segmento, crea el sincronizador con
+    `crear_sincronizador(segmento, version_inicial)` y publica generaciones. Si no, se adjunta a la generación
+    vigente y cada `intervalo_s` revisa si hay una nueva (o si el candado quedó libre).
+    """
+
+    def __init__(self, segmento: SegmentoCompartido, crear_sincronizador: Callable[[SegmentoCompartido, int], object],
+                 intervalo_s: float = 1.0):
+        self.segmento = segmento
+        self._crear_sincronizador = crear_sincronizador
+        self.intervalo_s = intervalo_s
+        self._sincronizador = None
+        self._catalogo = Catalogo([], [], version=0)
+        self._suscriptores: List[Callable[[Catalogo], None]] = []
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def publica(self) -> bool:
+        """True si este proceso es el que sincroniza con Firestore y publica las generaciones."""
+        return self._sincronizador is not None
+
+    @property
+    def catalogo(self) -> Catalogo:
+        return self._sincronizador.catalogo if self._sincronizador is not None else self._catalogo
+
+    def suscribir(self, callback: Callable[[Catalogo], None]):
+        self._suscriptores.append(callback)
+        if self._sincronizador is not None:
+            self._sincronizador.suscribir(callback)
+
+    def _convertirse_en_publicador(self) -> Catalogo:
+        print("--- Este proceso publica el catálogo compartido ---")
+        # Las versiones siguen desde la última generación adjuntada: las claves de la caché y la vista de
+        # conclusiones derivada de la versión anterior necesitan que `version` siempre crezca
+        sincronizador = self._crear_sincronizador(self.segmento, self._catalogo.version)
+        for callback in self._suscriptores:
+            sincronizador.suscribir(callback)
+        catalogo = sincronizador.arrancar()  # Desde la última generación, si hay una
+        self._sincronizador = sincronizador
+        return catalogo
+
+    def _adjuntar_vigente(self) -> bool:
+        """Cambia a la generación vigente si es distinta de la actual. True si cambió."""
+        generacion = self.segmento.generacion()
+        if generacion == 0 or generacion == self._catalogo.version:
+            return False
+        catalogo = self.segmento.adjuntar(generacion)
+        if catalogo is None:
+            return False
+        self._catalogo = catalogo
+        METRICAS.contar("compartido.cambios_generacion")
+        for callback in self._suscriptores:
+            callback(catalogo)
+        return True
+
+    def arrancar(self, espera_s: float = ESPERA_PRIMERA_GENERACION_S) -> Catalogo:
+        if self.segmento.intentar_publicar():
+            return self._convertirse_en_publicador()
+        # Otro proceso publica: se espera a que exista la primera generación
+        limite = time.monotonic() + espera_s
+        while not self._adjuntar_vigente() and self._catalogo.version == 0 and time.monotonic() < limite:
+            time.sleep(0.2)
+        print(f"--- Catálogo compartido adjuntado (generación {self._catalogo.version}, "
+              f"{len(self._catalogo.centros)} centros) ---")
+        return self._catalogo
+
+    def iniciar_en_segundo_plano(self):
+        if self._sincronizador is not None:
+            self._sincronizador.iniciar_en_segundo_plano()
+            return
+        if self._hilo is not None:
+            return
+
+        def ciclo():
+            while not self._detener.wait(self.intervalo_s):
+                try:
+                    if self.segmento.intentar_publicar():
+                        # El proceso que publicaba terminó: este toma su lugar
+                        self._convertirse_en_publicador()
+                        self._sincronizador.iniciar_en_segundo_plano()
+                        return
+                    self._adjuntar_vigente()
+                except Exception as e:
+                    print(f"--- ERROR al cambiar de generación del catálogo compartido: {e} ---")
+
+        self._hilo = threading.Thread(target=ciclo, name="catalogo-compartido", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._sincronizador is not None:
+            self._sincronizador.detener()
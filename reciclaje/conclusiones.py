@@ -0,0 +1,137 @@
+# ====================================================================
+# --- VISTA MATERIALIZADA: CONCLUSIONES DEL MOTOR LÓGICO POR CENTRO ---
+# ====================================================================
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from reciclaje.indices import IndiceMateriales, IndiceReglas
+from reciclaje.modelos import CentroReciclaje, Regla
+
+_NINGUNA: Tuple[int, ...] = ()
+
+
+class _DisparadasCSR:
+    """Reglas disparadas por centro guardadas en formato CSR (offsets + posiciones de regla), sin tuplas."""
+
+    def __init__(self, offsets: np.ndarray, reglas: np.ndarray):
+        self._offsets = offsets
+        self._reglas = reglas
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, idx: int) -> Tuple[int, ...]:
+        inicio, fin = self._offsets[idx], self._offsets[idx + 1]
+        return tuple(self._reglas[inicio:fin].tolist()) if fin > inicio else _NINGUNA
+
+
+class VistaConclusiones:
+    """
+    Qué reglas se disparan para cada centro, calculado una vez por catálogo.
+
+    Las conclusiones dependen solo de los campos del propio centro y de las
+    reglas, así que se guardan por posición de centro (como posiciones de regla,
+    en orden de la lista de reglas). Para una versión nueva del catálogo se
+    parte de la vista anterior: el sincronizador solo crea objetos nuevos para
+    los documentos que cambiaron, de modo que un centro que sigue siendo el
+    MISMO objeto conserva sus conclusiones, y solo se evalúan las reglas
+    nuevas o cambiadas.
+    """
+
+    def __init__(self, centros: List[CentroReciclaje], reglas: List[Regla], disparadas: List[Tuple[int, ...]]):
+        self.centros = centros
+        self.reglas = reglas
+        self._disparadas = disparadas
+
+    @classmethod
+    def construir(cls, centros: List[CentroReciclaje], reglas: List[Regla],
+                  indice_reglas: IndiceReglas) -> 'VistaConclusiones':
+        """Pasada completa del motor lógico (con el índice de reglas) sobre todos los centros."""
+        disparadas = []
+        for centro in centros:
+            ids = tuple(idx for idx in indice_reglas.reglas_candidatas(centro)
+                        if reglas[idx].checar_condiciones(centro))
+            disparadas.append(ids or _NINGUNA)
+        return cls(centros, reglas, disparadas)
+
+    @classmethod
+    def derivar(cls, anterior: 'VistaConclusiones', centros: List[CentroReciclaje], reglas: List[Regla],
+                indice_reglas: IndiceReglas, indice_materiales: IndiceMateriales) -> 'VistaConclusiones':
+        """
+        Vista para (centros, reglas) reutilizando `anterior`: solo se recalculan los centros nuevos
+        o cambiados, y para los demás solo se evalúan las reglas nuevas o cambiadas.
+
+        Un centro o una regla "sin cambios" es el MISMO objeto en las dos versiones (se compara con
+        id()), así que ambas tienen que ser listas de objetos que siguen vivos, como las que arma el
+        sincronizador. Si no (p. ej. centros sobre un archivo, que crean un objeto nuevo en cada
+        acceso y cuyos id() se pueden reutilizar), se recalcula todo con construir().
+        """
+        if not all(isinstance(lista, list) for lista in (anterior.centros, anterior.reglas, centros, reglas)):
+            return cls.construir(centros, reglas, indice_reglas)
+        # Reglas que siguen siendo el mismo objeto: posición anterior -> posición nueva
+        posicion_nueva = {id(regla): idx for idx, regla in enumerate(reglas)}
+        traduccion = {viejo: posicion_nueva[id(regla)] for viejo, regla in enumerate(anterior.reglas)
+                      if id(regla) in posicion_nueva}
+        reglas_iguales = len(traduccion) == len(reglas) == len(anterior.reglas) and \
+            all(viejo == nuevo for viejo, nuevo in traduccion.items())
+        conservadas = set(traduccion.values())
+        reglas_nuevas = [idx for idx in range(len(reglas)) if idx not in conservadas]
+
+        posicion_anterior = {id(centro): idx for idx, centro in enumerate(anterior.centros)}
+        disparadas: List[Optional[Tuple[int, ...]]] = [None] * len(centros)
+        recalcular = []
+        for idx, centro in enumerate(centros):
+            previo = posicion_anterior.get(id(centro))
+            if previo is None:
+                recalcular.append(idx)
+            elif reglas_iguales:
+                disparadas[idx] = anterior._disparadas[previo]
+            else:
+                # sorted(): si la lista de reglas se reordenó, cambia el orden relativo de las posiciones
+                disparadas[idx] = tuple(sorted(traduccion[r] for r in anterior._disparadas[previo]
+                                               if r in traduccion))
+
+        # Reglas nuevas o cambiadas: se prueban solo contra los centros conservados que pueden cumplirlas
+        if reglas_nuevas:
+            conservados = np.zeros(len(centros), dtype=bool)
+            conservados[[i for i, d in enumerate(disparadas) if d is not None]] = True
+            extra: Dict[int, List[int]] = {}
+            for idx_regla in reglas_nuevas:
+                regla = reglas[idx_regla]
+                materiales = [valor for clave, valor in regla.condiciones_list if clave == 'material']
+                candidatos = indice_materiales.ids_con_materiales(materiales) if materiales else range(len(centros))
+                for idx in candidatos:
+                    if conservados[idx] and regla.checar_condiciones(centros[idx]):
+                        extra.setdefault(idx, []).append(idx_regla)
+            for idx, nuevas in extra.items():
+                disparadas[idx] = tuple(sorted(disparadas[idx] + tuple(nuevas)))
+
+        for idx in recalcular:
+            centro = centros[idx]
+            disparadas[idx] = tuple(r for r in indice_reglas.reglas_candidatas(centro)
+                                    if reglas[r].checar_condiciones(centro)) or _NINGUNA
+        return cls(centros, reglas, disparadas)
+
+    def a_arreglos(self) -> Dict[str, np.ndarray]:
+        longitudes = np.fromiter((len(d) for d in self._disparadas), dtype=np.int64, count=len(self._disparadas))
+        offsets = np.zeros(len(longitudes) + 1, dtype=np.int64)
+        np.cumsum(longitudes, out=offsets[1:])
+        reglas = np.fromiter((r for d in self._disparadas for r in d), dtype=np.int32, count=int(offsets[-1]))
+        return {"offsets": offsets, "reglas": reglas}
+
+    @classmethod
+    def desde_arreglos(cls, arreglos: Dict[str, np.ndarray], centros: List[CentroReciclaje],
+                       reglas: List[Regla]) -> 'VistaConclusiones':
+        """Vista sobre arreglos CSR ya calculados (p. ej. en memoria compartida), sin volver a correr el motor."""
+        return cls(centros, reglas, _DisparadasCSR(arreglos["offsets"], arreglos["reglas"]))
+
+    def __len__(self):
+        return len(self._disparadas)
+
+    def conclusiones_de(self, idx: int) -> List[str]:
+        return [self.reglas[r].conclusiones for r in self._disparadas[idx]]
+
+    def conclusiones_por_ids(self, ids) -> Dict[str, List[str]]:
+        """{nombre del centro: conclusiones} para los ids con al menos una regla disparada."""
+        return {self.centros[idx].nombre: self.conclusiones_de(idx) for idx in ids if self._disparadas[idx]}
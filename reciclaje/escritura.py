@@ -0,0 +1,170 @@
+# ====================================================================
+# --- ESCRITURA EN LOTES A FIRESTORE (con reintentos) ---
+# ====================================================================
+# Contraparte de cargador.py para escribir: en vez de un doc_ref.set() por
+# documento (una ida y vuelta al servidor cada uno), los documentos se agrupan
+# en WriteBatch de hasta 500 escrituras (el máximo de Firestore), los lotes se
+# envían desde varios hilos, y un lote que falla por un error transitorio se
+# reintenta con espera exponencial. Un lote es atómico y set() sobre una
+# referencia fija es idempotente, así que reintentarlo entero es seguro: las
+# referencias (incluidas las de id automático) se resuelven una sola vez, antes
+# del primer intento. Con un id nuevo en cada intento, un commit que el servidor
+# sí aplicó pero respondió con error duplicaría los documentos.
+#
+# Uso (importación masiva desde JSON Lines, un documento por línea; "id" es opcional):
+#     python -m reciclaje.escritura centros_reciclaje centros.jsonl --credenciales cuenta.json
+#     python -m reciclaje.escritura reglas reglas.jsonl --credenciales cuenta.json --hilos 8
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+TAM_LOTE = 500  # Máximo de escrituras por WriteBatch en Firestore
+HILOS = 4
+INTENTOS = 5
+ESPERA_INICIAL_S = 0.5
+ESPERA_MAXIMA_S = 30.0
+
+# Errores de google.api_core que vale la pena reintentar (se comparan por nombre para no importar google.cloud)
+ERRORES_TRANSITORIOS = {"Aborted", "DeadlineExceeded", "InternalServerError", "ResourceExhausted",
+                        "ServiceUnavailable", "TooManyRequests", "Unknown"}
+
+Documento = Tuple[Optional[str], dict]  # (doc_id o None para uno automático, datos)
+
+
+class InformeEscritura:
+    """Cuántos documentos y lotes se escribieron en una colección, cuántos reintentos hubo y cuánto tardó."""
+
+    def __init__(self, coleccion: str):
+        self.coleccion = coleccion
+        self.documentos = 0
+        self.lotes = 0
+        self.reintentos = 0
+        self.segundos = 0.0
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return (f"{self.coleccion}: {self.documentos} documentos en {self.lotes} lotes, "
+                f"{self.reintentos} reintentos ({self.segundos * 1000:.0f} ms)")
+
+
+def es_transitorio(error: Exception) -> bool:
+    return type(error).__name__ in ERRORES_TRANSITORIOS
+
+
+def espera_reintento(intento: int, espera_inicial_s: float = ESPERA_INICIAL_S) -> float:
+    """Espera exponencial con jitter completo: aleatoria entre 0 y inicial * 2^intento (con tope)."""
+    return random.uniform(0, min(ESPERA_MAXIMA_S, espera_inicial_s * 2 ** intento))
+
+
+def _lotes(documentos: Iterable[Documento], tam_lote: int) -> Iterator[List[Documento]]:
+    iterador = iter(documentos)
+    while lote := list(itertools.islice(iterador, tam_lote)):
+        yield lote
+
+
+def escribir_lote(db, coleccion: str, lote: List[Documento], merge: bool = False, marca_tiempo=None,
+                  intentos: int = INTENTOS, espera_inicial_s: float = ESPERA_INICIAL_S,
+                  informe: Optional[InformeEscritura] = None):
+    """
+    Escribe `lote` (a lo más TAM_LOTE documentos) en un solo WriteBatch, reintentando los errores
+    transitorios. Con `marca_tiempo` (p. ej. firestore.SERVER_TIMESTAMP) se pone en 'updated_at',
+    para que el sincronizador vea los cambios.
+    """
+    coleccion_ref = db.collection(coleccion)
+    # Una referencia por documento para todos los intentos (ver el encabezado)
+    escrituras = []
+    for doc_id, datos in lote:
+        if marca_tiempo is not None:
+            datos = {**datos, 'updated_at': marca_tiempo}
+        escrituras.append((coleccion_ref.document(doc_id), datos))
+    for intento in range(intentos):
+        batch = db.batch()
+        for referencia, datos in escrituras:
+            batch.set(referencia, datos, merge=merge)
+        try:
+            batch.commit()
+            break
+        except Exception as e:
+            if not es_transitorio(e) or intento == intentos - 1:
+                raise
+            espera = espera_reintento(intento, espera_inicial_s)
+            print(f"--- Lote de {len(lote)} en '{coleccion}' falló ({type(e).__name__}); "
+                  f"reintento {intento + 1} en {espera:.2f} s ---")
+            if informe is not None:
+                with informe._lock:
+                    informe.reintentos += 1
+            time.sleep(espera)
+    if informe is not None:
+        with informe._lock:
+            informe.lotes += 1
+            informe.documentos += len(lote)
+
+
+def escribir_en_lotes(db, coleccion: str, documentos: Iterable[Documento], tam_lote: int = TAM_LOTE,
+                      hilos: int = HILOS, merge: bool = False, marca_tiempo=None,
+                      intentos: int = INTENTOS, espera_inicial_s: float = ESPERA_INICIAL_S) -> InformeEscritura:
+    """
+    Escribe todos los `documentos` en lotes de `tam_lote`, con hasta `hilos` lotes en vuelo a la vez.
+    Los documentos se consumen a medida que se envían (se puede pasar un generador sobre un archivo
+    enorme). Si un lote agota sus reintentos, se lanza su error después de terminar los que ya
+    estaban en vuelo.
+    """
+    informe = InformeEscritura(coleccion)
+    inicio = time.perf_counter()
+    en_vuelo = threading.BoundedSemaphore(hilos * 2)  # No se lee el archivo más rápido de lo que se escribe
+
+    def enviar(lote: List[Documento]):
+        try:
+            escribir_lote(db, coleccion, lote, merge, marca_tiempo, intentos, espera_inicial_s, informe)
+        finally:
+            en_vuelo.release()
+
+    with ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="escritura") as pool:
+        futuros = []
+        for lote in _lotes(documentos, tam_lote):
+            en_vuelo.acquire()
+            futuros.append(pool.submit(enviar, lote))
+            if futuros[0].done():
+                futuros.pop(0).result()  # Falla pronto si un lote ya agotó sus reintentos
+        for futuro in futuros:
+            futuro.result()
+    informe.segundos = time.perf_counter() - inicio
+    return informe
+
+
+def documentos_desde_jsonl(lineas: Iterable[str]) -> Iterator[Documento]:
+    """(id, datos) por cada línea no vacía; el campo "id" (opcional) se saca de los datos."""
+    for linea in lineas:
+        if linea.strip():
+            datos = json.loads(linea)
+            yield datos.pop("id", None), datos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("coleccion", help="Colección destino (p. ej. centros_reciclaje o reglas)")
+    parser.add_argument("archivo", help="JSON Lines con un documento por línea")
+    parser.add_argument("--credenciales", required=True, help="JSON de la cuenta de servicio de Firebase")
+    parser.add_argument("--tam-lote", type=int, default=TAM_LOTE)
+    parser.add_argument("--hilos", type=int, default=HILOS)
+    parser.add_argument("--merge", action="store_true", help="Combinar con los documentos existentes")
+    args = parser.parse_args()
+
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    firebase_admin.initialize_app(credentials.Certificate(args.credenciales))
+    with open(args.archivo, encoding="utf-8") as f:
+        informe = escribir_en_lotes(firestore.client(), args.coleccion, documentos_desde_jsonl(f),
+                                    tam_lote=args.tam_lote, hilos=args.hilos, merge=args.merge,
+                                    marca_tiempo=firestore.SERVER_TIMESTAMP)
+    print(f"--- {informe} ---")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# ====================================================================
+# --- BÚSQUEDA ESPACIAL (centros más cercanos) ---
+# ====================================================================
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from reciclaje.modelos import CentroReciclaje
+
+RADIO_TIERRA_KM = 6371.0
+KM_POR_GRADO_LAT = np.pi * RADIO_TIERRA_KM / 180.0
+
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Distancia de gran círculo (km) desde un punto a TODOS los puntos de los arreglos, vectorizada con NumPy."""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2.0) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2
+    return 2.0 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class IndiceEspacial:
+    """
+    Rejilla regular lat/lon sobre las coordenadas de los centros.
+
+    Los puntos se ordenan por celda, así cada celda es un rango contiguo del
+    arreglo. Las consultas exploran anillos de celdas alrededor del usuario y
+    se detienen en cuanto ningún punto fuera de lo explorado puede estar más
+    cerca que los ya encontrados.
+    """
+
+    MAX_ANILLOS = 32  # Más allá de esto (usuario muy lejos de los datos) conviene la fuerza bruta vectorizada
+
+    def __init__(self, lats: np.ndarray, lons: np.ndarray, tam_celda_grados: float = 0.05):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.tam_celda = tam_celda_grados
+        self._n_cols = int(np.ceil(360.0 / tam_celda_grados))
+        self._n_filas = int(np.ceil(180.0 / tam_celda_grados))
+
+        filas, cols = self._celda(self.lats, self.lons)
+        claves = filas * self._n_cols + cols
+        self._orden = np.argsort(claves, kind='stable')
+        claves_unicas, inicios, conteos = np.unique(claves[self._orden], return_index=True, return_counts=True)
+        self._celdas: Dict[int, Tuple[int, int]] = {
+            int(c): (int(i), int(i + n)) for c, i, n in zip(claves_unicas, inicios, conteos)
+        }
+
+    def a_arreglos(self) -> Dict[str, np.ndarray]:
+        """Estado del índice como arreglos planos (ver reciclaje/compartido.py); lats/lons van aparte."""
+        celdas = np.array([(c, i, f) for c, (i, f) in sorted(self._celdas.items())], dtype=np.int64).reshape(-1, 3)
+        return {"orden": self._orden, "celdas": celdas, "tam_celda": np.array([self.tam_celda])}
+
+    @classmethod
+    def desde_arreglos(cls, arreglos: Dict[str, np.ndarray], lats: np.ndarray, lons: np.ndarray) -> 'IndiceEspacial':
+        """Reconstruye el índice sin recalcular el orden por celda (los arreglos pueden ser de solo lectura)."""
+        indice = cls.__new__(cls)
+        indice.lats, indice.lons = lats, lons
+        indice.tam_celda = float(arreglos["tam_celda"][0])
+        indice._n_cols = int(np.ceil(360.0 / indice.tam_celda))
+        indice._n_filas = int(np.ceil(180.0 / indice.tam_celda))
+        indice._orden = arreglos["orden"]
+        indice._celdas = {int(c): (int(i), int(f)) for c, (i, f) in
+                          zip(arreglos["celdas"][:, 0].tolist(), arreglos["celdas"][:, 1:].tolist())}
+        return indice
+
+    @classmethod
+    def desde_centros(cls, centros: List[CentroReciclaje], **kwargs) -> 'IndiceEspacial':
+        lats = np.fromiter((c.lat for c in centros), dtype=np.float64, count=len(centros))
+        lons = np.fromiter((c.lon for c in centros), dtype=np.float64, count=len(centros))
+        return cls(lats, lons, **kwargs)
+
+    def __len__(self):
+        return len(self.lats)
+
+    def _celda(self, lat, lon):
+        filas = np.clip(np.floor((np.asarray(lat) + 90.0) / self.tam_celda), 0, self._n_filas - 1).astype(np.int64)
+        cols = np.floor((np.asarray(lon) + 180.0) / self.tam_celda).astype(np.int64) % self._n_cols
+        return filas, cols
+
+    def _ids_anillo(self, fila0: int, col0: int, r: int) -> List[np.ndarray]:
+        """Ids de los puntos en las celdas a distancia (Chebyshev) exactamente r de la celda del usuario."""
+        bloques = []
+        if r == 0:
+            celdas = [(fila0, col0)]
+        else:
+            celdas = [(fila0 + df, col0 + dc) for df in (-r, r) for dc in range(-r, r + 1)]
+            celdas += [(fila0 + df, col0 + dc) for dc in (-r, r) for df in range(-r + 1, r)]
+        for fila, col in celdas:
+            if 0 <= fila < self._n_filas:
+                rango = self._celdas.get(fila * self._n_cols + col % self._n_cols)
+                if rango:
+                    bloques.append(self._orden[rango[0]:rango[1]])
+        return bloques
+
+    def _cota_inferior_km(self, lat: float, lon: float, fila0: int, col0: int, r: int) -> float:
+        """Distancia mínima posible a cualquier punto FUERA de los anillos 0..r ya explorados."""
+        lat_min = (fila0 - r) * self.tam_celda - 90.0
+        lat_max = (fila0 + r + 1) * self.tam_celda - 90.0
+        cota_lat = min(lat - lat_min, lat_max - lat) * KM_POR_GRADO_LAT
+        if (2 * r + 1) >= self._n_cols:
+            return cota_lat
+        lon_min = (col0 - r) * self.tam_celda - 180.0
+        lon_max = (col0 + r + 1) * self.tam_celda - 180.0
+        delta_lon = np.radians(min(min(lon - lon_min, lon_max - lon), 90.0))
+        # Distancia del usuario al meridiano que limita la zona explorada
+        cota_lon = RADIO_TIERRA_KM * np.arcsin(np.cos(np.radians(lat)) * np.sin(delta_lon))
+        return float(min(cota_lat, cota_lon))
+
+    def _fuerza_bruta(self, lat, lon, permitidos):
+        ids = np.arange(len(self)) if permitidos is None else np.flatnonzero(permitidos)
+        return ids, haversine_km(lat, lon, self.lats[ids], self.lons[ids])
+
+    def _buscar(self, lat: float, lon: float, suficiente, permitidos: Optional[np.ndarray]):
+        """Expande anillos hasta que `suficiente(distancias, cota)` sea verdadero; devuelve (ids, distancias) candidatos."""
+        filas, cols = self._celda(lat, lon)
+        fila0, col0 = int(filas), int(cols)
+        ids_acum, dist_acum = [], []
+        distancias = np.empty(0)
+        for r in range(self.MAX_ANILLOS + 1):
+            bloques = self._ids_anillo(fila0, col0, r)
+            if bloques:
+                ids = np.concatenate(bloques)
+                if permitidos is not None:
+                    ids = ids[permitidos[ids]]
+                if len(ids):
+                    ids_acum.append(ids)
+                    dist_acum.append(haversine_km(lat, lon, self.lats[ids], self.lons[ids]))
+                    distancias = np.concatenate(dist_acum)
+            if suficiente(distancias, self._cota_inferior_km(lat, lon, fila0, col0, r)):
+                ids = np.concatenate(ids_acum) if ids_acum else np.empty(0, dtype=np.int64)
+                return ids, distancias
+        return self._fuerza_bruta(lat, lon, permitidos)
+
+    def k_cercanos(self, lat: float, lon: float, k: int,
+                   permitidos: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Los k centros más cercanos a (lat, lon), ordenados por distancia.
+        `permitidos` es una máscara booleana opcional (p. ej. el resultado del filtro de materiales).
+        """
+        total = len(self) if permitidos is None else int(np.count_nonzero(permitidos))
+        k = min(k, total)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        def suficiente(distancias, cota):
+            return len(distancias) >= k and np.partition(distancias, k - 1)[k - 1] <= cota
+
+        ids, distancias = self._buscar(lat, lon, suficiente, permitidos)
+        top = np.argpartition(distancias, k - 1)[:k] if len(distancias) > k else np.arange(len(distancias))
+        top = top[np.argsort(distancias[top], kind='stable')]
+        return ids[top], distancias[top]
+
+    def en_radio(self, lat: float, lon: float, radio_km: float,
+                 permitidos: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Todos los centros a no más de `radio_km` de (lat, lon), ordenados por distancia."""
+        ids, distancias = self._buscar(lat, lon, lambda _d, cota: cota >= radio_km, permitidos)
+        dentro = distancias <= radio_km
+        ids, distancias = ids[dentro], distancias[dentro]
+        orden = np.argsort(distancias, kind='stable')
+        return ids[orden], distancias[orden]
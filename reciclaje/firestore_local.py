@@ -0,0 +1,294 @@
+# ====================================================================
+# --- CLIENTE DE FIRESTORE LOCAL (en memoria) ---
+# ====================================================================
+# Imita el subconjunto de la API de google-cloud-firestore que usa el proyecto
+# (collection, document, where, order_by, limit, start_after, select, stream,
+# list_documents, set/update/delete, batch). Sirve para probar la sincronización,
+# la escritura en lotes y los benchmarks sin credenciales ni red.
+import bisect
+import copy
+import itertools
+import threading
+from datetime import datetime, timezone
+
+OPERADORES = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+    'in': lambda a, b: a in b,
+    'array_contains': lambda a, b: isinstance(a, list) and b in a,
+}
+
+
+def _es_marca_tiempo_servidor(valor) -> bool:
+    """True para firestore.SERVER_TIMESTAMP (se compara por nombre para no importar google.cloud)."""
+    return type(valor).__name__ == 'Sentinel' and 'server timestamp' in repr(valor)
+
+
+class ServiceUnavailable(Exception):
+    """Se llama igual que el error de google.api_core que simula (escritura.py los reconoce por nombre)."""
+
+
+class DeadlineExceeded(Exception):
+    """Igual que ServiceUnavailable, para un commit que el servidor aplicó pero no alcanzó a confirmar."""
+
+
+class SnapshotLocal:
+    """Equivalente a DocumentSnapshot."""
+
+    def __init__(self, referencia, datos):
+        self.reference = referencia
+        self.id = referencia.id
+        self._datos = datos
+
+    @property
+    def exists(self) -> bool:
+        return self._datos is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._datos) if self._datos is not None else None
+
+    def get(self, campo):
+        return self._datos.get(campo) if self._datos else None
+
+
+class DocumentoLocal:
+    """Equivalente a DocumentReference."""
+
+    def __init__(self, cliente, coleccion: str, doc_id: str):
+        self._cliente = cliente
+        self._coleccion = coleccion
+        self.id = doc_id
+
+    def _resolver(self, datos: dict) -> dict:
+        # Como en Firestore, todas las escrituras de un lote llevan la misma marca de tiempo del servidor
+        ahora = self._cliente._marca_lote or datetime.now(timezone.utc)
+        return {k: (ahora if _es_marca_tiempo_servidor(v) else copy.deepcopy(v)) for k, v in datos.items()}
+
+    def set(self, datos: dict, merge: bool = False):
+        with self._cliente._lock:
+            docs = self._cliente._colecciones.setdefault(self._coleccion, {})
+            nuevos = self._resolver(datos)
+            if merge and self.id in docs:
+                docs[self.id].update(nuevos)
+            else:
+                docs[self.id] = nuevos
+            self._cliente.escrituras += 1
+
+    def update(self, datos: dict):
+        with self._cliente._lock:
+            docs = self._cliente._colecciones.get(self._coleccion, {})
+            if self.id not in docs:
+                raise KeyError(f"No existe el documento {self._coleccion}/{self.id}")
+            docs[self.id].update(self._resolver(datos))
+            self._cliente.escrituras += 1
+
+    def delete(self):
+        with self._cliente._lock:
+            self._cliente._colecciones.get(self._coleccion, {}).pop(self.id, None)
+            self._cliente.escrituras += 1
+
+    def get(self, field_paths=None) -> SnapshotLocal:
+        with self._cliente._lock:
+            datos = self._cliente._colecciones.get(self._coleccion, {}).get(self.id)
+            self._cliente.lecturas += 1
+            datos = copy.deepcopy(datos)
+        if datos is not None and field_paths is not None:
+            datos = {k: v for k, v in datos.items() if k in field_paths}
+        return SnapshotLocal(self, datos)
+
+
+class LoteLocal:
+    """Equivalente a WriteBatch: las escrituras se aplican todas juntas (y a la vez) en commit()."""
+
+    def __init__(self, cliente):
+        self._cliente = cliente
+        self._operaciones = []
+
+    def set(self, referencia: DocumentoLocal, datos: dict, merge: bool = False):
+        self._operaciones.append(lambda: referencia.set(datos, merge=merge))
+        return self
+
+    def update(self, referencia: DocumentoLocal, datos: dict):
+        self._operaciones.append(lambda: referencia.update(datos))
+        return self
+
+    def delete(self, referencia: DocumentoLocal):
+        self._operaciones.append(referencia.delete)
+        return self
+
+    def commit(self):
+        if len(self._operaciones) > 500:
+            raise ValueError("Un lote admite a lo más 500 escrituras")
+        with self._cliente._lock:
+            if self._cliente.fallas_transitorias > 0:
+                self._cliente.fallas_transitorias -= 1
+                raise ServiceUnavailable("Falla simulada del servidor")
+            self._cliente._marca_lote = datetime.now(timezone.utc)
+            try:
+                for operacion in self._operaciones:
+                    operacion()
+            finally:
+                self._cliente._marca_lote = None
+            self._cliente.lotes += 1
+            if self._cliente.fallas_tras_aplicar > 0:
+                self._cliente.fallas_tras_aplicar -= 1
+                raise DeadlineExceeded("Lote aplicado, pero la respuesta no llegó a tiempo")
+        return []
+
+
+class ConsultaLocal:
+    """Equivalente a Query: cada método devuelve una consulta nueva."""
+
+    def __init__(self, cliente, coleccion: str, filtros=(), orden=(), limite=None, despues_de=None, campos=None):
+        self._cliente = cliente
+        self._coleccion = coleccion
+        self._filtros = tuple(filtros)
+        self._orden = tuple(orden)
+        self._limite = limite
+        self._despues_de = despues_de
+        self._campos = campos
+
+    def _copia(self, **cambios):
+        estado = dict(filtros=self._filtros, orden=self._orden, limite=self._limite,
+                      despues_de=self._despues_de, campos=self._campos)
+        estado.update(cambios)
+        return ConsultaLocal(self._cliente, self._coleccion, **estado)
+
+    def where(self, field_path=None, op_string=None, value=None, *, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copia(filtros=self._filtros + ((field_path, op_string, value),))
+
+    def order_by(self, field_path: str, direction: str = 'ASCENDING'):
+        return self._copia(orden=self._orden + ((field_path, direction == 'DESCENDING'),))
+
+    def limit(self, count: int):
+        return self._copia(limite=count)
+
+    def start_after(self, documento):
+        return self._copia(despues_de=documento)
+
+    def select(self, field_paths):
+        return self._copia(campos=tuple(field_paths))
+
+    def _clave_orden(self, doc_id: str, datos: dict):
+        return tuple(datos[campo] for campo, _ in self._orden) + (doc_id,)
+
+    def _resultados(self):
+        campos_requeridos = {f[0] for f in self._filtros} | {o[0] for o in self._orden}
+        with self._cliente._lock:
+            docs = list(self._cliente._colecciones.get(self._coleccion, {}).items())
+        if campos_requeridos:
+            docs = [(doc_id, datos) for doc_id, datos in docs
+                    if all(campo in datos for campo in campos_requeridos)
+                    and all(OPERADORES[op](datos[campo], valor) for campo, op, valor in self._filtros)]
+
+        # Igual que Firestore: orden por los campos pedidos y, al final, por id de documento
+        docs.sort(key=lambda d: d[0])
+        for campo, descendente in reversed(self._orden):
+            docs.sort(key=lambda d: d[1][campo], reverse=descendente)
+
+        if self._despues_de is not None:
+            if isinstance(self._despues_de, SnapshotLocal) and not self._orden:
+                # Caso de la paginación por id de documento: búsqueda binaria sobre los ids ordenados
+                docs = docs[bisect.bisect_right([doc_id for doc_id, _ in docs], self._despues_de.id):]
+            elif isinstance(self._despues_de, SnapshotLocal):
+                cursor = self._clave_orden(self._despues_de.id, self._despues_de._datos or {})
+                ultimo = next((i for i, (doc_id, datos) in enumerate(docs)
+                               if self._clave_orden(doc_id, datos) == cursor), None)
+                docs = docs[ultimo + 1:] if ultimo is not None else docs
+            else:
+                valores = tuple(self._despues_de.values()) if isinstance(self._despues_de, dict) \
+                    else tuple(self._despues_de)
+                n = len(valores)
+                docs = [d for d in docs if self._clave_orden(*d)[:n] > valores]
+
+        if self._limite is not None:
+            docs = docs[:self._limite]
+        # Solo se copian los documentos (y campos, si hay proyección) que la consulta devuelve
+        with self._cliente._lock:
+            if self._campos is not None:
+                docs = [(doc_id, {k: v for k, v in datos.items() if k in self._campos}) for doc_id, datos in docs]
+            return [(doc_id, copy.deepcopy(datos)) for doc_id, datos in docs]
+
+    def stream(self, *args, **kwargs):
+        for doc_id, datos in self._resultados():
+            self._cliente.lecturas += 1
+            yield SnapshotLocal(DocumentoLocal(self._cliente, self._coleccion, doc_id), datos)
+
+    def get(self, *args, **kwargs):
+        return list(self.stream())
+
+
+class ColeccionLocal(ConsultaLocal):
+    """Equivalente a CollectionReference."""
+
+    def __init__(self, cliente, nombre: str):
+        super().__init__(cliente, nombre)
+        self.id = nombre
+
+    def document(self, document_id: str = None) -> DocumentoLocal:
+        if document_id is None:
+            document_id = f"auto{next(self._cliente._contador):012d}"
+        return DocumentoLocal(self._cliente, self._coleccion, document_id)
+
+    def add(self, datos: dict):
+        referencia = self.document()
+        referencia.set(datos)
+        return datetime.now(timezone.utc), referencia
+
+    def list_documents(self, page_size=None):
+        with self._cliente._lock:
+            ids = sorted(self._cliente._colecciones.get(self._coleccion, {}))
+        return [DocumentoLocal(self._cliente, self._coleccion, doc_id) for doc_id in ids]
+
+
+class ClienteFirestoreLocal:
+    """
+    Equivalente en memoria de firestore.client(). Cuenta lecturas y escrituras de documentos y lotes.
+    Los siguientes `fallas_transitorias` commits de lotes fallan con ServiceUnavailable (para probar
+    los reintentos), y los siguientes `fallas_tras_aplicar` se aplican y luego fallan con
+    DeadlineExceeded (un reintento no debe duplicar documentos).
+    """
+
+    def __init__(self, datos: dict = None, fallas_transitorias: int = 0, fallas_tras_aplicar: int = 0):
+        self._lock = threading.RLock()
+        self._colecciones = {}
+        self._contador = itertools.count(1)
+        self._marca_lote = None  # Marca de tiempo del lote que se está aplicando
+        self.lecturas = 0
+        self.escrituras = 0
+        self.lotes = 0
+        self.fallas_transitorias = fallas_transitorias
+        self.fallas_tras_aplicar = fallas_tras_aplicar
+        for coleccion, docs in (datos or {}).items():
+            for doc_id, doc in docs.items():
+                self.collection(coleccion).document(doc_id).set(doc)
+        self.escrituras = 0
+
+    def collection(self, nombre: str) -> ColeccionLocal:
+        return ColeccionLocal(self, nombre)
+
+    def batch(self) -> LoteLocal:
+        return LoteLocal(self)
+
+
+_CLIENTE_POR_DEFECTO = None
+_lock_por_defecto = threading.Lock()
+
+
+def cliente_por_defecto(datos: dict = None) -> ClienteFirestoreLocal:
+    """
+    El cliente local de todo el proceso: el que usan las páginas con RECICLAJE_FIRESTORE_LOCAL=1.
+    `datos` solo se usa para sembrarlo si todavía no existe (p. ej. desde benchmarks/carga_sesiones.py,
+    antes de correr las páginas).
+    """
+    global _CLIENTE_POR_DEFECTO
+    with _lock_por_defecto:
+        if _CLIENTE_POR_DEFECTO is None:
+            _CLIENTE_POR_DEFECTO = ClienteFirestoreLocal(datos)
+        return _CLIENTE_POR_DEFECTO
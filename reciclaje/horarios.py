@@ -0,0 +1,261 @@
+# ====================================================================
+# --- HORARIOS: TEXTO LIBRE -> INTERVALOS POR DÍA DE LA SEMANA ---
+# ====================================================================
+# En Firebase el horario es texto ("Lunes a Viernes 9:00-18:00, Sábado
+# 9:00-13:00", "24 horas", ...). Aquí se convierte UNA vez por texto distinto
+# a intervalos en "minutos de la semana" (lunes 00:00 = 0) y se indexa, para
+# poder preguntar "¿quién está abierto el sábado a las 10:00?" sin leer texto.
+import re
+import unicodedata
+from datetime import datetime
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+if TYPE_CHECKING:  # modelos.py importa este módulo (condición 'horario' de las reglas)
+    from reciclaje.modelos import CentroReciclaje
+
+MINUTOS_DIA = 24 * 60
+MINUTOS_SEMANA = 7 * MINUTOS_DIA
+DIAS = ("lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo")
+ZONA_HORARIA = ZoneInfo("America/Mexico_City")
+
+Intervalos = Tuple[Tuple[int, int], ...]
+
+_DIA_POR_NOMBRE = {
+    "lunes": 0, "lun": 0, "martes": 1, "mar": 1, "miercoles": 2, "mie": 2, "jueves": 3, "jue": 3,
+    "viernes": 4, "vie": 4, "sabado": 5, "sab": 5, "domingo": 6, "dom": 6,
+}
+# Los valores de las reglas ('horario:sábado') solo se interpretan con el nombre completo
+_DIA_COMPLETO = {nombre: dia for nombre, dia in _DIA_POR_NOMBRE.items() if len(nombre) > 3}
+_DIA = r"(?:lunes|martes|miercoles|jueves|viernes|sabado|domingo|lun|mar|mie|jue|vie|sab|dom)\b\.?"
+
+
+def _hora(n: int) -> str:
+    return rf"(?P<h{n}>\d{{1,2}})(?:[:.](?P<m{n}>\d{{2}}))?\s*(?P<s{n}>am|pm|a\.\s?m\.|p\.\s?m\.)?\s*(?:hrs?\b|h\b)?"
+
+
+_PATRON = re.compile(
+    rf"(?P<h24>\b24\s*(?:horas|hrs|h)\b)"
+    r"|(?P<rango_letras>\b[lmxjvsd]\s*(?:-|a)\s*[lmxjvsd]\b)"  # "L-V", "L a S"
+    rf"|(?P<rango_dias>{_DIA}\s*(?:a|al|-|hasta)\s*{_DIA})"
+    rf"|(?P<dia>{_DIA})"
+    r"|(?P<todos>todos los dias|diario|toda la semana)"
+    r"|(?P<finde>fines? de semana)"
+    r"|(?P<entre>entre semana)"
+    rf"|(?P<rango_horas>{_hora(1)}\s*(?:-|a|al|hasta)\s*{_hora(2)})"
+)
+_NOMBRES_DIA = re.compile(_DIA)
+_DIA_POR_LETRA = {"l": 0, "m": 1, "x": 2, "j": 3, "v": 4, "s": 5, "d": 6}
+
+
+def _normalizar(texto: str) -> str:
+    sin_acentos = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in sin_acentos if not unicodedata.combining(c)).replace("–", "-").replace("—", "-")
+
+
+def _dias_de(fragmento: str, letras: bool = False) -> List[int]:
+    if letras:
+        nombres = [_DIA_POR_LETRA[c] for c in fragmento if c in _DIA_POR_LETRA]
+    else:
+        nombres = [_DIA_POR_NOMBRE[n.rstrip(".")] for n in _NOMBRES_DIA.findall(fragmento)]
+    if len(nombres) == 2:
+        inicio, fin = nombres
+        return [(inicio + i) % 7 for i in range((fin - inicio) % 7 + 1)]
+    return nombres
+
+
+def _minutos(hora: str, minuto: Optional[str], sufijo: Optional[str]) -> Optional[int]:
+    h, m = int(hora), int(minuto or 0)
+    if sufijo:
+        es_pm = sufijo.startswith("p")
+        if h == 12:
+            h = 0 if not es_pm else 12
+        elif es_pm:
+            h += 12
+    if h > 24 or m > 59 or (h == 24 and m):
+        return None
+    return h * 60 + m
+
+
+def _sumar(intervalos: list, dias: List[int], inicio: int, fin: int):
+    if fin <= inicio:
+        fin += MINUTOS_DIA  # Cierra después de medianoche
+    for dia in dias:
+        a, b = dia * MINUTOS_DIA + inicio, dia * MINUTOS_DIA + fin
+        if b > MINUTOS_SEMANA:  # Domingo en la noche -> lunes en la madrugada
+            intervalos.append((a, MINUTOS_SEMANA))
+            intervalos.append((0, b - MINUTOS_SEMANA))
+        else:
+            intervalos.append((a, b))
+
+
+def _unir(intervalos: list) -> Intervalos:
+    unidos = []
+    for a, b in sorted(intervalos):
+        if unidos and a <= unidos[-1][1]:
+            unidos[-1] = (unidos[-1][0], max(unidos[-1][1], b))
+        else:
+            unidos.append((a, b))
+    return tuple(unidos)
+
+
+@lru_cache(maxsize=4096)
+def parsear_horario(texto: str) -> Optional[Intervalos]:
+    """
+    Intervalos (inicio, fin) en minutos de la semana, ordenados y sin traslapes.
+    None si el texto no tiene ningún rango de horas reconocible (horario desconocido).
+
+    Los días se aplican a los rangos de horas que les siguen; un rango sin días
+    antes vale para toda la semana ("9:00-18:00", "24 horas").
+    """
+    intervalos = []
+    dias_pendientes: List[int] = []
+    dias_ultimos = list(range(7))
+    reconocido = False
+    for m in _PATRON.finditer(_normalizar(texto or "")):
+        tipo = m.lastgroup
+        if tipo in ("rango_dias", "rango_letras", "dia"):
+            dias_pendientes = dias_pendientes + _dias_de(m.group(0), letras=tipo == "rango_letras")
+        elif tipo == "todos":
+            dias_pendientes = list(range(7))
+        elif tipo == "finde":
+            dias_pendientes = dias_pendientes + [5, 6]
+        elif tipo == "entre":
+            dias_pendientes = dias_pendientes + [0, 1, 2, 3, 4]
+        else:
+            dias = dias_pendientes or dias_ultimos
+            if tipo == "h24":
+                _sumar(intervalos, dias, 0, MINUTOS_DIA)
+            else:
+                s1, s2 = m.group("s1"), m.group("s2")
+                inicio, fin = _minutos(m.group("h1"), m.group("m1"), s1), _minutos(m.group("h2"), m.group("m2"), s2)
+                if inicio is None or fin is None:
+                    continue
+                if s2 and not s1 and s2.startswith("p") and inicio + 12 * 60 < fin:
+                    inicio += 12 * 60  # "1 a 5 pm" es 13:00-17:00 ("9 a 6 pm" se queda en 9:00)
+                elif (not s1 and not s2 and fin <= inicio < min(13 * 60, fin + 12 * 60)
+                      and not m.group("h2").startswith("0")):
+                    # Sin am/pm, "8 a 5" es 8:00-17:00. Solo cruzan la medianoche las horas que únicamente
+                    # existen en formato de 24 h ("22 a 6") o con cero a la izquierda ("22:00 a 06:00")
+                    fin += 12 * 60
+                _sumar(intervalos, dias, inicio, fin)
+            reconocido = True
+            dias_ultimos, dias_pendientes = dias, []
+    return _unir(intervalos) if reconocido else None
+
+
+def minuto_de_semana(dia: int, hora: int, minuto: int = 0) -> int:
+    return dia * MINUTOS_DIA + hora * 60 + minuto
+
+
+def momento_actual() -> int:
+    """Minuto de la semana en la hora local de los centros."""
+    ahora = datetime.now(ZONA_HORARIA)
+    return minuto_de_semana(ahora.weekday(), ahora.hour, ahora.minute)
+
+
+def momento_desde_texto(texto: str) -> int:
+    """
+    "ahora", "sábado 10:00", "sab 9:30", "lunes" (a las 00:00) -> minuto de la semana.
+    Lanza ValueError si no se reconoce el día o la hora.
+    """
+    normalizado = _normalizar(texto).strip()
+    if normalizado == "ahora":
+        return momento_actual()
+    m = re.fullmatch(r"(\w+)\.?(?:\s+(\d{1,2})(?::(\d{2}))?)?", normalizado)
+    if m is None or m.group(1) not in _DIA_POR_NOMBRE:
+        raise ValueError(f"Momento no reconocido: {texto!r} (usa p. ej. 'sábado 10:00' o 'ahora')")
+    hora, minuto = int(m.group(2) or 0), int(m.group(3) or 0)
+    if hora > 23 or minuto > 59:
+        raise ValueError(f"Hora fuera de rango: {texto!r}")
+    return minuto_de_semana(_DIA_POR_NOMBRE[m.group(1)], hora, minuto)
+
+
+@lru_cache(maxsize=16384)
+def cumple_condicion_horario(valor: str, horario: str) -> bool:
+    """
+    Condición 'horario:<valor>' de las reglas. Con el nombre completo de un día ("sábado") se usa el
+    horario ya interpretado: abre ese día aunque el texto diga "Lunes a Sábado". Con "24 horas", que
+    algún día abra las 24 horas, como cuando se buscaba el texto ("Lunes a Viernes 24 horas" cuenta).
+    Con cualquier otro valor (también abreviaturas como "mar", que en texto libre no siempre son un
+    día), o si el horario del centro no se pudo interpretar, se busca el texto como antes.
+    """
+    intervalos = parsear_horario(horario)
+    clave = _normalizar(valor).strip()
+    if intervalos is not None:
+        if clave in _DIA_COMPLETO:
+            dia = _DIA_COMPLETO[clave]
+            return any(a < (dia + 1) * MINUTOS_DIA and b > dia * MINUTOS_DIA for a, b in intervalos)
+        if re.fullmatch(r"24\s*(?:horas|hrs|h)", clave):
+            return any(a <= dia * MINUTOS_DIA and b >= (dia + 1) * MINUTOS_DIA
+                       for dia in range(7) for a, b in intervalos)
+    return valor in horario.lower()
+
+
+class IndiceHorarios:
+    """
+    Índice de intervalos de apertura.
+
+    Los horarios se repiten mucho entre centros, así que se interpretan y se
+    indexan los TEXTOS distintos: arreglos (inicio, fin, horario) de todos sus
+    intervalos, más el id de horario de cada centro. "¿Quién abre en el minuto
+    t?" marca los horarios con un intervalo que contiene a t y expande esa marca
+    a los centros con un solo acceso vectorizado.
+    """
+
+    def __init__(self, centros: List['CentroReciclaje']):
+        ids_por_texto = {}
+        self.textos: List[str] = []
+        horario_de_centro = []
+        for centro in centros:
+            idx = ids_por_texto.get(centro.horario)
+            if idx is None:
+                idx = ids_por_texto[centro.horario] = len(self.textos)
+                self.textos.append(centro.horario)
+            horario_de_centro.append(idx)
+        self.horario_de_centro = np.array(horario_de_centro, dtype=np.int32)
+
+        self.intervalos: List[Optional[Intervalos]] = [parsear_horario(t) for t in self.textos]
+        inicios, fines, duenos = [], [], []
+        for idx, intervalos in enumerate(self.intervalos):
+            for a, b in intervalos or ():
+                inicios.append(a)
+                fines.append(b)
+                duenos.append(idx)
+        self._inicios = np.array(inicios, dtype=np.int32)
+        self._fines = np.array(fines, dtype=np.int32)
+        self._duenos = np.array(duenos, dtype=np.int32)
+        self.conocido = np.array([i is not None for i in self.intervalos], dtype=bool)[self.horario_de_centro] \
+            if len(centros) else np.zeros(0, dtype=bool)
+
+    def a_arreglos(self) -> Dict[str, np.ndarray]:
+        return {"textos": np.array(self.textos, dtype=str), "horario_de_centro": self.horario_de_centro,
+                "inicios": self._inicios, "fines": self._fines, "duenos": self._duenos, "conocido": self.conocido}
+
+    @classmethod
+    def desde_arreglos(cls, arreglos: Dict[str, np.ndarray]) -> 'IndiceHorarios':
+        """Reconstruye el índice; solo los textos distintos (pocos) se vuelven a interpretar."""
+        indice = cls.__new__(cls)
+        indice.textos = arreglos["textos"].tolist()
+        indice.intervalos = [parsear_horario(t) for t in indice.textos]
+        indice.horario_de_centro = arreglos["horario_de_centro"]
+        indice._inicios, indice._fines, indice._duenos = arreglos["inicios"], arreglos["fines"], arreglos["duenos"]
+        indice.conocido = arreglos["conocido"]
+        return indice
+
+    def mascara_abiertos(self, minuto_semana: int) -> np.ndarray:
+        """Máscara booleana (una entrada por centro) de los centros abiertos en ese minuto de la semana."""
+        t = minuto_semana % MINUTOS_SEMANA
+        abiertos = np.zeros(len(self.textos), dtype=bool)
+        abiertos[self._duenos[(self._inicios <= t) & (t < self._fines)]] = True
+        return abiertos[self.horario_de_centro]
+
+    def ids_abiertos(self, minuto_semana: int, ids: Optional[np.ndarray] = None) -> np.ndarray:
+        """Posiciones de los centros abiertos (de entre `ids`, si se dan), en el mismo orden."""
+        mascara = self.mascara_abiertos(minuto_semana)
+        if ids is None:
+            return np.flatnonzero(mascara)
+        return ids[mascara[ids]]
@@ -0,0 +1,317 @@
+# ====================================================================
+# --- ÍNDICES PRECALCULADOS SOBRE LOS CENTROS ---
+# ====================================================================
+from functools import cached_property
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from reciclaje.horarios import cumple_condicion_horario
+from reciclaje.modelos import CentroReciclaje, Regla
+
+
+def ids_desde_bitmap(bitmap: int) -> List[int]:
+    """Convierte un bitmap (int de Python) en la lista ordenada de posiciones con bit en 1."""
+    return arreglo_desde_bitmap(bitmap).tolist()
+
+
+def arreglo_desde_bitmap(bitmap: int) -> np.ndarray:
+    """Igual que ids_desde_bitmap, pero como arreglo NumPy: se desempacan los bytes en vez de buscar bit por bit."""
+    if not bitmap:
+        return np.empty(0, dtype=np.int64)
+    buffer = np.frombuffer(bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little'), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(buffer, bitorder='little'))
+
+
+def bitmap_desde_ids(ids: Iterable[int]) -> int:
+    """Empaqueta una colección de posiciones en un bitmap (int de Python) en una sola pasada."""
+    ids = list(ids)
+    if not ids:
+        return 0
+    buffer = bytearray(max(ids) // 8 + 1)
+    for i in ids:
+        buffer[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+MAX_SELECCIONES_MEMO = 1024  # Conteos por selección guardados en el índice (ver IndiceMateriales.conteos_con)
+# Costos medidos (ns) para elegir cómo contar: AND + bit_count de dos bitmaps, por palabra de 64 bits;
+# y contar sobre los centros del resultado: desempacar el bitmap (por bit) y cada material de cada centro
+NS_POR_PALABRA_AND = 9
+NS_POR_BIT_DESEMPACAR = 8
+NS_POR_MATERIAL_DE_CENTRO = 14
+MAX_BITS_MASCARA = 64  # Una máscara de materiales por centro cabe en un uint64
+_BITS_POR_BYTE = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint8)
+
+
+def contar_bits(mascaras: np.ndarray) -> np.ndarray:
+    """Bits encendidos de cada elemento de un arreglo uint64."""
+    if hasattr(np, "bitwise_count"):  # NumPy >= 2.0
+        return np.bitwise_count(mascaras)
+    return _BITS_POR_BYTE[mascaras.view(np.uint8).reshape(-1, 8)].sum(axis=1)
+
+
+def mascaras_desde_bitmaps(bitmaps: List[int]) -> np.ndarray:
+    """Máscara uint64 por centro: el bit j está encendido si el centro está en bitmaps[j] (a lo más 64 bitmaps)."""
+    n = max((b.bit_length() for b in bitmaps), default=0)
+    mascaras = np.zeros(n, dtype=np.uint64)
+    for j, bitmap in enumerate(bitmaps):
+        if bitmap:
+            buffer = np.frombuffer(bitmap.to_bytes((n + 7) // 8, 'little'), dtype=np.uint8)
+            mascaras |= np.unpackbits(buffer, count=n, bitorder='little').astype(np.uint64) << np.uint64(j)
+    return mascaras
+
+
+def cobertura_voraz(mascaras: np.ndarray, objetivo: int, ids: Optional[np.ndarray] = None,
+                    distancia_km: Optional[Callable[[np.ndarray], np.ndarray]] = None) -> np.ndarray:
+    """
+    Cobertura de conjuntos voraz: de `ids` (o de todos los centros), elige centros hasta cubrir los
+    bits de `objetivo`, cada vez el que acepta más materiales de los que todavía faltan. Empates: el
+    más cercano según `distancia_km(ids)` o, sin ella, el primero de `ids`. Usa a lo más H(k) ≈ ln k + 1
+    veces el mínimo de centros (k = materiales pedidos). Si ningún centro acepta lo que falta, se
+    detiene ahí.
+    """
+    if ids is None:
+        ids = np.arange(len(mascaras))
+        faltantes = mascaras & np.uint64(objetivo)  # Por candidato: lo que aceptaría de lo que falta
+    else:
+        ids = np.asarray(ids)
+        ids = ids[ids < len(mascaras)]  # Centros sin ningún material quedan fuera de las máscaras
+        faltantes = mascaras[ids] & np.uint64(objetivo)
+    elegidos = []
+    while len(ids):
+        ganancia = contar_bits(faltantes)
+        maximo = ganancia.max()
+        if maximo == 0:
+            break
+        empatados = np.flatnonzero(ganancia == maximo)
+        mejor = empatados[0]
+        if distancia_km is not None and len(empatados) > 1:
+            mejor = empatados[np.argmin(distancia_km(ids[empatados]))]
+        elegidos.append(ids[mejor])
+        faltantes &= ~faltantes[mejor]
+        # Se descartan los candidatos que ya no aportan nada solo cuando son la mayoría: compactar
+        # cuesta más que una pasada de conteo
+        if np.count_nonzero(faltantes) < len(faltantes) // 2:
+            utiles = np.flatnonzero(faltantes)
+            ids, faltantes = ids[utiles], faltantes[utiles]
+    return np.array(elegidos, dtype=np.int64)
+
+
+class IndiceMateriales:
+    """
+    Índice invertido material -> bitmap de ids de centro.
+
+    El id de un centro es su posición en la lista cargada de Firebase, así que
+    recorrer los bits en orden ascendente devuelve los centros en el mismo
+    orden que el filtro lineal original.
+    """
+
+    def __init__(self, centros: List[CentroReciclaje]):
+        postings: Dict[str, List[int]] = {}
+        for idx, centro in enumerate(centros):
+            for material in centro.materiales:
+                postings.setdefault(material, []).append(idx)
+        self._bitmaps: Dict[str, int] = {m: bitmap_desde_ids(ids) for m, ids in postings.items()}
+
+    @classmethod
+    def desde_bitmaps(cls, bitmaps: Dict[str, int]) -> 'IndiceMateriales':
+        """Reconstruye el índice a partir de bitmaps ya calculados (p. ej. leídos de una instantánea)."""
+        indice = cls.__new__(cls)
+        indice._bitmaps = dict(bitmaps)
+        return indice
+
+    def bitmaps(self) -> Dict[str, int]:
+        return self._bitmaps
+
+    def bitmap(self, material: str) -> int:
+        return self._bitmaps.get(material, 0)
+
+    def bitmap_con_materiales(self, materiales: Iterable[str]) -> int:
+        """Bitmap de los centros que aceptan TODOS los materiales pedidos."""
+        # Se intersecta empezando por el material menos común para vaciar el bitmap cuanto antes
+        bitmaps = sorted((self.bitmap(m.lower()) for m in materiales), key=int.bit_count)
+        if not bitmaps:
+            return 0
+        resultado = bitmaps[0]
+        for b in bitmaps[1:]:
+            if not resultado:
+                break
+            resultado &= b
+        return resultado
+
+    def ids_con_materiales(self, materiales: Iterable[str]) -> List[int]:
+        """Ids (en orden) de los centros que aceptan TODOS los materiales pedidos."""
+        return ids_desde_bitmap(self.bitmap_con_materiales(materiales))
+
+    def arreglo_con_materiales(self, materiales: Iterable[str]) -> np.ndarray:
+        """Como ids_con_materiales, pero como arreglo NumPy (sin pasar por una lista de Python)."""
+        return arreglo_desde_bitmap(self.bitmap_con_materiales(materiales))
+
+    @cached_property
+    def _conteos(self) -> Dict[str, int]:
+        return {m: bitmap.bit_count() for m, bitmap in self._bitmaps.items()}
+
+    @cached_property
+    def _filas_coocurrencia(self) -> Dict[str, Dict[str, int]]:
+        return {}
+
+    @cached_property
+    def _memo_conteos(self) -> Dict[frozenset, Dict[str, int]]:
+        return {}
+
+    @cached_property
+    def _grado_medio(self) -> float:
+        """Materiales por centro, en promedio (para estimar el costo de contar sobre los centros)."""
+        centros = max((b.bit_length() for b in self._bitmaps.values()), default=0)
+        return sum(self._conteos.values()) / centros if centros else 0.0
+
+    def _contar(self, base: int, candidatos: Iterable[str], n_candidatos: int,
+                contar_centros: Optional[Callable[[np.ndarray], Dict[str, int]]]) -> Dict[str, int]:
+        """
+        Cuántos centros de `base` acepta cada candidato (solo los distintos de cero). Con pocos candidatos
+        conviene un AND de bitmaps por candidato; con muchos y un `base` chico, `contar_centros` (un
+        conteo sobre los materiales de los centros de `base`, ver AlmacenCentros.conteo_materiales).
+        """
+        bits = base.bit_length()
+        costo_and = n_candidatos * (bits / 64) * NS_POR_PALABRA_AND
+        costo_centros = bits * NS_POR_BIT_DESEMPACAR + base.bit_count() * self._grado_medio * NS_POR_MATERIAL_DE_CENTRO
+        if contar_centros is not None and costo_centros < costo_and:
+            # Cuenta todos los materiales de esos centros: los que no son candidatos dan lo mismo que el AND
+            conteos = contar_centros(arreglo_desde_bitmap(base))
+            return {m: n for m, n in conteos.items() if m in self._bitmaps}
+        conteos = {}
+        for material in candidatos:
+            n = (base & self._bitmaps[material]).bit_count()
+            if n:
+                conteos[material] = n
+        return conteos
+
+    def coocurrencias(self, material: str,
+                      contar_centros: Optional[Callable[[np.ndarray], Dict[str, int]]] = None) -> Dict[str, int]:
+        """
+        Fila de la matriz de coocurrencia: cuántos centros aceptan `material` y cada uno de los demás
+        (solo los distintos de cero; el propio material da su total). Cada fila se calcula la primera
+        vez que se pide y se guarda mientras viva el índice (una versión del catálogo).
+        """
+        fila = self._filas_coocurrencia.get(material)
+        if fila is None:
+            base = self.bitmap(material)
+            fila = self._contar(base, self._bitmaps, len(self._bitmaps), contar_centros) if base else {}
+            self._filas_coocurrencia[material] = fila
+        return fila
+
+    def conteos_con(self, materiales: Iterable[str],
+                    contar_centros: Optional[Callable[[np.ndarray], Dict[str, int]]] = None) -> Dict[str, int]:
+        """
+        Por material, cuántos centros aceptan la selección más ese material (los que darían cero no
+        aparecen; los ya seleccionados dan el total de la selección). Sin selección son los totales y con
+        un material su fila de coocurrencia. `contar_centros` (opcional) cuenta los materiales de un
+        conjunto de centros; se usa cuando sale más barato que los AND de bitmaps.
+        """
+        return self._conteos_de(frozenset(m.lower() for m in materiales), contar_centros)
+
+    def _conteos_de(self, seleccion: frozenset, contar_centros) -> Dict[str, int]:
+        if not seleccion:
+            return self._conteos
+        if len(seleccion) == 1:
+            return self.coocurrencias(next(iter(seleccion)), contar_centros)
+        memo = self._memo_conteos
+        conteos = memo.get(seleccion)
+        if conteos is not None:
+            return conteos
+
+        # Se parte de los conteos de la selección con un material menos: solo los materiales que ahí
+        # siguen teniendo centros (y que coinciden con el nuevo) pueden tenerlos aquí. Si el usuario
+        # acaba de agregar un material, esos conteos ya están guardados.
+        padre = next((seleccion - {m} for m in seleccion if seleccion - {m} in memo), None)
+        if padre is None:
+            padre = seleccion - {max(sorted(seleccion), key=lambda m: self._conteos.get(m, 0))}
+        (nuevo,) = seleccion - padre
+        fila = self.coocurrencias(nuevo, contar_centros)
+        base = self.bitmap_con_materiales(seleccion)
+        conteos = {}
+        if base:
+            candidatos = [m for m in self._conteos_de(padre, contar_centros) if m in fila]
+            conteos = self._contar(base, candidatos, len(candidatos), contar_centros)
+        if len(memo) >= MAX_SELECCIONES_MEMO:
+            memo.clear()
+        memo[seleccion] = conteos
+        return conteos
+
+    @cached_property
+    def _mascaras(self) -> Optional[Tuple[np.ndarray, Dict[str, int]]]:
+        """Máscara de TODOS los materiales de cada centro y el bit de cada material (None si no caben en 64 bits)."""
+        if len(self._bitmaps) > MAX_BITS_MASCARA:
+            return None
+        materiales = sorted(self._bitmaps)
+        return (mascaras_desde_bitmaps([self._bitmaps[m] for m in materiales]),
+                {m: bit for bit, m in enumerate(materiales)})
+
+    def mascaras_de(self, materiales: Iterable[str]) -> Tuple[np.ndarray, Dict[str, int]]:
+        """
+        Máscaras por centro con los materiales pedidos y el bit de cada uno (los que ningún centro acepta
+        no aparecen). Se calculan una vez por catálogo; con más de 64 materiales, en cada consulta.
+        """
+        presentes = sorted({m.lower() for m in materiales} & self._bitmaps.keys())
+        if self._mascaras is not None:
+            mascaras, bit_de = self._mascaras
+            return mascaras, {m: bit_de[m] for m in presentes}
+        if len(presentes) > MAX_BITS_MASCARA:
+            raise ValueError(f"A lo más {MAX_BITS_MASCARA} materiales a la vez")
+        return (mascaras_desde_bitmaps([self._bitmaps[m] for m in presentes]),
+                {m: bit for bit, m in enumerate(presentes)})
+
+
+class IndiceReglas:
+    """
+    Red de discriminación sencilla para el motor lógico.
+
+    Cada regla se indexa por UNA de sus condiciones ("ancla"), eligiendo la más
+    selectiva: ubicación (igualdad exacta) > material (pertenencia) > horario
+    (día o texto, ver reciclaje/horarios.py). Para un centro solo se evalúan completas las reglas cuya ancla
+    puede cumplirse; el resto no puede dispararse.
+    """
+
+    def __init__(self, reglas: List[Regla]):
+        self._reglas = reglas
+        self._por_ubicacion: Dict[str, List[int]] = {}
+        self._por_material: Dict[str, List[int]] = {}
+        self._por_horario: Dict[str, List[int]] = {}
+        self._siempre: List[int] = []  # Reglas sin condiciones reconocidas: aplican a todo centro
+        # Las reglas de horario se resuelven por subcadena; se memoriza el resultado por texto de horario
+        self._cache_horario: Dict[str, List[int]] = {}
+
+        for idx, regla in enumerate(reglas):
+            condiciones = dict(regla.condiciones_list)
+            if 'ubicacion' in condiciones:
+                self._por_ubicacion.setdefault(condiciones['ubicacion'], []).append(idx)
+            elif 'material' in condiciones:
+                self._por_material.setdefault(condiciones['material'], []).append(idx)
+            elif 'horario' in condiciones:
+                self._por_horario.setdefault(condiciones['horario'], []).append(idx)
+            else:
+                self._siempre.append(idx)
+
+    def _candidatas_horario(self, horario: str) -> List[int]:
+        candidatas = self._cache_horario.get(horario)
+        if candidatas is None:
+            candidatas = [idx for valor, ids in self._por_horario.items()
+                          if cumple_condicion_horario(valor, horario) for idx in ids]
+            self._cache_horario[horario] = candidatas
+        return candidatas
+
+    def reglas_candidatas(self, centro: CentroReciclaje) -> List[int]:
+        """Ids (en orden de carga) de las reglas que podrían dispararse para este centro."""
+        candidatas = set(self._siempre)
+        candidatas.update(self._por_ubicacion.get(centro.ubicacion.lower(), ()))
+        for material in centro.materiales:
+            candidatas.update(self._por_material.get(material, ()))
+        if self._por_horario:
+            candidatas.update(self._candidatas_horario(centro.horario))
+        return sorted(candidatas)
+
+    def conclusiones_para(self, centro: CentroReciclaje) -> List[str]:
+        """Conclusiones de las reglas que se disparan para el centro, en el mismo orden que la lista de reglas."""
+        return [self._reglas[idx].conclusiones for idx in self.reglas_candidatas(centro)
+                if self._reglas[idx].checar_condiciones(centro)]
@@ -0,0 +1,275 @@
+# ====================================================================
+# --- INSTANTÁNEA EN DISCO PARA ARRANQUES RÁPIDOS ---
+# ====================================================================
+# Después de una carga exitosa se guardan los centros, las reglas y el índice de
+# materiales en archivos Arrow IPC (columnar, binario). Al arrancar un proceso
+# nuevo se abren con memory-map, se verifica checksum, formato y antigüedad, y la
+# app puede responder de inmediato mientras Firestore se consulta en segundo plano.
+#
+# Cada guardado escribe una versión completa en un subdirectorio propio y solo
+# entonces cambia el archivo VIGENTE (con os.replace, atómico), como GENERACION
+# en compartido.py: quien carga en ese momento ve la versión anterior o la nueva,
+# nunca un directorio a medias, y dos procesos que comparten el directorio no se
+# pisan (gana el último en publicar).
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from reciclaje.catalogo import Catalogo
+from reciclaje.indices import IndiceMateriales
+from reciclaje.modelos import CentroReciclaje, Regla
+
+if TYPE_CHECKING:  # pyarrow se importa al leer o escribir la instantánea, no al cargar la página
+    import pyarrow as pa
+
+FORMATO = 1  # Subirlo cuando cambie el contenido de los archivos para invalidar instantáneas viejas
+TTL_POR_DEFECTO_S = 24 * 60 * 60
+DIR_POR_DEFECTO = os.environ.get("RECICLAJE_DIR_INSTANTANEA",
+                                 os.path.join(tempfile.gettempdir(), "reciclaje_instantanea"))
+
+ARCHIVOS = ("centros.arrow", "reglas.arrow", "materiales.arrow")
+VERSIONES_CONSERVADAS = 2  # La vigente y la anterior (alguien puede estar leyéndola todavía)
+INTENTOS_CARGA = 3
+
+
+def _sha256(ruta: str) -> str:
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1 << 20), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _escribir_tabla(ruta: str, tabla: 'pa.Table'):
+    import pyarrow as pa
+
+    with pa.OSFile(ruta, 'wb') as sink, pa.ipc.new_file(sink, tabla.schema) as writer:
+        writer.write_table(tabla)
+
+
+def _leer_tabla(ruta: str) -> 'pa.Table':
+    import pyarrow as pa
+
+    # memory_map: los buffers de la tabla apuntan directamente al archivo, sin copiarlo a memoria
+    return pa.ipc.open_file(pa.memory_map(ruta, 'r')).read_all()
+
+
+def _cursor_a_json(cursor) -> Optional[str]:
+    return cursor.isoformat() if isinstance(cursor, datetime) else None
+
+
+_COLUMNAS_CENTRO = ("nombre", "lat", "lon", "horario", "ubicacion", "materiales")
+
+
+class CentrosArrow:
+    """
+    Lista de solo lectura de CentroReciclaje sobre la tabla Arrow (memory-mapped) de la instantánea.
+
+    Cada centro se construye cuando se pide, así que la memoria de los datos es la del archivo
+    (compartida entre procesos por el sistema operativo) y no un objeto de Python por centro.
+    Pensada para consultas por posición; recorrerla completa construye todos los objetos.
+    """
+
+    def __init__(self, tabla: 'pa.Table'):
+        self._tabla = tabla
+        self._columnas = [tabla.column(nombre) for nombre in _COLUMNAS_CENTRO]
+
+    def __len__(self):
+        return self._tabla.num_rows
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        idx = int(idx)
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        return CentroReciclaje(**{nombre: columna[idx].as_py()
+                                  for nombre, columna in zip(_COLUMNAS_CENTRO, self._columnas)})
+
+    def __iter__(self):
+        for lote in self._tabla.select(list(_COLUMNAS_CENTRO)).to_batches():
+            for fila in lote.to_pylist():
+                yield CentroReciclaje(**fila)
+
+
+class DatosInstantanea:
+    """Lo que devuelve Instantanea.cargar(): catálogo listo para usar + estado para seguir sincronizando."""
+
+    def __init__(self, catalogo: Catalogo, ids_centros: List[str], ids_reglas: List[str],
+                 cursores: Dict[str, Optional[datetime]], creada: float,
+                 marcas: Optional[Dict[str, List[Optional[datetime]]]] = None):
+        self.catalogo = catalogo
+        self.ids_centros = ids_centros
+        self.ids_reglas = ids_reglas
+        self.cursores = cursores
+        self.creada = creada
+        self.marcas = marcas or {}  # 'updated_at' de cada documento, por colección (mismo orden que los ids)
+
+
+class Instantanea:
+    """Guarda y carga la instantánea versionada del catálogo en un directorio local."""
+
+    def __init__(self, directorio: str = DIR_POR_DEFECTO, ttl_s: float = TTL_POR_DEFECTO_S):
+        self.directorio = directorio
+        self.ttl_s = ttl_s
+
+    @property
+    def ruta_vigente(self) -> str:
+        return os.path.join(self.directorio, "VIGENTE")
+
+    def version_vigente(self) -> Optional[str]:
+        """Ruta del subdirectorio de la versión publicada (None si todavía no hay ninguna)."""
+        try:
+            with open(self.ruta_vigente, encoding='utf-8') as f:
+                nombre = f.read().strip()
+        except OSError:
+            return None
+        return os.path.join(self.directorio, nombre) if nombre else None
+
+    def guardar(self, catalogo: Catalogo, ids_centros: List[str], ids_reglas: List[str],
+                cursores: Dict[str, Optional[datetime]], marcas: Optional[Dict[str, List]] = None):
+        """
+        Escribe una versión nueva de la instantánea y la publica cambiando VIGENTE (ver el encabezado).
+        `marcas` tiene el 'updated_at' de cada documento por colección, en el orden de los ids.
+        """
+        import pyarrow as pa
+
+        marcas = marcas or {}
+
+        def columna_marcas(coleccion: str, n: int) -> 'pa.Array':
+            valores = marcas.get(coleccion) or [None] * n
+            return pa.array([m if isinstance(m, datetime) else None for m in valores], pa.timestamp('us', tz='UTC'))
+
+        centros = catalogo.centros
+        tabla_centros = pa.table({
+            "doc_id": pa.array(ids_centros, pa.string()),
+            "nombre": pa.array([c.nombre for c in centros], pa.string()),
+            "lat": pa.array([c.lat for c in centros], pa.float64()),
+            "lon": pa.array([c.lon for c in centros], pa.float64()),
+            "horario": pa.array([c.horario for c in centros], pa.string()),
+            "ubicacion": pa.array([c.ubicacion for c in centros], pa.string()),
+            "materiales": pa.array([c.materiales for c in centros], pa.list_(pa.string())),
+            "updated_at": columna_marcas("centros_reciclaje", len(ids_centros)),
+        })
+        tabla_reglas = pa.table({
+            "doc_id": pa.array(ids_reglas, pa.string()),
+            "condiciones": pa.array([";".join(f"{k}:{v}" for k, v in r.condiciones_list) for r in catalogo.reglas],
+                                    pa.string()),
+            "conclusion": pa.array([str(r.conclusiones) for r in catalogo.reglas], pa.string()),
+            "updated_at": columna_marcas("reglas", len(ids_reglas)),
+        })
+        bitmaps = catalogo.indice_materiales.bitmaps()
+        tabla_materiales = pa.table({
+            "material": pa.array(list(bitmaps), pa.string()),
+            "bitmap": pa.array([b.to_bytes((b.bit_length() + 7) // 8, 'little') for b in bitmaps.values()],
+                               pa.binary()),
+        })
+
+        os.makedirs(self.directorio, exist_ok=True)
+        temporal = tempfile.mkdtemp(prefix=".temporal-", dir=self.directorio)
+        try:
+            for nombre, tabla in zip(ARCHIVOS, (tabla_centros, tabla_reglas, tabla_materiales)):
+                _escribir_tabla(os.path.join(temporal, nombre), tabla)
+            manifiesto = {
+                "formato": FORMATO,
+                "creada": time.time(),
+                "centros": len(centros),
+                "reglas": len(catalogo.reglas),
+                "cursores": {k: _cursor_a_json(v) for k, v in cursores.items()},
+                "sha256": {nombre: _sha256(os.path.join(temporal, nombre)) for nombre in ARCHIVOS},
+            }
+            with open(os.path.join(temporal, "manifiesto.json"), 'w', encoding='utf-8') as f:
+                json.dump(manifiesto, f, indent=2)
+
+            # Nombre único y ordenable por fecha: la versión nueva nunca reemplaza a otra
+            version = f"v-{time.time_ns():020d}-{os.getpid()}"
+            os.rename(temporal, os.path.join(self.directorio, version))
+            temporal_vigente = f"{self.ruta_vigente}.{os.getpid()}.tmp"
+            with open(temporal_vigente, 'w', encoding='utf-8') as f:
+                f.write(f"{version}\n")
+            os.replace(temporal_vigente, self.ruta_vigente)  # El cambio de versión es atómico
+        except Exception:
+            shutil.rmtree(temporal, ignore_errors=True)
+            raise
+        self._limpiar()
+        print(f"--- Instantánea guardada en {self.directorio} ({len(centros)} centros) ---")
+
+    def _limpiar(self):
+        # Con varios procesos guardando a la vez, la vigente puede no ser la más reciente: nunca se borra
+        versiones = sorted(nombre for nombre in os.listdir(self.directorio) if nombre.startswith("v-"))
+        vigente = os.path.basename(self.version_vigente() or "")
+        for nombre in versiones[:-VERSIONES_CONSERVADAS]:
+            if nombre != vigente:
+                shutil.rmtree(os.path.join(self.directorio, nombre), ignore_errors=True)
+
+    def _validar(self, ruta: Optional[str]) -> Tuple[Optional[dict], str]:
+        """Devuelve (manifiesto, '') si la versión en `ruta` se puede usar, o (None, motivo)."""
+        if ruta is None:
+            return None, "no existe"
+        try:
+            with open(os.path.join(ruta, "manifiesto.json"), encoding='utf-8') as f:
+                manifiesto = json.load(f)
+        except (OSError, ValueError):
+            return None, "no existe o el manifiesto está dañado"
+        if manifiesto.get("formato") != FORMATO:
+            return None, f"formato {manifiesto.get('formato')} distinto de {FORMATO}"
+        edad = time.time() - manifiesto.get("creada", 0)
+        if edad > self.ttl_s:
+            return None, f"caducada ({edad / 3600:.1f} h)"
+        for nombre in ARCHIVOS:
+            archivo = os.path.join(ruta, nombre)
+            if not os.path.exists(archivo) or _sha256(archivo) != manifiesto["sha256"].get(nombre):
+                return None, f"checksum incorrecto en {nombre}"
+        return manifiesto, ""
+
+    def cargar(self, perezosa: bool = False) -> Optional[DatosInstantanea]:
+        """
+        Carga la instantánea si es válida; si no, devuelve None (y hay que ir a Firestore).
+        Con `perezosa`, los centros del catálogo son un CentrosArrow sobre el archivo en lugar de una lista.
+        """
+        for _ in range(INTENTOS_CARGA):
+            ruta = self.version_vigente()  # Se resuelve una vez por intento: todo se lee de la misma versión
+            try:
+                manifiesto, motivo = self._validar(ruta)
+                if manifiesto is not None:
+                    # Una vez abiertos con memory-map, los archivos se pueden leer aunque se borren
+                    centros_t, reglas_t, materiales_t = (_leer_tabla(os.path.join(ruta, n)) for n in ARCHIVOS)
+                break
+            except OSError:
+                # Otros guardados publicaron versiones más nuevas y borraron esta mientras se abría
+                manifiesto, motivo = None, "la versión se borró mientras se leía"
+        if manifiesto is None:
+            print(f"--- Instantánea ignorada: {motivo} ---")
+            return None
+
+        if perezosa:
+            centros = CentrosArrow(centros_t)
+        else:
+            columnas = {nombre: centros_t.column(nombre).to_pylist() for nombre in _COLUMNAS_CENTRO}
+            centros = [
+                CentroReciclaje(nombre=n, lat=la, lon=lo, horario=h, ubicacion=u, materiales=m)
+                for n, la, lo, h, u, m in zip(columnas["nombre"], columnas["lat"], columnas["lon"],
+                                              columnas["horario"], columnas["ubicacion"], columnas["materiales"])
+            ]
+        reglas = [Regla(c, conclusion) for c, conclusion in zip(reglas_t.column("condiciones").to_pylist(),
+                                                                  reglas_t.column("conclusion").to_pylist())]
+        indice_materiales = IndiceMateriales.desde_bitmaps({
+            m: int.from_bytes(b, 'little') for m, b in zip(materiales_t.column("material").to_pylist(),
+                                                           materiales_t.column("bitmap").to_pylist())
+        })
+        cursores = {k: datetime.fromisoformat(v) if v else None for k, v in manifiesto["cursores"].items()}
+
+        catalogo = Catalogo(centros, reglas, indices={"indice_materiales": indice_materiales})
+        print(f"--- Instantánea cargada: {len(centros)} centros y {len(reglas)} reglas "
+              f"(de hace {(time.time() - manifiesto['creada']) / 60:.0f} min) ---")
+        marcas = {"centros_reciclaje": centros_t.column("updated_at").to_pylist(),
+                  "reglas": reglas_t.column("updated_at").to_pylist()}
+        return DatosInstantanea(catalogo, centros_t.column("doc_id").to_pylist(),
+                                reglas_t.column("doc_id").to_pylist(), cursores, manifiesto["creada"], marcas)
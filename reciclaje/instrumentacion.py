@@ -0,0 +1,145 @@
+# ====================================================================
+# --- INSTRUMENTACIÓN: TRAMOS DE TIEMPO, CONTADORES E HISTOGRAMAS ---
+# ====================================================================
+# Reemplaza a los print() de diagnóstico. Cada tramo cuesta un par de
+# perf_counter_ns(), una búsqueda binaria en los límites del histograma y un
+# append a un deque acotado, así que se puede dejar encendido en producción.
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, List, Optional
+
+# Límites superiores (ms) de las cubetas del histograma; la última cubeta es "más de 10 s"
+LIMITES_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class _Histograma:
+    __slots__ = ("cubetas", "cuenta", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.cubetas = [0] * (len(LIMITES_MS) + 1)
+        self.cuenta = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observar(self, ms: float):
+        self.cubetas[bisect_left(LIMITES_MS, ms)] += 1
+        self.cuenta += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentil(self, p: float) -> float:
+        """Estimación por cubetas: devuelve el límite superior de la cubeta que contiene el percentil."""
+        objetivo = self.cuenta * p / 100.0
+        acumulado = 0
+        for i, n in enumerate(self.cubetas):
+            acumulado += n
+            if acumulado >= objetivo and n:
+                return min(LIMITES_MS[i], self.max_ms) if i < len(LIMITES_MS) else self.max_ms
+        return self.max_ms
+
+
+class _Tramo:
+    __slots__ = ("_metricas", "_nombre", "_etiquetas", "_inicio")
+
+    def __init__(self, metricas, nombre, etiquetas):
+        self._metricas = metricas
+        self._nombre = nombre
+        self._etiquetas = etiquetas
+
+    def __enter__(self):
+        self._inicio = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self._metricas.observar(self._nombre, (time.perf_counter_ns() - self._inicio) / 1e6, self._etiquetas)
+        return False
+
+
+class Metricas:
+    """Registro de métricas de todo el proceso (compartido por todas las sesiones de Streamlit)."""
+
+    def __init__(self, max_eventos: int = 5000):
+        self._lock = threading.Lock()
+        self._histogramas: Dict[str, _Histograma] = {}
+        self._contadores: Dict[str, int] = {}
+        self._eventos = deque(maxlen=max_eventos)  # Últimos tramos, para exportar como JSON Lines
+        self.activo = True
+
+    def tramo(self, nombre: str, **etiquetas) -> _Tramo:
+        """Uso: `with METRICAS.tramo("motor_logico", centros=n): ...`"""
+        return _Tramo(self, nombre, etiquetas)
+
+    def observar(self, nombre: str, ms: float, etiquetas: Optional[dict] = None):
+        if not self.activo:
+            return
+        with self._lock:
+            histograma = self._histogramas.get(nombre)
+            if histograma is None:
+                histograma = self._histogramas[nombre] = _Histograma()
+            histograma.observar(ms)
+            self._eventos.append((time.time(), nombre, ms, etiquetas or None))
+
+    def contar(self, nombre: str, n: int = 1):
+        if not self.activo:
+            return
+        with self._lock:
+            self._contadores[nombre] = self._contadores.get(nombre, 0) + n
+
+    def contadores(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._contadores)
+
+    def resumen(self) -> List[dict]:
+        """Una fila por tramo: cuenta, total, media, p50/p95/p99 (por cubetas) y máximo, en ms."""
+        with self._lock:
+            filas = []
+            for nombre, h in sorted(self._histogramas.items()):
+                filas.append({
+                    "tramo": nombre,
+                    "cuenta": h.cuenta,
+                    "total_ms": round(h.total_ms, 3),
+                    "media_ms": round(h.total_ms / h.cuenta, 3),
+                    "p50_ms": h.percentil(50),
+                    "p95_ms": h.percentil(95),
+                    "p99_ms": h.percentil(99),
+                    "max_ms": round(h.max_ms, 3),
+                })
+            return filas
+
+    def histograma(self, nombre: str) -> Dict[str, int]:
+        """Cuenta por cubeta ("<= 5 ms", ...) de un tramo."""
+        with self._lock:
+            h = self._histogramas.get(nombre)
+            if h is None:
+                return {}
+            etiquetas = [f"<= {limite:g} ms" for limite in LIMITES_MS] + [f"> {LIMITES_MS[-1]:g} ms"]
+            return dict(zip(etiquetas, h.cubetas))
+
+    def a_jsonl(self) -> str:
+        """Eventos recientes, resumen y contadores como JSON Lines (un objeto por línea)."""
+        with self._lock:
+            eventos = list(self._eventos)
+        lineas = [json.dumps({"tipo": "tramo", "ts": ts, "tramo": nombre, "ms": round(ms, 4),
+                              **({"etiquetas": etiquetas} if etiquetas else {})}, default=str)
+                  for ts, nombre, ms, etiquetas in eventos]
+        lineas += [json.dumps({"tipo": "resumen", **fila}) for fila in self.resumen()]
+        lineas += [json.dumps({"tipo": "contador", "nombre": k, "valor": v}) for k, v in self.contadores().items()]
+        return "\n".join(lineas) + "\n"
+
+    def exportar_jsonl(self, ruta: str):
+        with open(ruta, "a", encoding="utf-8") as f:
+            f.write(self.a_jsonl())
+
+    def reiniciar(self):
+        with self._lock:
+            self._histogramas.clear()
+            self._contadores.clear()
+            self._eventos.clear()
+
+
+# Registro global del proceso
+METRICAS = Metricas()
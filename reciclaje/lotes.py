@@ -0,0 +1,133 @@
+# ====================================================================
+# --- MOTOR DE CONSULTAS POR LOTES (sin Streamlit ni Firebase) ---
+# ====================================================================
+# Lee consultas en JSON Lines, las resuelve con Recomendador sobre una
+# instantánea local (la misma que escribe la app, ver reciclaje/instantanea.py)
+# en varios procesos, y escribe un resultado JSON por línea, en el mismo orden.
+#
+# Cada consulta es un objeto con campos opcionales:
+#     {"id": "q1", "materiales": ["Pet", "Vidrio"], "texto": "polanco",
+#      "momento": "sábado 10:00", "lat": 19.43, "lon": -99.13, "k": 10,
+#      "radio_km": 5, "limite": 20, "conclusiones": true}
+#
+# Uso (desde la raíz del proyecto):
+#     python -m reciclaje.lotes consultas.jsonl -o resultados.jsonl
+#     python -m reciclaje.lotes consultas.jsonl --procesos 8 --instantanea /ruta/instantanea
+#     cat consultas.jsonl | python -m reciclaje.lotes - > resultados.jsonl
+import argparse
+import contextlib
+import json
+import math
+import os
+import sys
+import time
+from multiprocessing import Pool
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+from reciclaje.catalogo import Catalogo
+from reciclaje.horarios import momento_desde_texto
+from reciclaje.instantanea import DIR_POR_DEFECTO, Instantanea
+from reciclaje.motor import Recomendador
+
+LIMITE_POR_DEFECTO = 50
+
+# Un Recomendador por proceso de trabajo (se crea en _iniciar_proceso)
+_RECOMENDADOR: Optional[Recomendador] = None
+
+
+def cargar_catalogo(directorio: str) -> Catalogo:
+    """Catálogo de la instantánea de `directorio`, sin importar su antigüedad."""
+    # Los avisos de la instantánea van a stderr: stdout puede ser la salida JSON Lines
+    with contextlib.redirect_stdout(sys.stderr):
+        datos = Instantanea(directorio, ttl_s=math.inf).cargar()
+    if datos is None:
+        raise SystemExit(f"No hay una instantánea válida en {directorio}")
+    return datos.catalogo
+
+
+def ejecutar_consulta(recomendador: Recomendador, consulta: dict) -> dict:
+    """Aplica los mismos filtros que la página del mapa, en el mismo orden, y arma el resultado."""
+    inicio = time.perf_counter()
+    ids = recomendador.filter_ids_by_materials(consulta.get("materiales") or [])
+    if consulta.get("momento"):
+        ids = recomendador.filter_ids_abiertos(ids, momento_desde_texto(consulta["momento"]))
+    if consulta.get("texto"):
+        ids = recomendador.buscar_texto(consulta["texto"], ids)
+    distancias = None
+    if consulta.get("lat") is not None and consulta.get("lon") is not None:
+        ids, distancias = recomendador.sort_by_distance(ids, float(consulta["lat"]), float(consulta["lon"]),
+                                                        k=consulta.get("k"), radio_km=consulta.get("radio_km"))
+
+    limite = consulta.get("limite", LIMITE_POR_DEFECTO)
+    visibles = ids if limite is None else ids[:limite]
+    tabla = recomendador.get_almacen().tabla_de(np.asarray(visibles, dtype=np.int64))
+    centros = tabla.to_dict(orient="records")
+    if distancias is not None:
+        for fila, distancia in zip(centros, distancias[:len(visibles)]):
+            fila["distancia_km"] = round(float(distancia), 3)
+    if consulta.get("conclusiones"):
+        conclusiones = recomendador.get_conclusiones_por_ids(visibles)
+        for fila in centros:
+            fila["conclusiones"] = conclusiones.get(fila["nombre"], [])
+
+    return {"id": consulta.get("id"), "total": int(len(ids)), "centros": centros,
+            "ms": round((time.perf_counter() - inicio) * 1000, 3)}
+
+
+def _resolver_linea(linea: str) -> str:
+    consulta = {}
+    try:
+        consulta = json.loads(linea)
+        resultado = ejecutar_consulta(_RECOMENDADOR, consulta)
+    except Exception as e:
+        resultado = {"id": consulta.get("id") if isinstance(consulta, dict) else None,
+                     "error": f"{type(e).__name__}: {e}"}
+    return json.dumps(resultado, ensure_ascii=False)
+
+
+def _iniciar_proceso(directorio: str):
+    global _RECOMENDADOR
+    catalogo = cargar_catalogo(directorio)
+    # Índices perezosos construidos antes de la primera consulta, no durante
+    catalogo.indice_horarios, catalogo.indice_texto, catalogo.vista_conclusiones
+    _RECOMENDADOR = Recomendador(catalogo)
+
+
+def resolver(lineas: Iterable[str], directorio: str, procesos: int = 1, tam_lote: int = 64) -> Iterator[str]:
+    """Resultados (JSON, uno por consulta) en el orden de entrada, a medida que están listos."""
+    lineas = (linea for linea in lineas if linea.strip())
+    if procesos <= 1:
+        _iniciar_proceso(directorio)
+        yield from map(_resolver_linea, lineas)
+        return
+    with Pool(procesos, initializer=_iniciar_proceso, initargs=(directorio,)) as pool:
+        yield from pool.imap(_resolver_linea, lineas, chunksize=tam_lote)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resuelve consultas en JSON Lines (una por línea) sobre la "
+                                                 "instantánea local del catálogo, en varios procesos.")
+    parser.add_argument("consultas", help="Archivo JSON Lines con las consultas ('-' para stdin)")
+    parser.add_argument("-o", "--salida", help="Archivo de resultados (por defecto, stdout)")
+    parser.add_argument("--instantanea", default=DIR_POR_DEFECTO, help="Directorio de la instantánea")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--tam-lote", type=int, default=64, help="Consultas por envío a cada proceso")
+    args = parser.parse_args()
+
+    entrada = sys.stdin if args.consultas == "-" else open(args.consultas, encoding="utf-8")
+    salida = sys.stdout if args.salida is None else open(args.salida, "w", encoding="utf-8")
+    inicio = time.perf_counter()
+    n = 0
+    with entrada, salida:
+        for resultado in resolver(entrada, args.instantanea, args.procesos, args.tam_lote):
+            salida.write(resultado + "\n")
+            n += 1
+    segundos = time.perf_counter() - inicio
+    print(f"--- {n} consultas en {segundos:.2f} s ({n / segundos if segundos else 0:.0f} consultas/s, "
+          f"{args.procesos} procesos) ---", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+# ====================================================================
+# --- MEMORIA: PERFIL POR PÁGINA Y RERUN, PRESUPUESTO POR SESIÓN ---
+# ====================================================================
+# Dos piezas independientes:
+#
+# - PerfilMemoria: con RECICLAJE_PERFIL_MEMORIA=N (N = marcos de pila que se
+#   guardan por asignación; 1 basta para "archivo:línea") arranca tracemalloc,
+#   mide cuánto crece y cuánto sube el pico en cada rerun de cada página, y
+#   arma la lista de los mayores retenedores por ubicación en el código (y su
+#   crecimiento contra la primera instantánea). tracemalloc vuelve más lentas
+#   las asignaciones y ocupa memoria propia, así que está apagado por defecto;
+#   cada marco de más lo encarece (con 10, un rerun de Mapa tarda decenas de
+#   segundos en vez de uno).
+#   El pico y el crecimiento por rerun son del proceso entero: con varias
+#   sesiones a la vez se mezclan; los retenedores por ubicación sí son exactos.
+#
+# - PresupuestoSesion: siempre activo y barato. Al final de cada rerun estima el
+#   tamaño de lo que la sesión guarda en st.session_state; si pasa del
+#   presupuesto (RECICLAJE_PRESUPUESTO_SESION_MB) lo avisa y, con
+#   RECICLAJE_MODO_PRESUPUESTO=expulsar, borra las entradas más grandes que no
+#   estén protegidas. Guarda el último tamaño de cada sesión para dimensionar
+#   réplicas (memoria base del proceso + suma de las sesiones).
+#
+# Este módulo no importa NumPy ni pandas (lo importan también las páginas
+# ligeras); los tamaños se calculan con reciclaje.cache.tamano_aproximado.
+import fnmatch
+import math
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Dict, Iterable, List, MutableMapping, Optional, Tuple
+
+from reciclaje.instrumentacion import METRICAS
+
+PRESUPUESTO_SESION_MB = 20.0
+MODOS_PRESUPUESTO = ("avisar", "expulsar")
+INACTIVIDAD_SESION_S = 3600  # Sesiones sin reruns en este tiempo dejan de contar
+RAIZ_PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Asignaciones que no son de la aplicación (las del perfil mismo y de la maquinaria de importación)
+_EXCLUIDOS = (tracemalloc.__file__, os.path.abspath(__file__), "<frozen importlib._bootstrap*>", "<unknown>")
+
+
+def tamano_de(valor) -> int:
+    """Bytes aproximados de un valor guardado por una sesión (incluye DataFrames y Series de pandas)."""
+    if type(valor).__module__.startswith("pandas") and hasattr(valor, "memory_usage"):
+        uso = valor.memory_usage(deep=True)  # Series por columna en un DataFrame, un entero en una Series
+        return int(uso.sum()) if hasattr(uso, "sum") else int(uso)
+    from reciclaje.cache import tamano_aproximado  # Trae NumPy: solo se paga si hay algo que medir
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamano_de(k) + tamano_de(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(tamano_de(v) for v in valor)
+    return tamano_aproximado(valor)
+
+
+def _mb(n_bytes: float) -> float:
+    return round(n_bytes / 2 ** 20, 3)
+
+
+class _EstadisticaPagina:
+    __slots__ = ("reruns", "crecimiento_total", "crecimiento_max", "pico_max", "ultimo_crecimiento")
+
+    def __init__(self):
+        self.reruns = 0
+        self.crecimiento_total = 0
+        self.crecimiento_max = 0
+        self.pico_max = 0
+        self.ultimo_crecimiento = 0
+
+
+class PerfilMemoria:
+    """Perfil de asignaciones con tracemalloc (un registro por proceso, como METRICAS)."""
+
+    def __init__(self, marcos: int = 0):
+        self.marcos = marcos
+        self._lock = threading.Lock()
+        self._paginas: Dict[str, _EstadisticaPagina] = {}
+        self._base: Optional[tracemalloc.Snapshot] = None
+        self._grupos_base: Dict[tuple, dict] = {}  # (archivo, agrupar) -> grupos de la instantánea base
+        if self.activo and not tracemalloc.is_tracing():
+            tracemalloc.start(marcos)
+
+    @classmethod
+    def desde_entorno(cls) -> 'PerfilMemoria':
+        valor = os.environ.get("RECICLAJE_PERFIL_MEMORIA", "0")
+        return cls(marcos=int(valor) if valor.isdigit() else 0)
+
+    @property
+    def activo(self) -> bool:
+        return self.marcos > 0
+
+    # --- Por rerun ---
+    def iniciar_rerun(self) -> Optional[int]:
+        """Llamar al empezar el script de la página; devuelve lo que hay que pasarle a terminar_rerun."""
+        if not self.activo:
+            return None
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+    def terminar_rerun(self, pagina: str, inicio: Optional[int]):
+        """Registra cuánto quedó asignado de más al terminar el rerun y cuánto subió el pico."""
+        if inicio is None:
+            return
+        actual, pico = tracemalloc.get_traced_memory()
+        crecimiento = actual - inicio
+        with self._lock:
+            e = self._paginas.get(pagina)
+            if e is None:
+                e = self._paginas[pagina] = _EstadisticaPagina()
+            e.reruns += 1
+            e.crecimiento_total += crecimiento
+            e.crecimiento_max = max(e.crecimiento_max, crecimiento)
+            e.pico_max = max(e.pico_max, pico - inicio)
+            e.ultimo_crecimiento = crecimiento
+
+    def resumen_paginas(self) -> List[dict]:
+        """Una fila por página: reruns, crecimiento (total, máximo, último) y pico por rerun, en MB."""
+        with self._lock:
+            return [{
+                "pagina": pagina,
+                "reruns": e.reruns,
+                "crecimiento_total_mb": _mb(e.crecimiento_total),
+                "crecimiento_medio_mb": _mb(e.crecimiento_total / e.reruns),
+                "crecimiento_max_mb": _mb(e.crecimiento_max),
+                "ultimo_crecimiento_mb": _mb(e.ultimo_crecimiento),
+                "pico_max_mb": _mb(e.pico_max),
+            } for pagina, e in sorted(self._paginas.items())]
+
+    # --- Retenedores por ubicación ---
+    # Filtrar una instantánea traza por traza (filter_traces) tarda segundos con cientos de miles de
+    # asignaciones vivas: las ubicaciones excluidas se quitan después de agrupar, y los grupos de la
+    # instantánea base se calculan una sola vez por (archivo, agrupación).
+    def _agrupar(self, instantanea: tracemalloc.Snapshot, archivo: Optional[str],
+                 agrupar: str) -> Dict[tracemalloc.Traceback, Tuple[int, int]]:
+        if archivo is not None:
+            patron = os.path.join(RAIZ_PROYECTO, archivo)
+            instantanea = instantanea.filter_traces([tracemalloc.Filter(True, patron, all_frames=True)])
+        return {e.traceback: (e.size, e.count) for e in instantanea.statistics(agrupar)
+                if not any(fnmatch.fnmatch(e.traceback[0].filename, patron) for patron in _EXCLUIDOS)}
+
+    def retenedores(self, n: int = 15, archivo: Optional[str] = None, agrupar: str = "lineno") -> List[dict]:
+        """
+        Las `n` ubicaciones que más memoria retienen ahora, con su crecimiento contra la primera
+        instantánea (la primera llamada la toma). Con `archivo` (p. ej. "pages/Mapa.py") solo cuenta lo
+        asignado con ese archivo en la pila: requiere suficientes marcos para llegar al script de la página.
+        """
+        if not self.activo:
+            return []
+        instantanea = tracemalloc.take_snapshot()
+        with self._lock:
+            if self._base is None:
+                self._base, self._grupos_base = instantanea, {}
+            base, grupos_base = self._base, self._grupos_base
+        actual = self._agrupar(instantanea, archivo, agrupar)
+        clave = (archivo, agrupar)
+        if clave not in grupos_base:
+            grupos_base[clave] = actual if base is instantanea else self._agrupar(base, archivo, agrupar)
+        anterior = grupos_base[clave]
+
+        def crecimiento(traza) -> int:
+            return actual[traza][0] - anterior.get(traza, (0, 0))[0]
+
+        # Mismo orden que Snapshot.compare_to: primero lo que más cambió, luego lo más grande
+        filas = []
+        for traza in sorted(actual, key=lambda t: (abs(crecimiento(t)), actual[t][0]), reverse=True)[:n]:
+            marco = traza[0]
+            filas.append({
+                "ubicacion": f"{os.path.relpath(marco.filename, RAIZ_PROYECTO)}:{marco.lineno}"
+                             if marco.filename.startswith(RAIZ_PROYECTO) else f"{marco.filename}:{marco.lineno}",
+                "mb": _mb(actual[traza][0]),
+                "crecimiento_mb": _mb(crecimiento(traza)),
+                "bloques": actual[traza][1],
+            })
+        return filas
+
+    def reiniciar_base(self):
+        """La próxima llamada a retenedores() toma una instantánea nueva como punto de comparación."""
+        with self._lock:
+            self._base = None
+
+
+class PresupuestoSesion:
+    """
+    Tope de memoria por sesión sobre lo que guarda en session_state. `modo` es "avisar" (solo registra)
+    o "expulsar" (además borra las entradas más grandes no protegidas hasta quedar dentro del tope).
+    """
+
+    def __init__(self, presupuesto_mb: float = PRESUPUESTO_SESION_MB, modo: str = "avisar"):
+        if modo not in MODOS_PRESUPUESTO:
+            raise ValueError(f"Modo de presupuesto desconocido: {modo}")
+        self.presupuesto_bytes = int(presupuesto_mb * 2 ** 20)
+        self.modo = modo
+        self._lock = threading.Lock()
+        self._sesiones: Dict[str, Tuple[float, int]] = {}  # id de sesión -> (último rerun, bytes)
+
+    @classmethod
+    def desde_entorno(cls) -> 'PresupuestoSesion':
+        """Un valor inválido se avisa y se cambia por el de por defecto: esto corre al importar el módulo."""
+        presupuesto_mb = PRESUPUESTO_SESION_MB
+        valor = os.environ.get("RECICLAJE_PRESUPUESTO_SESION_MB")
+        if valor is not None:
+            try:
+                presupuesto_mb = float(valor)
+            except ValueError:
+                presupuesto_mb = math.nan
+            if not (math.isfinite(presupuesto_mb) and presupuesto_mb > 0):
+                print(f"--- RECICLAJE_PRESUPUESTO_SESION_MB inválido ({valor!r}); "
+                      f"se usan {PRESUPUESTO_SESION_MB} MB ---")
+                presupuesto_mb = PRESUPUESTO_SESION_MB
+        modo = os.environ.get("RECICLAJE_MODO_PRESUPUESTO", "avisar")
+        if modo not in MODOS_PRESUPUESTO:
+            print(f"--- RECICLAJE_MODO_PRESUPUESTO desconocido ({modo!r}); se usa 'avisar' ---")
+            modo = "avisar"
+        return cls(presupuesto_mb, modo)
+
+    def revisar(self, sesion: str, estado: MutableMapping, protegidas: Iterable[str] = ()) -> Dict[str, int]:
+        """
+        Mide cada entrada de `estado` (el session_state de la sesión), aplica el presupuesto y devuelve
+        {clave: bytes} de lo que quedó. Las claves `protegidas` (p. ej. las de widgets) nunca se borran.
+        """
+        tamanos = {}
+        for clave in list(estado.keys()):
+            try:
+                tamanos[clave] = tamano_de(estado[clave])
+            except (KeyError, TypeError):  # La entrada desapareció o no se deja medir
+                continue
+        total = sum(tamanos.values())
+        if total > self.presupuesto_bytes:
+            METRICAS.contar("memoria.sesiones_excedidas")
+            print(f"--- Sesión {sesion[:8]} usa {_mb(total)} MB en session_state "
+                  f"(presupuesto {_mb(self.presupuesto_bytes)} MB) ---")
+            if self.modo == "expulsar":
+                protegidas = set(protegidas)
+                for clave in sorted(tamanos, key=tamanos.get, reverse=True):
+                    if total <= self.presupuesto_bytes:
+                        break
+                    if clave in protegidas:
+                        continue
+                    del estado[clave]
+                    total -= tamanos.pop(clave)
+                    METRICAS.contar("memoria.expulsiones")
+                    print(f"--- Expulsada '{clave}' de la sesión {sesion[:8]} ---")
+
+        ahora = time.monotonic()
+        with self._lock:
+            self._sesiones[sesion] = (ahora, total)
+            for otra, (visto, _) in list(self._sesiones.items()):
+                if ahora - visto > INACTIVIDAD_SESION_S:
+                    del self._sesiones[otra]
+        return tamanos
+
+    def resumen(self) -> dict:
+        """Sesiones activas y su memoria en session_state (para dimensionar réplicas)."""
+        with self._lock:
+            tamanos = sorted(total for _, total in self._sesiones.values())
+        return {
+            "sesiones": len(tamanos),
+            "total_mb": _mb(sum(tamanos)),
+            "mediana_mb": _mb(tamanos[len(tamanos) // 2]) if tamanos else 0.0,
+            "max_mb": _mb(tamanos[-1]) if tamanos else 0.0,
+            "presupuesto_mb": _mb(self.presupuesto_bytes),
+            "modo": self.modo,
+        }
+
+
+# Registros globales del proceso (configurados por variables de entorno)
+PERFIL_MEMORIA = PerfilMemoria.desde_entorno()
+PRESUPUESTO_SESION = PresupuestoSesion.desde_entorno()
@@ -0,0 +1,83 @@
+# ====================================================================
+# --- MODELOS DE DATOS (sin dependencias de Streamlit) ---
+# ====================================================================
+# Estas clases vivían dentro de pages/Mapa.py. Se movieron aquí para poder
+# importarlas fuera de la app (benchmarks, scripts) sin ejecutar la interfaz.
+from reciclaje.horarios import cumple_condicion_horario
+
+
+# --- PARADIGMA POO (Modelos de Datos) ---
+
+class CentroReciclaje:
+    """Clase que representa un único centro de reciclaje. Modela la estructura de nuestros datos."""
+
+    # Sin __dict__ por instancia: con decenas de miles de centros el ahorro de memoria es notable
+    __slots__ = ('nombre', 'lat', 'lon', 'horario', 'ubicacion', 'distance', 'materiales')
+
+    def __init__(self, nombre=None, lat=None, lon=None, horario=None, materiales=None, ubicacion=None, **kwargs):
+        """Constructor robusto que acepta campos opcionales de Firebase."""
+        self.nombre = nombre if nombre else "Nombre no disponible"
+        self.lat = float(lat) if lat is not None else 0.0
+        self.lon = float(lon) if lon is not None else 0.0
+        self.horario = horario if horario else "No disponible"
+        self.ubicacion = ubicacion if ubicacion else self.nombre
+        self.distance = None  # No se llena aquí: la distancia depende de cada usuario (ver reciclaje/espacial.py)
+
+        # Convierte el STRING 'materiales' en una LISTA
+        if isinstance(materiales, str):
+            temp_list = materiales.lower().split(',')
+            self.materiales = [m.strip() for m in temp_list if m.strip()]
+        elif isinstance(materiales, list):
+            self.materiales = [str(m).lower().strip() for m in materiales]
+        else:
+            self.materiales = []
+
+
+# --- PARADIGMA LÓGICO (Motor de Reglas) ---
+
+class Regla:
+    """Clase que modela una regla 'SI-ENTONCES' leída de Firebase."""
+
+    def __init__(self, condicions_str: str, conclusiones: str):
+        self.conclusiones = conclusiones
+        self.condiciones_list = []
+
+        # Parsea el string combinado de condiciones
+        # Ej: "material:pet;ubicacion:polanco"
+        for cond in condicions_str.split(';'):
+            if ':' in cond:
+                key, val = cond.split(':', 1)
+                self.condiciones_list.append((key.strip().lower(), val.strip().lower()))
+
+    def checar_condiciones(self, centro: CentroReciclaje) -> bool:
+        """Compara este centro (hecho) con las condiciones de esta regla."""
+        for key, value in self.condiciones_list:
+            if key == 'material':
+                if value not in centro.materiales:
+                    return False
+            elif key == 'horario':
+                # Días y "24 horas" se comparan contra el horario interpretado (ver reciclaje/horarios.py)
+                if not cumple_condicion_horario(value, centro.horario):
+                    return False
+            elif key == 'ubicacion':
+                if value != centro.ubicacion.lower():
+                    return False
+            else:
+                pass
+        return True
+
+
+# --- CONVERSIÓN DE DOCUMENTOS DE FIREBASE ---
+
+def regla_desde_documento(data: dict):
+    """
+    Crea una Regla a partir de un documento de la colección 'reglas'
+    (campos 'condicion1', 'condicion2', ... y 'conclusion').
+    Devuelve None si el documento no tiene 'conclusion' o no tiene condiciones.
+    """
+    if 'conclusion' not in data:
+        return None
+    lista_condiciones_str = [str(value) for key, value in data.items() if key.startswith('condicion')]
+    if not lista_condiciones_str:
+        return None
+    return Regla(";".join(lista_condiciones_str), data['conclusion'])
@@ -0,0 +1,168 @@
+# ====================================================================
+# --- MOTOR DE RECOMENDACIÓN (Lógica de Negocio) ---
+# ====================================================================
+# PARADIGMA POO (Lógica de Negocio) Y FUNCIONAL. Antes vivía en pages/Mapa.py;
+# aquí no depende de Streamlit, así que lo pueden usar los benchmarks y scripts.
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from reciclaje.agrupamiento import AgrupadorMapa, VistaMapa
+from reciclaje.almacen import AlmacenCentros
+from reciclaje.cache import CacheLRU, normalizar_seleccion
+from reciclaje.catalogo import Catalogo
+from reciclaje.espacial import IndiceEspacial, haversine_km
+from reciclaje.horarios import IndiceHorarios
+from reciclaje.indices import IndiceMateriales, IndiceReglas, cobertura_voraz
+from reciclaje.instrumentacion import METRICAS
+from reciclaje.modelos import CentroReciclaje, Regla
+
+
+class Recomendador:
+    """Encapsula toda la lógica de negocio: cargar, filtrar y ordenar los centros."""
+
+    def __init__(self, catalogo: Catalogo, cache: Optional[CacheLRU] = None):
+        # Se guarda UNA versión del catálogo: todas las consultas de este objeto usan los mismos datos
+        self._catalogo = catalogo
+        # Caché compartida entre sesiones; las claves llevan la versión del catálogo
+        self._cache = cache
+        self._centros: List[CentroReciclaje] = catalogo.centros
+        self._reglas: List[Regla] = catalogo.reglas
+        self._indice_materiales: IndiceMateriales = catalogo.indice_materiales
+        self._indice_reglas: IndiceReglas = catalogo.indice_reglas
+        self._indice_espacial: IndiceEspacial = catalogo.indice_espacial
+        self._indice_horarios: IndiceHorarios = catalogo.indice_horarios
+        self._almacen: AlmacenCentros = catalogo.almacen
+        self._agrupador: AgrupadorMapa = catalogo.agrupador_mapa
+
+    def get_all_centros(self) -> List[CentroReciclaje]:
+        return self._centros
+
+    def get_version(self) -> int:
+        """Versión del catálogo sobre la que responde este objeto (los ids solo valen para ella)."""
+        return self._catalogo.version
+
+    def get_almacen(self) -> AlmacenCentros:
+        return self._almacen
+
+    def get_centros_por_ids(self, ids: np.ndarray) -> List[CentroReciclaje]:
+        return [self._centros[i] for i in ids]
+
+    def get_all_materials(self) -> List[str]:
+        # Las claves del índice son exactamente los materiales de todos los centros: no hace falta recorrerlos
+        return sorted({material.capitalize() for material in self._indice_materiales.bitmaps()})
+
+    def conteos_materiales(self, selected_materials: List[str]) -> Dict[str, int]:
+        """
+        {material (en minúsculas): centros que quedarían al agregarlo a la selección}, para mostrar junto a
+        cada opción de la multiselect. Sale de las filas de coocurrencia del índice de materiales.
+        """
+        seleccion = normalizar_seleccion(selected_materials)
+
+        def calcular():
+            return self._indice_materiales.conteos_con(seleccion, self._almacen.conteo_materiales)
+
+        if self._cache is None:
+            return calcular()
+        return self._cache.obtener(("conteos", seleccion, self._catalogo.version), calcular)
+
+    # --- DEMOSTRACIÓN DE PARADIGMA FUNCIONAL ---
+    def filter_by_materials(self, selected_materials: List[str]) -> List[CentroReciclaje]:
+        if not selected_materials:
+            return self._centros
+        return list(map(self._centros.__getitem__, self.filter_ids_by_materials(selected_materials)))
+
+    def filter_ids_by_materials(self, selected_materials: List[str]) -> np.ndarray:
+        """Igual que filter_by_materials, pero devuelve un arreglo con las posiciones de los centros."""
+        if not selected_materials:
+            return np.arange(len(self._centros))
+        seleccion = normalizar_seleccion(selected_materials)
+
+        def calcular():
+            # Intersección de bitmaps del índice invertido en lugar de recorrer cada centro
+            return self._indice_materiales.arreglo_con_materiales(seleccion)
+
+        if self._cache is None:
+            return calcular()
+        return self._cache.obtener(("ids", seleccion, self._catalogo.version), calcular)
+
+    def cubrir_materiales(self, selected_materials: List[str], ids: Optional[np.ndarray] = None,
+                          lat: Optional[float] = None, lon: Optional[float] = None) -> Tuple[np.ndarray, List[str]]:
+        """
+        Para cuando ningún centro acepta TODA la selección: unos pocos centros (de `ids`, o de todos) que
+        entre todos la aceptan, en el orden en que se eligieron (el que más cubre primero). Con (lat, lon),
+        entre dos que cubren lo mismo se prefiere el más cercano. Devuelve (ids, materiales sin cubrir).
+        """
+        seleccion = normalizar_seleccion(selected_materials)
+        mascaras, bit_de = self._indice_materiales.mascaras_de(seleccion)
+        objetivo = sum(1 << bit for bit in bit_de.values())
+
+        def distancia_km(candidatos):
+            return haversine_km(lat, lon, self._almacen.lat[candidatos], self._almacen.lon[candidatos])
+
+        con_ubicacion = lat is not None and lon is not None
+        elegidos = cobertura_voraz(mascaras, objetivo, ids, distancia_km if con_ubicacion else None)
+        cubiertos = int(np.bitwise_or.reduce(mascaras[elegidos])) if len(elegidos) else 0
+        sin_cubrir = [m for m in seleccion if m not in bit_de or not cubiertos >> bit_de[m] & 1]
+        return elegidos, sin_cubrir
+
+    def filter_ids_abiertos(self, ids: np.ndarray, minuto_semana: int) -> np.ndarray:
+        """De los ids dados, los centros abiertos en ese minuto de la semana (ver reciclaje/horarios.py)."""
+        return self._indice_horarios.ids_abiertos(minuto_semana, ids)
+
+    def buscar_texto(self, texto: str, ids: np.ndarray) -> np.ndarray:
+        """De los ids dados, los que coinciden con el texto (nombre o ubicación), los más parecidos primero."""
+        permitidos = np.zeros(len(self._centros), dtype=bool)
+        permitidos[ids] = True
+        ids_encontrados, _ = self._catalogo.indice_texto.buscar(texto, permitidos)
+        return ids_encontrados
+
+    def contar_horarios_desconocidos(self, ids: np.ndarray) -> int:
+        """Cuántos de los ids tienen un horario que no se pudo interpretar."""
+        return int(np.count_nonzero(~self._indice_horarios.conocido[ids]))
+
+    # --- sort_by_distance() regresó, ahora apoyado en el índice espacial ---
+    def sort_by_distance(self, ids: np.ndarray, lat: float, lon: float,
+                         k: Optional[int] = None, radio_km: Optional[float] = None):
+        """
+        Ordena los centros indicados por cercanía a (lat, lon). Con `k` devuelve solo los k más
+        cercanos; con `radio_km`, los que están dentro del radio. Devuelve (ids, distancias_km).
+        """
+        permitidos = np.zeros(len(self._centros), dtype=bool)
+        permitidos[ids] = True
+        if radio_km is not None:
+            ids_cercanos, distancias = self._indice_espacial.en_radio(lat, lon, radio_km, permitidos)
+        else:
+            ids_cercanos, distancias = self._indice_espacial.k_cercanos(lat, lon, k or len(ids), permitidos)
+        return ids_cercanos, distancias
+
+    def get_vista_mapa(self, ids: np.ndarray, zoom: Optional[int] = None,
+                       centro: Optional[Tuple[float, float]] = None) -> VistaMapa:
+        """Puntos del mapa para los ids: agrupados por celda con zoom bajo, sueltos con zoom alto."""
+        return self._agrupador.vista(ids, zoom, centro)
+
+    def get_conclusiones_por_ids(self, ids: np.ndarray):
+        """Lo mismo que aplicar_motor_logico, pero leído de la vista materializada del catálogo."""
+        with METRICAS.tramo("conclusiones", centros=len(ids)):
+            return self._catalogo.vista_conclusiones.conclusiones_por_ids(ids)
+
+    def get_conclusiones_por_materiales(self, selected_materials: List[str]):
+        """Conclusiones de los centros que aceptan la selección (mismo orden que filter_ids_by_materials)."""
+        def calcular():
+            return self.get_conclusiones_por_ids(self.filter_ids_by_materials(selected_materials))
+
+        if self._cache is None:
+            return calcular()
+        clave = ("conclusiones", normalizar_seleccion(selected_materials), self._catalogo.version)
+        return self._cache.obtener(clave, calcular)
+
+    # --- METODO DEL MOTOR DE INFERENCIA LÓGICA ---
+    def aplicar_motor_logico(self, centros_filtrados: List[CentroReciclaje]):
+        resultados_logicos = {}
+        with METRICAS.tramo("motor_logico", reglas=len(self._reglas), centros=len(centros_filtrados)):
+            for centro in centros_filtrados:
+                # Solo se evalúan las reglas cuya condición ancla puede cumplirse para este centro
+                conclusiones_encontradas = self._indice_reglas.conclusiones_para(centro)
+                if conclusiones_encontradas:
+                    resultados_logicos[centro.nombre] = conclusiones_encontradas
+        return resultados_logicos
@@ -0,0 +1,126 @@
+# ====================================================================
+# --- RECURSOS GRÁFICOS: VARIANTES REDIMENSIONADAS Y RECOMPRIMIDAS ---
+# ====================================================================
+# Las imágenes de assets/ son originales a resolución completa (la cabecera
+# de Inicio.py pesa ~3.4 MB y mide 5697 px de ancho). Con bytes así, st.image
+# decodifica, reduce y vuelve a codificar la imagen EN CADA RERUN (~0.7 s para
+# la cabecera). Aquí se generan UNA vez, en assets/optimizados/, variantes que
+# st.image manda tal cual: a lo más del ancho con que se muestran y en JPEG o
+# PNG (cualquier otro formato, WebP incluido, st.image lo reconvierte a uno de
+# esos dos en cada rerun). La página solo lee esas variantes; si falta alguna o
+# ya no corresponde a su original (según el manifiesto: checksum del original y
+# parámetros), se genera en memoria (y se intenta guardar) la primera vez.
+#
+# Uso (desde la raíz del proyecto), después de cambiar algo en assets/:
+#     python -m reciclaje.recursos
+import hashlib
+import io
+import json
+import os
+from typing import Dict, NamedTuple
+
+DIR_RECURSOS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets")
+DIR_OPTIMIZADOS = os.path.join(DIR_RECURSOS, "optimizados")
+RUTA_MANIFIESTO = os.path.join(DIR_OPTIMIZADOS, "manifiesto.json")
+
+
+class Variante(NamedTuple):
+    original: str      # Archivo dentro de assets/
+    ancho_px: int      # Ancho máximo de la variante (nunca se agranda el original)
+    formato: str       # "JPEG" para fotos, "PNG" para íconos con transparencia
+    calidad: int = 80  # Solo JPEG
+
+
+# st.image reduce (y recodifica) todo lo que pase del ancho con que se muestra: width=100 en los
+# íconos, y 2 x 730 px con width='stretch' (la cabecera se deja en 2 x 704, el layout "centered").
+VARIANTES: Dict[str, Variante] = {
+    "cabecera": Variante("photo-1532996122724-e3c354a0b15b.jpeg", 1408, "JPEG"),
+    "icono_ubicate": Variante("3477113.png", 100, "PNG"),
+    "icono_filtra": Variante("3500826.png", 100, "PNG"),
+    "icono_encuentra": Variante("search_24dp_000000_FILL0_wght400_GRAD0_opsz24.png", 100, "PNG"),
+}
+
+
+def ruta_variante(nombre: str) -> str:
+    extension = "jpg" if VARIANTES[nombre].formato == "JPEG" else "png"
+    return os.path.join(DIR_OPTIMIZADOS, f"{nombre}.{extension}")
+
+
+def codificar(variante: Variante) -> bytes:
+    """Redimensiona y recomprime el original de `variante`."""
+    from PIL import Image  # Pillow viene con Streamlit; solo se carga si hay que generar algo
+
+    with Image.open(os.path.join(DIR_RECURSOS, variante.original)) as imagen:
+        imagen.load()
+        if imagen.width > variante.ancho_px:
+            alto = round(imagen.height * variante.ancho_px / imagen.width)
+            imagen = imagen.resize((variante.ancho_px, alto), Image.LANCZOS)
+        salida = io.BytesIO()
+        if variante.formato == "JPEG":
+            imagen.convert("RGB").save(salida, "JPEG", quality=variante.calidad, optimize=True, progressive=True)
+        else:
+            imagen.save(salida, "PNG", optimize=True)
+    return salida.getvalue()
+
+
+def _firma(variante: Variante) -> dict:
+    """Contenido del original y parámetros de la variante (las fechas de archivo no sirven: git no las conserva)."""
+    with open(os.path.join(DIR_RECURSOS, variante.original), 'rb') as f:
+        sha256 = hashlib.sha256(f.read()).hexdigest()
+    return {"original": variante.original, "sha256": sha256, "ancho_px": variante.ancho_px,
+            "formato": variante.formato, "calidad": variante.calidad}
+
+
+def _leer_manifiesto() -> dict:
+    try:
+        with open(RUTA_MANIFIESTO, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _escribir(ruta: str, datos: bytes):
+    temporal = ruta + ".tmp"
+    with open(temporal, 'wb') as f:
+        f.write(datos)
+    os.replace(temporal, ruta)
+
+
+def generar(nombre: str, forzar: bool = False) -> bytes:
+    """Bytes de la variante `nombre`: del disco si está vigente; si no, se codifica y se intenta guardar."""
+    variante = VARIANTES[nombre]
+    firma = _firma(variante)
+    manifiesto = _leer_manifiesto()
+    if not forzar and manifiesto.get(nombre) == firma and os.path.exists(ruta_variante(nombre)):
+        with open(ruta_variante(nombre), 'rb') as f:
+            return f.read()
+    datos = codificar(variante)
+    try:
+        os.makedirs(DIR_OPTIMIZADOS, exist_ok=True)
+        _escribir(ruta_variante(nombre), datos)
+        manifiesto[nombre] = firma
+        _escribir(RUTA_MANIFIESTO, json.dumps(manifiesto, indent=2, sort_keys=True).encode("utf-8"))
+    except OSError as e:  # Disco de solo lectura en el servidor: se sirve desde memoria
+        print(f"--- No se pudo guardar la variante '{nombre}': {e} ---")
+    return datos
+
+
+def cargar_recursos() -> Dict[str, bytes]:
+    """{nombre: bytes de la variante} de todas las variantes cuyo original existe (pensado para st.cache_resource)."""
+    recursos = {}
+    for nombre, variante in VARIANTES.items():
+        if os.path.exists(os.path.join(DIR_RECURSOS, variante.original)):
+            recursos[nombre] = generar(nombre)
+    return recursos
+
+
+def main():
+    for nombre, variante in VARIANTES.items():
+        original = os.path.join(DIR_RECURSOS, variante.original)
+        datos = generar(nombre, forzar=True)
+        print(f"{nombre:<16} {os.path.getsize(original) / 1024:9.1f} KB -> {len(datos) / 1024:7.1f} KB  "
+              f"({ruta_variante(nombre)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+# ====================================================================
+# --- SINCRONIZACIÓN INCREMENTAL CON FIRESTORE ---
+# ====================================================================
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from reciclaje.cargador import CAMPOS_CENTROS, CAMPOS_REGLAS, cargar_colecciones
+from reciclaje.catalogo import Catalogo
+from reciclaje.instantanea import DatosInstantanea, Instantanea
+from reciclaje.instrumentacion import METRICAS
+from reciclaje.modelos import CentroReciclaje, regla_desde_documento
+
+COLECCION_CENTROS = 'centros_reciclaje'
+COLECCION_REGLAS = 'reglas'
+CAMPO_ACTUALIZACION = 'updated_at'
+
+
+class _EstadoColeccion:
+    """Documentos crudos y objetos ya convertidos de una colección, indexados por id de documento."""
+
+    def __init__(self, nombre: str, convertir: Callable[[dict], object], campos=None):
+        self.nombre = nombre
+        self.convertir = convertir
+        self.campos = campos  # Proyección que se pide a Firestore (None = documento completo)
+        self.datos: Dict[str, dict] = {}
+        self.objetos: Dict[str, object] = {}
+        self.marcas: Dict[str, object] = {}  # 'updated_at' de cada documento (se guarda en la instantánea)
+        self.cursor = None  # Mayor 'updated_at' visto hasta ahora
+
+    def aplicar(self, doc_id: str, datos: Optional[dict]) -> bool:
+        """Agrega, cambia (datos nuevos) o quita (datos=None) un documento. Devuelve True si hubo cambio."""
+        if datos is None:
+            if doc_id not in self.datos:
+                return False
+            del self.datos[doc_id]
+            self.objetos.pop(doc_id, None)
+            self.marcas.pop(doc_id, None)
+            return True
+
+        marca = datos.get(CAMPO_ACTUALIZACION)
+        if marca is not None and (self.cursor is None or marca > self.cursor):
+            self.cursor = marca
+        anteriores = self.datos.get(doc_id)
+        if anteriores == datos:
+            return False
+        if anteriores is None and doc_id in self.datos and marca is not None and self.marcas.get(doc_id) == marca:
+            # Restaurado de la instantánea (sin datos crudos) y con la misma marca: es el mismo documento,
+            # releído porque la consulta 'updated_at >= cursor' incluye los empatados con el cursor
+            self.datos[doc_id] = datos
+            return False
+        self.datos[doc_id] = datos
+        if marca is not None:
+            self.marcas[doc_id] = marca
+        objeto = self.convertir(datos)
+        if objeto is None:
+            self.objetos.pop(doc_id, None)
+        else:
+            self.objetos[doc_id] = objeto
+        return True
+
+    def ids_ordenados(self) -> List[str]:
+        # Mismo orden que un .stream() completo: por id de documento
+        return sorted(self.objetos)
+
+    def lista_ordenada(self) -> List:
+        return [self.objetos[doc_id] for doc_id in self.ids_ordenados()]
+
+    def marcas_ordenadas(self) -> List:
+        return [self.marcas.get(doc_id) for doc_id in self.ids_ordenados()]
+
+    def restaurar(self, ids: List[str], objetos: List, cursor, marcas: Optional[List] = None):
+        """
+        Carga objetos ya convertidos (de una instantánea). Sus datos crudos se desconocen (None); con
+        las `marcas` ('updated_at' de cada documento) se reconocen los que se releen sin cambios.
+        """
+        self.datos = dict.fromkeys(ids)
+        self.objetos = dict(zip(ids, objetos))
+        self.marcas = {doc_id: marca for doc_id, marca in zip(ids, marcas or ()) if marca is not None}
+        self.cursor = cursor
+
+
+class SincronizadorCatalogo:
+    """
+    Mantiene un Catalogo al día aplicando solo los documentos que cambiaron.
+
+    - Altas y cambios: consulta `updated_at >= cursor` en cada colección (los
+      escritores deben poner `updated_at = firestore.SERVER_TIMESTAMP`).
+    - Bajas (y altas sin `updated_at`): cada `intervalo_reconciliacion_s` se
+      comparan los ids con `list_documents()`, que no descarga los datos.
+
+    Cada cambio publica un Catalogo nuevo (version + 1); quien ya tenía el
+    anterior lo sigue usando sin ver índices a medio actualizar.
+
+    Con una `instantanea`, arrancar() sirve primero lo guardado en disco y
+    trae de Firestore solo lo que cambió desde entonces, en segundo plano.
+    La primera versión publicada es `version_inicial + 1`.
+    """
+
+    def __init__(self, db, intervalo_s: float = 30.0, intervalo_reconciliacion_s: float = 600.0,
+                 instantanea: Optional[Instantanea] = None, version_inicial: int = 0):
+        self._db = db
+        self._instantanea = instantanea
+        self._pendiente_guardar = None  # (catalogo, ids_centros, ids_reglas, cursores) por escribir a disco
+        self._refresco_inicial: Optional[Callable[[], object]] = None
+        self.intervalo_s = intervalo_s
+        self.intervalo_reconciliacion_s = intervalo_reconciliacion_s
+        self._centros = _EstadoColeccion(COLECCION_CENTROS, lambda d: CentroReciclaje(**d), CAMPOS_CENTROS)
+        self._reglas = _EstadoColeccion(COLECCION_REGLAS, regla_desde_documento, CAMPOS_REGLAS)
+        self.ultimo_informe = {}  # Informe de la última carga completa, por colección
+        self._catalogo = Catalogo([], [], version=version_inicial)
+        self._lock = threading.Lock()
+        self._ultima_reconciliacion = time.monotonic()
+        self._suscriptores: List[Callable[[Catalogo], None]] = []
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def catalogo(self) -> Catalogo:
+        return self._catalogo
+
+    def suscribir(self, callback: Callable[[Catalogo], None]):
+        """Registra una función que se llama con cada Catalogo nuevo (p. ej. para invalidar cachés)."""
+        self._suscriptores.append(callback)
+
+    def _publicar(self, catalogo: Optional[Catalogo] = None):
+        if catalogo is None:
+            catalogo = Catalogo(self._centros.lista_ordenada(), self._reglas.lista_ordenada(),
+                                anterior=self._catalogo)
+        catalogo.version = self._catalogo.version + 1
+        self._catalogo = catalogo
+        if self._instantanea is not None:
+            self._pendiente_guardar = (catalogo, self._centros.ids_ordenados(), self._reglas.ids_ordenados(),
+                                       {COLECCION_CENTROS: self._centros.cursor, COLECCION_REGLAS: self._reglas.cursor},
+                                       {COLECCION_CENTROS: self._centros.marcas_ordenadas(),
+                                        COLECCION_REGLAS: self._reglas.marcas_ordenadas()})
+        for callback in self._suscriptores:
+            callback(self._catalogo)
+
+    def _guardar_pendiente(self):
+        pendiente, self._pendiente_guardar = self._pendiente_guardar, None
+        if pendiente is not None:
+            try:
+                self._instantanea.guardar(*pendiente)
+            except Exception as e:
+                print(f"--- ERROR al guardar la instantánea: {e} ---")
+
+    # --- Arranque (instantánea en disco o carga completa) ---
+    def restaurar(self, datos: DatosInstantanea) -> Catalogo:
+        """Publica el catálogo de una instantánea y prepara los cursores para seguir desde ahí."""
+        with self._lock:
+            self._centros.restaurar(datos.ids_centros, datos.catalogo.centros, datos.cursores.get(COLECCION_CENTROS),
+                                    datos.marcas.get(COLECCION_CENTROS))
+            self._reglas.restaurar(datos.ids_reglas, datos.catalogo.reglas, datos.cursores.get(COLECCION_REGLAS),
+                                   datos.marcas.get(COLECCION_REGLAS))
+            self._publicar(datos.catalogo)
+            self._pendiente_guardar = None  # Lo que hay en disco ya es esto
+        return self._catalogo
+
+    def arrancar(self) -> Catalogo:
+        """
+        Devuelve un catálogo listo para servir lo antes posible. Si hay una instantánea válida se
+        usa tal cual y el refresco contra Firestore queda pendiente para el hilo en segundo plano.
+        """
+        datos = self._instantanea.cargar() if self._instantanea is not None else None
+        if datos is None:
+            return self.carga_completa()
+        self.restaurar(datos)
+        if self._centros.cursor is None and self._reglas.cursor is None:
+            # Sin 'updated_at' no hay forma de saber qué cambió: se relee todo, pero sin bloquear
+            self._refresco_inicial = self.carga_completa
+        else:
+            self._refresco_inicial = lambda: self.sincronizar(reconciliar=True)
+        return self._catalogo
+
+    # --- Carga completa ---
+    def carga_completa(self) -> Catalogo:
+        """
+        Lee ambas colecciones completas (a la vez, paginadas y proyectadas; ver reciclaje/cargador.py)
+        y publica una versión nueva.
+        """
+        with self._lock:
+            inicio = time.perf_counter()
+            estados = (self._centros, self._reglas)
+            vistos = {estado.nombre: set() for estado in estados}
+
+            def destino(estado):
+                def aplicar(doc_id, datos):
+                    vistos[estado.nombre].add(doc_id)
+                    estado.aplicar(doc_id, datos)
+                return aplicar
+
+            with METRICAS.tramo("sync.carga_completa"):
+                self.ultimo_informe = cargar_colecciones(
+                    self._db, {estado.nombre: destino(estado) for estado in estados},
+                    campos={estado.nombre: estado.campos for estado in estados})
+            for informe in self.ultimo_informe.values():
+                METRICAS.contar(f"documentos_leidos.{informe.coleccion}", informe.documentos)
+            for estado in estados:
+                for doc_id in set(estado.datos) - vistos[estado.nombre]:
+                    estado.aplicar(doc_id, None)
+            self._ultima_reconciliacion = time.monotonic()
+            self._publicar()
+        for informe in self.ultimo_informe.values():
+            print(f"--- Leído {informe} ---")
+        print(f"--- Carga completa: {len(self._catalogo.centros)} centros y {len(self._catalogo.reglas)} reglas "
+              f"en {(time.perf_counter() - inicio) * 1000:.0f} ms (versión {self._catalogo.version}) ---")
+        return self._catalogo
+
+    # --- Sincronización incremental ---
+    def _traer_cambios(self, estado: _EstadoColeccion) -> int:
+        if estado.cursor is None:
+            return 0
+        from google.cloud.firestore_v1 import FieldFilter
+
+        consulta = self._db.collection(estado.nombre).where(
+            filter=FieldFilter(CAMPO_ACTUALIZACION, '>=', estado.cursor))
+        if estado.campos is not None:
+            consulta = consulta.select(list(estado.campos))
+        return sum(estado.aplicar(doc.id, doc.to_dict()) for doc in consulta.stream())
+
+    def _reconciliar(self, estado: _EstadoColeccion) -> int:
+        coleccion = self._db.collection(estado.nombre)
+        ids_remotos = {ref.id for ref in coleccion.list_documents()}
+        cambios = sum(estado.aplicar(doc_id, None) for doc_id in set(estado.datos) - ids_remotos)
+        for doc_id in ids_remotos - set(estado.datos):
+            snapshot = coleccion.document(doc_id).get(field_paths=estado.campos)
+            if snapshot.exists:
+                cambios += estado.aplicar(doc_id, snapshot.to_dict())
+        return cambios
+
+    def sincronizar(self, reconciliar: Optional[bool] = None) -> bool:
+        """
+        Aplica los cambios pendientes. Devuelve True si se publicó un Catalogo nuevo.
+        Si otro hilo ya está sincronizando, no hace nada.
+        """
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            if reconciliar is None:
+                reconciliar = time.monotonic() - self._ultima_reconciliacion >= self.intervalo_reconciliacion_s
+            cambios = 0
+            with METRICAS.tramo("sync.incremental", reconciliar=reconciliar):
+                for estado in (self._centros, self._reglas):
+                    cambios += self._traer_cambios(estado)
+                    if reconciliar:
+                        cambios += self._reconciliar(estado)
+            METRICAS.contar("sync.documentos_aplicados", cambios)
+            if reconciliar:
+                self._ultima_reconciliacion = time.monotonic()
+            if cambios:
+                self._publicar()
+                print(f"--- Sincronización: {cambios} documentos aplicados (versión {self._catalogo.version}) ---")
+            return bool(cambios)
+        finally:
+            self._lock.release()
+
+    def iniciar_en_segundo_plano(self):
+        """
+        Arranca un hilo demonio que primero hace el refresco pendiente de arrancar() y luego llama a
+        sincronizar() cada `intervalo_s` segundos. La instantánea en disco se escribe desde este hilo.
+        """
+        if self._hilo is not None:
+            return
+
+        def ciclo():
+            tarea = self._refresco_inicial
+            while True:
+                try:
+                    if tarea is not None:
+                        tarea()
+                    # Conclusiones del motor lógico listas antes de que alguien abra el expander
+                    # (si ya había una vista, solo se actualiza lo que cambió)
+                    with METRICAS.tramo("sync.vista_conclusiones"):
+                        self._catalogo.vista_conclusiones
+                    self._guardar_pendiente()
+                except Exception as e:
+                    print(f"--- ERROR en la sincronización con Firebase: {e} ---")
+                if self._detener.wait(self.intervalo_s):
+                    break
+                tarea = self.sincronizar
+
+        self._hilo = threading.Thread(target=ciclo, name="sincronizador-catalogo", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
@@ -0,0 +1,87 @@
+# Almacén columnar: páginas ordenadas iguales a ordenar toda la tabla y cortarla
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from benchmarks.datos_sinteticos import crear_catalogo, posicion_aleatoria
+from reciclaje.almacen import TAM_PAGINA_TABLA, AlmacenCentros
+from reciclaje.espacial import haversine_km
+
+
+@pytest.fixture(scope="module")
+def catalogo():
+    return crear_catalogo(2000, 1)
+
+
+def filtros(n: int):
+    rng = np.random.default_rng(8)
+    # Todo, un subconjunto, pocos, ninguno y uno en desorden (como los de la búsqueda por cercanía)
+    return [np.arange(n), np.flatnonzero(rng.random(n) < 0.4), np.flatnonzero(rng.random(n) < 0.01),
+            np.empty(0, dtype=np.int64), rng.permutation(n)[:700]]
+
+
+def orden_completo(almacen, ids, columna, descendente):
+    """Ordena todos los ids por la columna (empates por lugar en el catálogo), como haría sort_values."""
+    valores = getattr(almacen, columna)
+    orden = sorted(ids.tolist(), key=lambda i: (valores[i], i))
+    return orden[::-1] if descendente else orden
+
+
+def paginas(almacen, ids, tam_pagina, **kwargs):
+    total = -(-len(ids) // tam_pagina)
+    return [almacen.pagina_de(ids, p, tam_pagina, **kwargs) for p in range(total + 1)]  # Y una de más
+
+
+@pytest.mark.parametrize("columna", [None, "nombre", "ubicacion", "horario"])
+@pytest.mark.parametrize("descendente", [False, True])
+def test_paginas_igual_que_ordenar_todo(catalogo, columna, descendente):
+    almacen = catalogo.almacen
+    for ids in filtros(len(almacen)):
+        if columna is None:
+            esperados = ids.tolist()
+        else:
+            esperados = orden_completo(almacen, ids, columna, descendente)
+        for tam_pagina in (TAM_PAGINA_TABLA, 7):
+            hojas = paginas(almacen, ids, tam_pagina, orden_por=columna, descendente=descendente)
+            assert all(len(h) == tam_pagina for h in hojas[:-2]) and len(hojas[-1]) == 0
+            assert [n for h in hojas for n in h["nombre"]] == [almacen.nombre[i] for i in esperados]
+            assert list(hojas[0].columns) == list(almacen.tabla.columns)
+
+
+def test_paginas_por_distancia(catalogo):
+    almacen = catalogo.almacen
+    rng = random.Random(2)
+    for ids in filtros(len(almacen)):
+        lat, lon = posicion_aleatoria(rng)
+        distancias = haversine_km(lat, lon, almacen.lat[ids], almacen.lon[ids])
+        for descendente in (False, True):
+            hojas = paginas(almacen, ids, TAM_PAGINA_TABLA, orden_por="distancia_km", descendente=descendente,
+                            distancias=distancias)
+            obtenidas = [d for h in hojas for d in h["distancia_km"]]
+            esperadas = sorted(np.round(distancias, 2).tolist(), reverse=descendente)
+            assert obtenidas == esperadas
+            # Cada fila trae la distancia de su propio centro
+            for h in hojas[:3]:
+                np.testing.assert_allclose(haversine_km(lat, lon, h["lat"].to_numpy(), h["lon"].to_numpy()),
+                                           h["distancia_km"], atol=0.006)
+
+
+def test_tabla_y_conteos(catalogo):
+    almacen = catalogo.almacen
+    for ids in filtros(len(almacen)):
+        tabla = almacen.tabla_de(ids)
+        assert tabla["nombre"].tolist() == [catalogo.centros[i].nombre for i in ids]
+        assert tabla.index.tolist() == list(range(len(ids)))
+        esperados = Counter(m for i in ids for m in catalogo.centros[i].materiales)
+        assert almacen.conteo_materiales(ids) == dict(esperados)
+        assert all(almacen.materiales_de(i) == catalogo.centros[i].materiales for i in ids[:50])
+
+
+def test_restaurado_de_arreglos_pagina_igual(catalogo):
+    almacen = catalogo.almacen
+    restaurado = AlmacenCentros.desde_arreglos(almacen.a_arreglos(), almacen.tabla)
+    for ids in filtros(len(almacen)):
+        for columna in ("nombre", "horario"):
+            assert restaurado.pagina_de(ids, 1, orden_por=columna).equals(almacen.pagina_de(ids, 1, orden_por=columna))
@@ -0,0 +1,109 @@
+# Búsqueda de texto tolerante a errores
+import random
+
+import numpy as np
+import pytest
+
+from benchmarks.datos_sinteticos import crear_catalogo
+from reciclaje.busqueda import IndiceTexto, errores_permitidos, palabras
+from reciclaje.modelos import CentroReciclaje
+
+CENTROS = [
+    CentroReciclaje(nombre="Centro de Acopio Norte", ubicacion="Polanco", materiales="Pet, Vidrio"),
+    CentroReciclaje(nombre="Recicladora Coyoacán", ubicacion="Coyoacán", materiales="Papel"),
+    CentroReciclaje(nombre="Punto Limpio", ubicacion="Centro", materiales="Pet"),
+    CentroReciclaje(nombre="Eco-Punto Polanco 2", ubicacion="Polanco", materiales="Vidrio"),
+    CentroReciclaje(nombre="Planta Central", ubicacion="Roma", materiales="Pet, Papel"),
+]
+
+
+@pytest.fixture(scope="module")
+def indice():
+    return IndiceTexto(CENTROS)
+
+
+def nombres(indice, texto, permitidos=None):
+    ids, _ = indice.buscar(texto, permitidos)
+    return [CENTROS[i].nombre for i in ids]
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("cntro", "Centro de Acopio Norte"),       # Falta una letra
+    ("polnco", "Eco-Punto Polanco 2"),
+    ("centtro", "Centro de Acopio Norte"),     # Sobra una letra
+    ("recicladorra", "Recicladora Coyoacán"),
+    ("cetnro", "Centro de Acopio Norte"),      # Dos letras intercambiadas
+    ("coyoacn", "Recicladora Coyoacán"),
+    ("coyoacan", "Recicladora Coyoacán"),      # Solo el acento
+    ("COYOACÁN", "Recicladora Coyoacán"),
+])
+def test_errores_de_escritura(indice, texto, esperado):
+    assert esperado in nombres(indice, texto)
+
+
+def test_sin_coincidencias(indice):
+    assert nombres(indice, "xochimilco") == []
+    # Palabras cortas y números no admiten errores
+    assert nombres(indice, "rma") == [] and nombres(indice, "3") == []
+
+
+def test_orden_por_puntaje(indice):
+    # Exacto en la ubicación > exacto en el nombre > prefijo > con un error
+    assert nombres(indice, "centro") == ["Punto Limpio", "Centro de Acopio Norte", "Planta Central"]
+    assert nombres(indice, "polanco")[:2] == ["Centro de Acopio Norte", "Eco-Punto Polanco 2"]
+    # Todas las palabras tienen que coincidir
+    assert nombres(indice, "punto polanco") == ["Eco-Punto Polanco 2"]
+
+
+def test_combina_con_la_mascara_de_materiales(indice):
+    con_vidrio = np.array(["vidrio" in c.materiales for c in CENTROS])
+    assert nombres(indice, "polanco", con_vidrio) == ["Centro de Acopio Norte", "Eco-Punto Polanco 2"]
+    assert nombres(indice, "cntro", con_vidrio) == ["Centro de Acopio Norte"]
+    assert nombres(indice, "centro", np.zeros(len(CENTROS), dtype=bool)) == []
+
+
+def distancias(a: str, b: str) -> list:
+    """Distancia de edición (con intercambios de letras vecinas) de `a` a cada inicio de `b`, con la tabla completa."""
+    d = [[i + j if i * j == 0 else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[len(a)]
+
+
+def coincide(termino: str, palabra: str) -> bool:
+    if palabra.startswith(termino):
+        return True
+    maximo = errores_permitidos(termino)
+    if maximo == 0 or len(palabra) < len(termino) - maximo:
+        return False
+    return min(distancias(termino, palabra)[len(termino) - maximo:len(termino) + maximo + 1]) <= maximo
+
+
+def con_error(palabra: str, rng: random.Random) -> str:
+    i = rng.randrange(len(palabra) - 1)
+    cambio = rng.choice(["quitar", "agregar", "intercambiar", "cambiar"])
+    if cambio == "quitar":
+        return palabra[:i] + palabra[i + 1:]
+    if cambio == "agregar":
+        return palabra[:i] + rng.choice("aeiourst") + palabra[i:]
+    if cambio == "intercambiar":
+        return palabra[:i] + palabra[i + 1] + palabra[i] + palabra[i + 2:]
+    return palabra[:i] + rng.choice("aeiourst") + palabra[i + 1:]
+
+
+def test_igual_que_comparar_contra_todas_las_palabras():
+    catalogo = crear_catalogo(300, 1)
+    indice = catalogo.indice_texto
+    palabras_centro = [palabras(c.nombre) + palabras(c.ubicacion) for c in catalogo.centros]
+    rng = random.Random(4)
+    vocabulario = sorted({p for ps in palabras_centro for p in ps if len(p) >= 4 and not p.isdigit()})
+    todas = sorted({p for ps in palabras_centro for p in ps})
+    for _ in range(200):
+        terminos = [con_error(rng.choice(vocabulario), rng) for _ in range(rng.randint(1, 2))]
+        coinciden = [{p for p in todas if coincide(t, p)} for t in palabras(" ".join(terminos))]
+        esperados = [i for i, ps in enumerate(palabras_centro) if all(c.intersection(ps) for c in coinciden)]
+        ids, _ = indice.buscar(" ".join(terminos))
+        assert sorted(ids.tolist()) == esperados, terminos
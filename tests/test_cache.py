@@ -0,0 +1,99 @@
+# Caché LRU de resultados: acotada por memoria, expulsa lo menos reciente y no sirve datos viejos
+import random
+
+import numpy as np
+import pytest
+from google.cloud.firestore import SERVER_TIMESTAMP
+
+from benchmarks.datos_sinteticos import crear_catalogo, crear_cliente_local, selecciones_aleatorias
+from reciclaje.cache import CacheLRU, normalizar_seleccion, tamano_aproximado
+from reciclaje.escritura import escribir_lote
+from reciclaje.motor import Recomendador
+from reciclaje.sincronizacion import SincronizadorCatalogo
+
+
+def valor_de(clave: int) -> np.ndarray:
+    return np.full(100 + 37 * (clave % 11), clave, dtype=np.uint8)
+
+
+def esperadas(recientes, presupuesto):
+    """Sin simular la caché: quedan las claves más recientes mientras quepan (sin las que no caben solas)."""
+    quedan, total = set(), 0
+    for clave in reversed([c for c in recientes if tamano_aproximado(valor_de(c)) <= presupuesto]):
+        total += tamano_aproximado(valor_de(clave))
+        if total > presupuesto:
+            break
+        quedan.add(clave)
+    return quedan
+
+
+@pytest.mark.parametrize("presupuesto", [300, 1500, 4000])
+def test_igual_que_quedarse_con_lo_mas_reciente_que_cabe(presupuesto):
+    rng = random.Random(presupuesto)
+    cache = CacheLRU(presupuesto)
+    recientes = []  # Claves distintas, de la usada hace más tiempo a la última
+    for _ in range(2000):
+        clave, calculados = rng.randrange(30), []
+        guardada = clave in esperadas(recientes, presupuesto)
+        valor = cache.obtener(clave, lambda: calculados.append(clave) or valor_de(clave))
+        recientes = [c for c in recientes if c != clave] + [clave]
+        assert np.array_equal(valor, valor_de(clave))
+        assert bool(calculados) != guardada  # Solo se calcula lo que no estaba
+        assert set(cache._entradas) == esperadas(recientes, presupuesto)
+        assert cache.bytes_usados == sum(tamano for _, tamano in cache._entradas.values()) <= presupuesto
+    estadisticas = cache.estadisticas()
+    assert estadisticas["aciertos"] + estadisticas["fallos"] == 2000
+
+
+def test_un_valor_mas_grande_que_el_presupuesto_no_se_guarda():
+    cache = CacheLRU(1000)
+    cache.obtener("chico", lambda: np.zeros(10))
+    grande = cache.obtener("grande", lambda: np.zeros(1000))
+    assert len(grande) == 1000 and not grande.flags.writeable
+    assert list(cache._entradas) == ["chico"]
+
+
+def test_resultados_iguales_con_y_sin_cache_entre_versiones():
+    # Dos versiones del catálogo con la misma caché: las claves llevan la versión
+    cache = CacheLRU()
+    for version, semilla in enumerate([1, 2, 1, 3]):
+        catalogo = crear_catalogo(1000, 20, semilla=semilla)
+        catalogo.version = version
+        con_cache, sin_cache = Recomendador(catalogo, cache), Recomendador(catalogo)
+        for seleccion in selecciones_aleatorias(20, semilla=version):
+            # El mismo material escrito distinto comparte la entrada
+            for variante in (seleccion, [m.upper() for m in reversed(seleccion)]):
+                ids = con_cache.filter_ids_by_materials(variante)
+                assert ids.tolist() == sin_cache.filter_ids_by_materials(seleccion).tolist()
+                assert not ids.flags.writeable
+                assert con_cache.conteos_materiales(variante) == sin_cache.conteos_materiales(seleccion)
+                assert con_cache.get_conclusiones_por_materiales(variante) == \
+                    sin_cache.get_conclusiones_por_materiales(seleccion)
+    assert cache.aciertos > 0
+
+
+def test_el_sincronizador_invalida_al_publicar():
+    db = crear_cliente_local(200, 10)
+    sincronizador = SincronizadorCatalogo(db)
+    sincronizador.arrancar()
+    cache = CacheLRU()
+    sincronizador.suscribir(cache.invalidar)
+    antes = Recomendador(sincronizador.catalogo, cache).filter_ids_by_materials(["Pet"])
+    assert len(cache) == 1
+
+    escribir_lote(db, "centros_reciclaje", [("nuevo", {"nombre": "Nuevo", "lat": 19.4, "lon": -99.1,
+                                                      "materiales": "Pet", "horario": "24 horas"})],
+                  marca_tiempo=SERVER_TIMESTAMP)
+    assert sincronizador.sincronizar() is True
+    assert len(cache) == 0 and cache.estadisticas()["invalidaciones"] == 1
+    despues = Recomendador(sincronizador.catalogo, cache).filter_ids_by_materials(["Pet"])
+    assert len(despues) == len(antes) + 1
+    # Sin cambios no se publica versión nueva ni se vacía la caché
+    assert sincronizador.sincronizar() is False
+    assert len(cache) == 1
+
+
+def test_normalizar_seleccion():
+    assert normalizar_seleccion(["Vidrio", "pet", "Pet"]) == normalizar_seleccion(["PET", "vidrio"])
+    assert normalizar_seleccion(["PET", "vidrio"]) == ("pet", "vidrio")
+    assert normalizar_seleccion([]) == ()
@@ -0,0 +1,100 @@
+# Cobertura de la selección con varios centros: mismo resultado que el voraz directo sobre los centros
+import random
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from benchmarks.datos_sinteticos import MATERIALES, crear_catalogo, posicion_aleatoria
+from reciclaje.catalogo import Catalogo
+from reciclaje.espacial import haversine_km
+from reciclaje.modelos import CentroReciclaje
+from reciclaje.motor import Recomendador
+
+MUCHOS_MATERIALES = [f"material {j}" for j in range(70)]  # No caben en una máscara de 64 bits
+
+
+def catalogo_de(materiales, semilla):
+    rng = random.Random(semilla)
+    centros = list(crear_catalogo(1500, 1, semilla=semilla).centros)
+    if materiales is MUCHOS_MATERIALES:
+        for c in centros:
+            c.materiales = rng.sample(materiales, rng.randint(1, 6))
+    # Al final, centros sin ningún material (quedan fuera de las máscaras)
+    centros += [CentroReciclaje(nombre=f"Vacío {i}", lat=19.4, lon=-99.1) for i in range(20)]
+    return Catalogo(centros, [])
+
+
+def voraz(centros, seleccion, ids, distancias=None):
+    """El voraz sin máscaras: cada vez el que acepta más de lo que falta (empate: el más cercano o el primero)."""
+    faltan = {m.lower() for m in seleccion}
+    elegidos = []
+    while True:
+        ganancia = [len(faltan.intersection(centros[i].materiales)) for i in ids]
+        if not ganancia or max(ganancia) == 0:
+            break
+        empatados = [p for p, g in enumerate(ganancia) if g == max(ganancia)]
+        mejor = min(empatados, key=lambda p: (distancias[p] if distancias is not None else 0, p))
+        elegidos.append(int(ids[mejor]))
+        faltan -= set(centros[ids[mejor]].materiales)
+    return elegidos, sorted(faltan)
+
+
+def consultas(catalogo, materiales, semilla):
+    rng = random.Random(semilla)
+    n = len(catalogo.centros)
+    filtros = [None, np.arange(n), np.array(rng.sample(range(n), 200)), np.array(rng.sample(range(n), 5)),
+               np.arange(n - 30, n), np.empty(0, dtype=np.int64)]
+    for _ in range(40):
+        seleccion = [m.capitalize() for m in rng.sample(materiales, rng.randint(1, 14))]
+        if rng.random() < 0.2:
+            seleccion.append("Material que nadie acepta")
+        ubicacion = posicion_aleatoria(rng) if rng.random() < 0.5 else (None, None)
+        yield seleccion, rng.choice(filtros), ubicacion
+
+
+@pytest.mark.parametrize("materiales", [MATERIALES, MUCHOS_MATERIALES], ids=["mascaras_del_indice", "mas_de_64"])
+def test_igual_que_el_voraz_directo(materiales):
+    catalogo = catalogo_de(materiales, 5)
+    recomendador = Recomendador(catalogo)
+    almacen = catalogo.almacen
+    for seleccion, filtro, (lat, lon) in consultas(catalogo, materiales, 6):
+        ids = np.arange(len(catalogo.centros)) if filtro is None else filtro
+        distancias = None if lat is None else haversine_km(lat, lon, almacen.lat[ids], almacen.lon[ids])
+        elegidos, sin_cubrir = recomendador.cubrir_materiales(seleccion, filtro, lat, lon)
+        assert (elegidos.tolist(), sin_cubrir) == voraz(catalogo.centros, seleccion, ids, distancias)
+        # Lo que queda sin cubrir es justo lo que ningún centro del filtro acepta
+        aceptados = {m for i in ids for m in catalogo.centros[i].materiales}
+        assert set(sin_cubrir) == {m.lower() for m in seleccion} - aceptados
+
+
+def minimo_de_centros(catalogo, seleccion, ids):
+    """Cobertura mínima por fuerza bruta sobre los conjuntos distintos de materiales pedidos."""
+    buscados = {m.lower() for m in seleccion}
+    conjuntos = {frozenset(buscados.intersection(catalogo.centros[i].materiales)) for i in ids} - {frozenset()}
+    cubribles = frozenset().union(*conjuntos)
+    for k in range(len(conjuntos) + 1):
+        if any(frozenset().union(*grupo) == cubribles for grupo in combinations(conjuntos, k)):
+            return k
+
+
+def test_cerca_del_minimo_de_centros():
+    catalogo = crear_catalogo(400, 1, semilla=9)
+    recomendador = Recomendador(catalogo)
+    rng = random.Random(10)
+    for _ in range(30):
+        seleccion = rng.sample(MATERIALES, rng.randint(2, 6))
+        ids = np.array(sorted(rng.sample(range(400), 60)))
+        elegidos, _ = recomendador.cubrir_materiales(seleccion, ids)
+        cota = sum(1 / j for j in range(1, len(seleccion) + 1))  # H(k)
+        assert len(elegidos) <= cota * minimo_de_centros(catalogo, seleccion, ids)
+
+
+def test_entre_iguales_elige_el_mas_cercano():
+    centros = [CentroReciclaje(nombre=f"Centro {i}", lat=19.0 + i, lon=-99.0, materiales="Pet, Vidrio")
+               for i in range(5)] + [CentroReciclaje(nombre="Solo papel", lat=19.0, lon=-99.0, materiales="Papel")]
+    recomendador = Recomendador(Catalogo(centros, []))
+    assert recomendador.cubrir_materiales(["Pet", "Vidrio"])[0].tolist() == [0]
+    assert recomendador.cubrir_materiales(["Pet", "Vidrio"], lat=22.9, lon=-99.0)[0].tolist() == [4]
+    elegidos, sin_cubrir = recomendador.cubrir_materiales(["Pet", "Papel", "Cartón"], lat=22.9, lon=-99.0)
+    assert elegidos.tolist() == [4, 5] and sin_cubrir == ["cartón"]
@@ -0,0 +1,112 @@
+# Catálogo compartido entre procesos: publicar, adjuntar y tomar el relevo
+import sys
+import time
+
+import numpy as np
+import pytest
+from google.cloud.firestore import SERVER_TIMESTAMP
+
+from benchmarks.datos_sinteticos import crear_cliente_local
+from reciclaje.compartido import CatalogoCompartido, SegmentoCompartido
+from reciclaje.escritura import escribir_lote
+from reciclaje.sincronizacion import SincronizadorCatalogo
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="Usa candados de archivo de POSIX (fcntl)")
+
+
+def fuente(db, directorio) -> CatalogoCompartido:
+    """Lo que arma cada proceso; en un mismo proceso, cada archivo abierto tiene su propio candado."""
+    return CatalogoCompartido(SegmentoCompartido(str(directorio)),
+                              lambda segmento, version: SincronizadorCatalogo(db, instantanea=segmento,
+                                                                              version_inicial=version),
+                              intervalo_s=0.05)
+
+
+def publicar(publicador: CatalogoCompartido):
+    publicador._sincronizador._guardar_pendiente()  # Lo hace el hilo de sincronización
+
+
+def soltar_candado(publicador: CatalogoCompartido):
+    """Como si el proceso que publica terminara."""
+    publicador.detener()
+    publicador.segmento._candado.close()
+
+
+def resultados(catalogo):
+    vista = catalogo.vista_conclusiones
+    return ([c.nombre for c in catalogo.centros], catalogo.indice_materiales.ids_con_materiales(["pet", "vidrio"]),
+            catalogo.indice_espacial.k_cercanos(19.43, -99.13, 10)[0].tolist(),
+            catalogo.indice_horarios.ids_abiertos(5 * 1440 + 600, np.arange(len(catalogo.centros))).tolist(),
+            catalogo.indice_texto.buscar("polanco")[0].tolist(),
+            [vista.conclusiones_de(i) for i in range(len(vista))], catalogo.almacen.tabla["nombre"].tolist())
+
+
+def test_un_lector_ve_lo_mismo_que_el_publicador(tmp_path):
+    db = crear_cliente_local(300, 20)
+    publicador, lector = fuente(db, tmp_path), fuente(db, tmp_path)
+    publicador.arrancar()
+    publicar(publicador)
+    assert publicador.publica
+
+    catalogo = lector.arrancar(espera_s=1)
+    assert not lector.publica
+    assert catalogo.version == lector.segmento.generacion() == 1
+    assert resultados(catalogo) == resultados(publicador.catalogo)
+    soltar_candado(publicador)
+
+
+def test_cada_version_nueva_llega_a_los_lectores(tmp_path):
+    db = crear_cliente_local(100, 5)
+    publicador, lector = fuente(db, tmp_path), fuente(db, tmp_path)
+    publicador.arrancar()
+    publicar(publicador)
+    lector.arrancar(espera_s=1)
+    recibidos = []
+    lector.suscribir(recibidos.append)
+
+    escribir_lote(db, "centros_reciclaje", [("nuevo", {"nombre": "Nuevo", "lat": 19.4, "lon": -99.1,
+                                                      "materiales": "Pet", "horario": "24 horas"})],
+                  marca_tiempo=SERVER_TIMESTAMP)
+    assert publicador._sincronizador.sincronizar() is True
+    publicar(publicador)
+    assert lector._adjuntar_vigente() is True
+    assert [c.version for c in recibidos] == [2]
+    assert "Nuevo" in [c.nombre for c in lector.catalogo.centros]
+    assert lector._adjuntar_vigente() is False  # Misma generación: no cambia nada
+    soltar_candado(publicador)
+
+
+def test_el_relevo_sigue_publicando_con_versiones_crecientes(tmp_path):
+    db = crear_cliente_local(100, 5)
+    publicador, lector = fuente(db, tmp_path), fuente(db, tmp_path)
+    publicador.arrancar()
+    publicar(publicador)
+    for _ in range(3):  # Varias generaciones: la del lector ya no coincide con la versión 1
+        escribir_lote(db, "reglas", [("regla_extra", {"condicion1": "material:pet", "conclusion": str(time.time())})],
+                      marca_tiempo=SERVER_TIMESTAMP)
+        publicador._sincronizador.sincronizar()
+        publicar(publicador)
+    versiones = [lector.arrancar(espera_s=1).version]
+    lector.suscribir(lambda catalogo: versiones.append(catalogo.version))
+    lector.iniciar_en_segundo_plano()
+
+    soltar_candado(publicador)
+    limite = time.monotonic() + 10
+    while not lector.publica and time.monotonic() < limite:
+        time.sleep(0.05)
+    assert lector.publica
+    # El relevo arranca desde la generación 4 que tenía adjuntada: su primera versión es la 5, no la 1
+    assert versiones[:2] == [4, 5]
+    assert all(a < b for a, b in zip(versiones, versiones[1:]))
+    # Lo que publica el relevo es una generación más que también ven los demás
+    lector._sincronizador.detener()
+    lector._sincronizador._hilo.join()
+    escribir_lote(db, "centros_reciclaje", [("otro", {"nombre": "Otro", "lat": 19.4, "lon": -99.1})],
+                  marca_tiempo=SERVER_TIMESTAMP)
+    antes = lector.catalogo.version
+    assert lector._sincronizador.sincronizar() is True
+    assert lector.catalogo.version == antes + 1
+    publicar(lector)
+    tercero = fuente(db, tmp_path)
+    assert tercero.arrancar(espera_s=1).version == lector.segmento.generacion()
+    lector.detener()
@@ -0,0 +1,131 @@
+# Vista de conclusiones derivada de la versión anterior: igual que recalcularla completa
+import random
+
+import pytest
+
+from benchmarks.datos_sinteticos import MATERIALES, crear_catalogo
+from reciclaje.catalogo import Catalogo
+from reciclaje.conclusiones import VistaConclusiones
+from reciclaje.modelos import CentroReciclaje, Regla
+
+
+def fuerza_bruta(catalogo):
+    """El motor lógico original: todas las reglas contra todos los centros."""
+    return [[r.conclusiones for r in catalogo.reglas if r.checar_condiciones(c)] for c in catalogo.centros]
+
+
+def conclusiones(vista):
+    return [vista.conclusiones_de(i) for i in range(len(vista))]
+
+
+def copia_editada(centro, rng):
+    """Un objeto NUEVO para el centro (como hace el sincronizador con un documento que cambió)."""
+    materiales = ", ".join(rng.sample(MATERIALES, rng.randint(1, 4)))
+    return CentroReciclaje(nombre=centro.nombre, lat=centro.lat, lon=centro.lon, horario=centro.horario,
+                           materiales=materiales, ubicacion=centro.ubicacion)
+
+
+def regla_aleatoria(rng, i):
+    return Regla(f"material:{rng.choice(MATERIALES[:6])};horario:{rng.choice(['sábado', 'lunes', '24 horas'])}",
+                 f"Regla nueva {i}")
+
+
+def siguiente_ronda(centros, reglas, rng, ronda):
+    """Ediciones, bajas y altas de centros y reglas; lo que no cambia sigue siendo el mismo objeto."""
+    centros, reglas = list(centros), list(reglas)
+    for _ in range(rng.randint(0, 15)):
+        i = rng.randrange(len(centros))
+        centros[i] = copia_editada(centros[i], rng)
+    for _ in range(rng.randint(0, 10)):
+        del centros[rng.randrange(len(centros))]
+    for _ in range(rng.randint(0, 10)):
+        centros.insert(rng.randrange(len(centros) + 1), copia_editada(rng.choice(centros), rng))
+    if rng.random() < 0.7:
+        for _ in range(rng.randint(0, 2)):
+            del reglas[rng.randrange(len(reglas))]
+        for _ in range(rng.randint(0, 3)):
+            # Insertar en medio corre las posiciones de las reglas que siguen
+            reglas.insert(rng.randrange(len(reglas) + 1), regla_aleatoria(rng, ronda))
+        if reglas and rng.random() < 0.5:
+            i = rng.randrange(len(reglas))
+            reglas[i] = Regla(";".join(f"{k}:{v}" for k, v in reglas[i].condiciones_list), reglas[i].conclusiones)
+    return centros, reglas
+
+
+@pytest.mark.parametrize("semilla", [1, 2, 3])
+def test_derivar_igual_que_construir(semilla):
+    rng = random.Random(semilla)
+    catalogo = crear_catalogo(1500, 40, semilla=semilla)
+    assert conclusiones(catalogo.vista_conclusiones) == fuerza_bruta(catalogo)
+
+    for ronda in range(12):
+        centros, reglas = siguiente_ronda(catalogo.centros, catalogo.reglas, rng, ronda)
+        nuevo = Catalogo(centros, reglas, version=catalogo.version + 1, anterior=catalogo)
+        completa = VistaConclusiones.construir(nuevo.centros, nuevo.reglas, nuevo.indice_reglas)
+        assert conclusiones(nuevo.vista_conclusiones) == conclusiones(completa) == fuerza_bruta(nuevo)
+        catalogo = nuevo
+
+
+def test_sin_cambios_reutiliza_las_conclusiones():
+    catalogo = crear_catalogo(500, 20)
+    vista = catalogo.vista_conclusiones
+    nuevo = Catalogo(list(catalogo.centros), list(catalogo.reglas), version=1, anterior=catalogo)
+    assert conclusiones(nuevo.vista_conclusiones) == conclusiones(vista)
+    # Sin reglas nuevas ni centros cambiados se reutilizan las mismas tuplas
+    assert all(a is b for a, b in zip(nuevo.vista_conclusiones._disparadas, vista._disparadas))
+
+
+def test_derivar_desde_una_vista_restaurada():
+    # La vista restaurada de disco/memoria compartida está en CSR, no en tuplas
+    catalogo = crear_catalogo(800, 30)
+    vista = catalogo.vista_conclusiones
+    restaurada = VistaConclusiones.desde_arreglos(vista.a_arreglos(), catalogo.centros, catalogo.reglas)
+    restaurado = Catalogo(catalogo.centros, catalogo.reglas, indices={"vista_conclusiones": restaurada})
+
+    centros, reglas = siguiente_ronda(catalogo.centros, catalogo.reglas, random.Random(9), 0)
+    reglas = reglas + [Regla("material:pet", "Regla nueva al final")]
+    nuevo = Catalogo(centros, reglas, version=1, anterior=restaurado)
+    assert conclusiones(nuevo.vista_conclusiones) == fuerza_bruta(nuevo)
+
+
+def test_reglas_reordenadas():
+    catalogo = crear_catalogo(800, 30)
+    catalogo.vista_conclusiones  # La versión siguiente la deriva de esta
+    nuevo = Catalogo(catalogo.centros, catalogo.reglas[::-1], version=1, anterior=catalogo)
+    assert conclusiones(nuevo.vista_conclusiones) == fuerza_bruta(nuevo)
+
+
+class CentrosPerezosos:
+    """Como los centros sobre un archivo: un objeto nuevo en cada acceso."""
+
+    def __init__(self, centros):
+        self._centros = centros
+
+    def __len__(self):
+        return len(self._centros)
+
+    def __getitem__(self, idx):
+        c = self._centros[idx]
+        return CentroReciclaje(nombre=c.nombre, lat=c.lat, lon=c.lon, horario=c.horario,
+                               materiales=list(c.materiales), ubicacion=c.ubicacion)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+@pytest.mark.parametrize("perezosa", ["anterior", "nueva"])
+def test_sin_listas_de_objetos_se_recalcula_todo(monkeypatch, perezosa):
+    catalogo = crear_catalogo(500, 20)
+    centros, reglas = siguiente_ronda(catalogo.centros, catalogo.reglas, random.Random(3), 0)
+    if perezosa == "anterior":
+        catalogo = Catalogo(CentrosPerezosos(catalogo.centros), catalogo.reglas)
+    else:
+        centros = CentrosPerezosos(centros)
+    catalogo.vista_conclusiones
+    construidas = []
+    construir = VistaConclusiones.construir.__func__
+    monkeypatch.setattr(VistaConclusiones, "construir",
+                        classmethod(lambda cls, *args: construidas.append(1) or construir(cls, *args)))
+    nuevo = Catalogo(centros, reglas, version=1, anterior=catalogo)
+    assert conclusiones(nuevo.vista_conclusiones) == fuerza_bruta(nuevo)
+    assert construidas == [1]
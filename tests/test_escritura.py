@@ -0,0 +1,56 @@
+# Escritura en lotes con reintentos, contra el cliente de Firestore local
+import pytest
+
+from reciclaje.escritura import TAM_LOTE, escribir_en_lotes, escribir_lote
+from reciclaje.firestore_local import ClienteFirestoreLocal, ServiceUnavailable
+
+
+def documentos(n: int, con_id: bool = True):
+    return [(f"d{i:05d}" if con_id else None, {"n": i}) for i in range(n)]
+
+
+def contar(db, coleccion: str) -> int:
+    return len(list(db.collection(coleccion).stream()))
+
+
+def test_divide_en_lotes_del_maximo_de_firestore():
+    db = ClienteFirestoreLocal()
+    informe = escribir_en_lotes(db, "c", documentos(2 * TAM_LOTE + 7), hilos=2)
+    assert (informe.documentos, informe.lotes, informe.reintentos) == (2 * TAM_LOTE + 7, 3, 0)
+    assert db.lotes == 3
+    assert contar(db, "c") == 2 * TAM_LOTE + 7
+
+
+def test_lote_local_rechaza_mas_de_500_escrituras():
+    db = ClienteFirestoreLocal()
+    with pytest.raises(ValueError):
+        escribir_lote(db, "c", documentos(TAM_LOTE + 1))
+
+
+def test_reintenta_errores_transitorios():
+    db = ClienteFirestoreLocal(fallas_transitorias=2)
+    informe = escribir_en_lotes(db, "c", documentos(10), espera_inicial_s=0)
+    assert informe.reintentos == 2
+    assert contar(db, "c") == 10
+
+
+def test_agota_los_reintentos_y_lanza_el_error():
+    db = ClienteFirestoreLocal(fallas_transitorias=3)
+    with pytest.raises(ServiceUnavailable):
+        escribir_lote(db, "c", documentos(5), intentos=3, espera_inicial_s=0)
+    assert contar(db, "c") == 0
+
+
+@pytest.mark.parametrize("con_id", [True, False])
+def test_reintento_de_un_lote_ya_aplicado_no_duplica(con_id):
+    # El servidor aplica el lote pero responde con error: el reintento reescribe los mismos documentos
+    db = ClienteFirestoreLocal(fallas_tras_aplicar=1)
+    informe = escribir_en_lotes(db, "c", documentos(20, con_id=con_id), espera_inicial_s=0)
+    assert informe.reintentos == 1
+    assert contar(db, "c") == 20
+
+
+def test_marca_tiempo_en_updated_at():
+    db = ClienteFirestoreLocal()
+    escribir_lote(db, "c", [("a", {"n": 1})], marca_tiempo="ahora")
+    assert db.collection("c").document("a").get().to_dict() == {"n": 1, "updated_at": "ahora"}
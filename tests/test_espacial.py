@@ -0,0 +1,57 @@
+# Índice espacial: mismo resultado que calcular la distancia a todos los centros
+import random
+
+import numpy as np
+import pytest
+
+from benchmarks.datos_sinteticos import crear_catalogo, posicion_aleatoria
+from reciclaje.espacial import haversine_km
+
+
+@pytest.fixture(scope="module")
+def catalogo():
+    return crear_catalogo(3000, 5)
+
+
+def consultas(cantidad: int = 40, semilla: int = 11):
+    rng = random.Random(semilla)
+    # Casi todas cerca de alguna ciudad; algunas en medio de la nada (obligan a expandir muchos anillos)
+    return [posicion_aleatoria(rng) for _ in range(cantidad)] + [(0.0, 0.0), (60.0, 100.0), (-33.9, 151.2)]
+
+
+def fuerza_bruta(indice, lat, lon, permitidos=None):
+    ids = np.arange(len(indice)) if permitidos is None else np.flatnonzero(permitidos)
+    distancias = haversine_km(lat, lon, indice.lats[ids], indice.lons[ids])
+    orden = np.argsort(distancias, kind='stable')
+    return ids[orden], distancias[orden]
+
+
+def mascaras(n: int):
+    rng = np.random.default_rng(5)
+    return [None, rng.random(n) < 0.3, rng.random(n) < 0.002, np.zeros(n, dtype=bool)]
+
+
+@pytest.mark.parametrize("k", [1, 5, 50])
+def test_k_cercanos_igual_que_fuerza_bruta(catalogo, k):
+    indice = catalogo.indice_espacial
+    for permitidos in mascaras(len(indice)):
+        for lat, lon in consultas():
+            ids, distancias = indice.k_cercanos(lat, lon, k, permitidos)
+            _, esperadas = fuerza_bruta(indice, lat, lon, permitidos)
+            # Los empates pueden salir en otro orden: se comparan las distancias
+            np.testing.assert_allclose(distancias, esperadas[:k])
+            np.testing.assert_allclose(haversine_km(lat, lon, indice.lats[ids], indice.lons[ids]), distancias)
+            if permitidos is not None:
+                assert permitidos[ids].all()
+
+
+@pytest.mark.parametrize("radio_km", [0.5, 5.0, 40.0])
+def test_en_radio_igual_que_fuerza_bruta(catalogo, radio_km):
+    indice = catalogo.indice_espacial
+    for permitidos in mascaras(len(indice)):
+        for lat, lon in consultas():
+            ids, distancias = indice.en_radio(lat, lon, radio_km, permitidos)
+            esperados, esperadas = fuerza_bruta(indice, lat, lon, permitidos)
+            dentro = esperadas <= radio_km
+            assert sorted(ids.tolist()) == sorted(esperados[dentro].tolist())
+            np.testing.assert_allclose(distancias, esperadas[dentro])
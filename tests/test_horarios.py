@@ -0,0 +1,67 @@
+# Interpretación de horarios en texto libre
+import pytest
+
+from benchmarks.datos_sinteticos import crear_catalogo
+from reciclaje.horarios import DIAS, MINUTOS_DIA, cumple_condicion_horario, minuto_de_semana, parsear_horario
+
+
+def dia(inicio: str, fin: str, d: int = 0):
+    """Intervalo (inicio, fin) del día `d`, con horas "hh:mm"; un fin menor que el inicio es del día siguiente."""
+    a = minuto_de_semana(d, *map(int, inicio.split(":")))
+    b = minuto_de_semana(d, *map(int, fin.split(":")))
+    return a, b if b > a else b + MINUTOS_DIA
+
+
+@pytest.mark.parametrize("texto, lunes", [
+    ("L a V de 8 a 5", dia("8:00", "17:00")),
+    ("9 a 6", dia("9:00", "18:00")),
+    ("9 a 6 pm", dia("9:00", "18:00")),
+    ("1 a 5 pm", dia("13:00", "17:00")),
+    ("12 a 4", dia("12:00", "16:00")),
+    ("Lunes a Viernes 9:00-18:00, Sábado 9:00-13:00", dia("9:00", "18:00")),
+])
+def test_rangos_de_dia(texto, lunes):
+    assert parsear_horario(texto)[0] == lunes
+
+
+@pytest.mark.parametrize("texto", ["22 a 6", "22:00 a 06:00", "10 pm a 6 am"])
+def test_rangos_nocturnos_cruzan_la_medianoche(texto):
+    intervalos = parsear_horario(texto)
+    assert dia("22:00", "6:00") in intervalos
+    assert (0, 6 * 60) in intervalos  # Domingo en la noche -> lunes en la madrugada
+
+
+def test_dias_de_la_semana():
+    intervalos = parsear_horario("L a V de 8 a 5, sábado 9 a 2")
+    assert intervalos == tuple(dia("8:00", "17:00", d) for d in range(5)) + (dia("9:00", "14:00", 5),)
+
+
+def test_24_horas_y_desconocido():
+    assert parsear_horario("24 horas") == ((0, 7 * MINUTOS_DIA),)
+    assert parsear_horario("Llamar antes de venir") is None
+
+
+HORARIOS_EXTRA = ["Lunes a Viernes 24 horas", "Sábado y Domingo 24 horas", "Abierto 24 horas",
+                  "Lunes a Viernes 9:00-18:00, Sábado cerrado", "Llamar antes: martes o jueves"]
+
+
+def test_reglas_de_horario_igual_o_mas_que_buscar_el_texto():
+    horarios = {c.horario for c in crear_catalogo(2000, 1).centros} | set(HORARIOS_EXTRA)
+    for horario in horarios:
+        # "24 horas" sigue siendo lo mismo que buscar el texto
+        assert cumple_condicion_horario("24 horas", horario) == ("24 horas" in horario.lower()), horario
+        for dia in DIAS:
+            antes = dia in horario.lower()
+            if antes and "cerrado" not in horario.lower():
+                assert cumple_condicion_horario(dia, horario), (dia, horario)
+            elif not antes and cumple_condicion_horario(dia, horario):
+                # Solo se agregan los días que quedan dentro de un rango ("Lunes a Viernes" -> martes)
+                assert " a " in horario.lower() or "24 horas" in horario.lower(), (dia, horario)
+
+
+def test_dia_cerrado_y_abreviaturas():
+    assert not cumple_condicion_horario("sábado", "Lunes a Viernes 9:00-18:00, Sábado cerrado")
+    # Las abreviaturas en la regla se buscan como texto, igual que antes
+    assert not cumple_condicion_horario("mar", "Lunes a Viernes 9:00-18:00")
+    assert cumple_condicion_horario("mar", "Martes 9:00-18:00")
+    assert not cumple_condicion_horario("24 horas", "Lunes a Viernes 9:00-18:00")
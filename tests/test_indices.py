@@ -0,0 +1,71 @@
+# Índice de materiales: mismo resultado que el filtro lineal original
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from benchmarks.datos_sinteticos import crear_catalogo, selecciones_aleatorias
+from reciclaje import indices
+from reciclaje.indices import IndiceMateriales
+from reciclaje.motor import Recomendador
+
+
+@pytest.fixture(scope="module")
+def catalogo():
+    return crear_catalogo(3000, 10)
+
+
+def filtro_lineal(centros, seleccion):
+    """El filtro de antes del índice: recorre todos los centros en orden."""
+    buscados = [m.lower() for m in seleccion]
+    return [i for i, c in enumerate(centros) if all(m in c.materiales for m in buscados)]
+
+
+def test_filtro_igual_que_el_lineal(catalogo):
+    recomendador = Recomendador(catalogo)
+    for seleccion in selecciones_aleatorias(200, max_materiales=4):
+        esperados = filtro_lineal(catalogo.centros, seleccion)
+        assert recomendador.filter_ids_by_materials(seleccion).tolist() == esperados
+        assert catalogo.indice_materiales.arreglo_con_materiales(seleccion).tolist() == esperados
+        assert recomendador.filter_by_materials(seleccion) == [catalogo.centros[i] for i in esperados]
+
+
+@pytest.mark.parametrize("seleccion", [["PET", "pet"], ["Pet", "Material que nadie acepta"], []])
+def test_mayusculas_repetidos_y_desconocidos(catalogo, seleccion):
+    recomendador = Recomendador(catalogo)
+    esperados = filtro_lineal(catalogo.centros, seleccion)
+    assert recomendador.filter_ids_by_materials(seleccion).tolist() == esperados
+    assert np.issubdtype(recomendador.filter_ids_by_materials(seleccion).dtype, np.integer)
+
+
+def conteos_lineales(centros, seleccion):
+    """Por material, cuántos centros aceptan la selección más ese material (sin los ceros)."""
+    buscados = {m.lower() for m in seleccion}
+    return dict(Counter(m for c in centros if buscados <= set(c.materiales) for m in set(c.materiales)))
+
+
+@pytest.mark.parametrize("camino", ["and", "centros", "sin_contador"])
+def test_conteos_exactos_por_los_dos_caminos(monkeypatch, catalogo, camino):
+    # El costo del AND decide el camino: gratis -> siempre AND de bitmaps; carísimo -> siempre sobre los centros
+    monkeypatch.setattr(indices, "NS_POR_PALABRA_AND", 0 if camino == "and" else 10 ** 9)
+    contar_centros = None if camino == "sin_contador" else catalogo.almacen.conteo_materiales
+    indice = IndiceMateriales(catalogo.centros)  # Índice nuevo: los conteos se memorizan por índice
+    llamadas = []
+
+    def contar(ids):
+        llamadas.append(len(ids))
+        return contar_centros(ids)
+
+    for seleccion in selecciones_aleatorias(100, max_materiales=4) + [["Pet", "Material que nadie acepta"]]:
+        # Como en la multiselect: los materiales se agregan uno por uno (usa los conteos de la selección anterior)
+        for n in range(len(seleccion) + 1):
+            parcial = seleccion[:n]
+            assert indice.conteos_con(parcial, contar if contar_centros else None) == \
+                conteos_lineales(catalogo.centros, parcial)
+    assert bool(llamadas) == (camino == "centros")
+
+
+def test_conteos_del_recomendador(catalogo):
+    recomendador = Recomendador(catalogo)
+    for seleccion in selecciones_aleatorias(30, semilla=8):
+        assert recomendador.conteos_materiales(seleccion) == conteos_lineales(catalogo.centros, seleccion)
@@ -0,0 +1,73 @@
+# Instantánea en disco: ida y vuelta, versiones y publicación atómica
+import os
+import threading
+from datetime import datetime, timezone
+
+from benchmarks.datos_sinteticos import crear_catalogo
+from reciclaje.instantanea import VERSIONES_CONSERVADAS, Instantanea
+
+CURSORES = {"centros_reciclaje": datetime(2024, 5, 1, tzinfo=timezone.utc), "reglas": None}
+
+
+def guardar(instantanea: Instantanea, catalogo):
+    instantanea.guardar(catalogo, [f"c{i}" for i in range(len(catalogo.centros))],
+                        [f"r{i}" for i in range(len(catalogo.reglas))], CURSORES)
+
+
+def test_ida_y_vuelta(tmp_path):
+    catalogo = crear_catalogo(200, 20)
+    instantanea = Instantanea(str(tmp_path / "inst"))
+    assert instantanea.cargar() is None
+    guardar(instantanea, catalogo)
+
+    datos = instantanea.cargar()
+    assert [c.nombre for c in datos.catalogo.centros] == [c.nombre for c in catalogo.centros]
+    assert datos.ids_centros[:2] == ["c0", "c1"]
+    assert datos.cursores == CURSORES
+    assert datos.catalogo.indice_materiales.bitmaps() == catalogo.indice_materiales.bitmaps()
+    assert [r.conclusiones for r in datos.catalogo.reglas] == [r.conclusiones for r in catalogo.reglas]
+
+
+def test_conserva_solo_las_ultimas_versiones(tmp_path):
+    catalogo = crear_catalogo(20, 2)
+    instantanea = Instantanea(str(tmp_path))
+    for _ in range(5):
+        guardar(instantanea, catalogo)
+    versiones = [nombre for nombre in os.listdir(tmp_path) if nombre.startswith("v-")]
+    assert len(versiones) == VERSIONES_CONSERVADAS
+    assert os.path.basename(instantanea.version_vigente()) == max(versiones)
+
+
+def test_quien_carga_durante_un_guardado_siempre_encuentra_una_version(tmp_path):
+    pequeno, grande = crear_catalogo(50, 5), crear_catalogo(2000, 5)
+    instantanea = Instantanea(str(tmp_path))
+    guardar(instantanea, pequeno)
+    terminado = threading.Event()
+    fallas = []
+
+    def leer():
+        while not terminado.is_set():
+            try:
+                datos = Instantanea(str(tmp_path)).cargar()
+            except Exception as e:
+                fallas.append(repr(e))
+                continue
+            if datos is None:
+                fallas.append("sin instantánea")
+            elif len(datos.catalogo.centros) != len(datos.ids_centros):
+                fallas.append("versiones mezcladas")
+
+    lectores = [threading.Thread(target=leer) for _ in range(2)]
+    for hilo in lectores:
+        hilo.start()
+    # Dos "procesos" guardando en el mismo directorio a la vez
+    escritores = [threading.Thread(target=lambda c=c: [guardar(Instantanea(str(tmp_path)), c) for _ in range(5)])
+                  for c in (pequeno, grande)]
+    for hilo in escritores:
+        hilo.start()
+    for hilo in escritores:
+        hilo.join()
+    terminado.set()
+    for hilo in lectores:
+        hilo.join()
+    assert fallas == []
@@ -0,0 +1,34 @@
+# Presupuesto de memoria por sesión
+import pytest
+
+from reciclaje.memoria import PRESUPUESTO_SESION_MB, PresupuestoSesion
+
+
+@pytest.mark.parametrize("presupuesto, modo", [("abc", "avisar"), ("nan", "expulsar"), ("-1", "borrar")])
+def test_entorno_invalido_usa_los_valores_por_defecto(monkeypatch, presupuesto, modo):
+    monkeypatch.setenv("RECICLAJE_PRESUPUESTO_SESION_MB", presupuesto)
+    monkeypatch.setenv("RECICLAJE_MODO_PRESUPUESTO", modo)
+    resumen = PresupuestoSesion.desde_entorno().resumen()
+    assert resumen["presupuesto_mb"] == PRESUPUESTO_SESION_MB
+    assert resumen["modo"] == (modo if modo != "borrar" else "avisar")
+
+
+def test_entorno_valido(monkeypatch):
+    monkeypatch.setenv("RECICLAJE_PRESUPUESTO_SESION_MB", "0.5")
+    monkeypatch.setenv("RECICLAJE_MODO_PRESUPUESTO", "expulsar")
+    assert PresupuestoSesion.desde_entorno().resumen()["presupuesto_mb"] == 0.5
+
+
+def test_expulsa_lo_mas_grande_sin_tocar_las_protegidas():
+    presupuesto = PresupuestoSesion(presupuesto_mb=0.3, modo="expulsar")
+    estado = {"grande": "x" * 200_000, "mediano": "y" * 50_000, "widget": "z" * 200_000}
+    tamanos = presupuesto.revisar("sesion", estado, protegidas={"widget"})
+    assert set(estado) == {"mediano", "widget"} == set(tamanos)
+    assert presupuesto.resumen()["sesiones"] == 1
+
+
+def test_avisar_no_borra_nada():
+    presupuesto = PresupuestoSesion(presupuesto_mb=0.1)
+    estado = {"grande": "x" * 200_000}
+    presupuesto.revisar("sesion", estado)
+    assert set(estado) == {"grande"}
@@ -0,0 +1,66 @@
+# Índice de reglas por condición ancla: mismo resultado que revisar todas las reglas
+import random
+
+import pytest
+
+from benchmarks.datos_sinteticos import COLONIAS, HORARIOS, MATERIALES, crear_catalogo
+from reciclaje.indices import IndiceReglas
+from reciclaje.modelos import CentroReciclaje, Regla
+from reciclaje.motor import Recomendador
+
+# Formas de regla que no salen del generador sintético
+REGLAS_EXTRA = [
+    Regla("prioridad:alta", "Sin condiciones reconocidas: aplica a todos"),
+    Regla("", "Sin condiciones"),
+    Regla("material:pet;material:vidrio", "Material repetido"),
+    Regla("Ubicacion: Roma ;MATERIAL:Pet", "Mayúsculas y espacios"),
+    Regla("ubicacion:roma;ubicacion:condesa", "Dos ubicaciones: nunca se cumple"),
+    Regla("horario:sábado;material:material que nadie acepta", "Material desconocido"),
+    Regla("horario:9:00", "Texto del horario"),
+    Regla("horario:viernes;ubicacion:centro", "Ubicación con horario"),
+    Regla("color:verde;horario:24 horas", "Condición desconocida y horario"),
+]
+
+
+def fuerza_bruta(reglas, centro):
+    """El motor lógico original: todas las reglas contra el centro."""
+    return [r.conclusiones for r in reglas if r.checar_condiciones(centro)]
+
+
+def centros_extra(rng, cantidad):
+    """Centros con ubicaciones y horarios que no genera el catálogo sintético."""
+    horarios = HORARIOS + ["No disponible", "Viernes 9:00-13:00", "sábado y domingo 24 horas"]
+    return [CentroReciclaje(nombre=f"Extra {i}", horario=rng.choice(horarios),
+                            materiales=", ".join(rng.sample(MATERIALES[:8], rng.randint(0, 4))),
+                            ubicacion=rng.choice(COLONIAS + ["ROMA", "Desconocida"]))
+            for i in range(cantidad)]
+
+
+@pytest.mark.parametrize("semilla", [1, 2])
+def test_conclusiones_igual_que_revisar_todas_las_reglas(semilla):
+    catalogo = crear_catalogo(2000, 200, semilla=semilla)
+    reglas = list(catalogo.reglas)
+    rng = random.Random(semilla)
+    for regla in REGLAS_EXTRA:
+        reglas.insert(rng.randrange(len(reglas) + 1), regla)
+    indice = IndiceReglas(reglas)
+    for centro in catalogo.centros + centros_extra(rng, 300):
+        esperadas = fuerza_bruta(reglas, centro)
+        assert indice.conclusiones_para(centro) == esperadas
+        # Las candidatas pueden sobrar, nunca faltar
+        candidatas = indice.reglas_candidatas(centro)
+        assert candidatas == sorted(set(candidatas))
+        assert {i for i, r in enumerate(reglas) if r.checar_condiciones(centro)} <= set(candidatas)
+
+
+def test_sin_reglas():
+    indice = IndiceReglas([])
+    assert indice.conclusiones_para(CentroReciclaje(nombre="Solo", materiales="Pet")) == []
+
+
+def test_motor_logico_del_recomendador():
+    catalogo = crear_catalogo(1000, 100)
+    recomendador = Recomendador(catalogo)
+    esperados = {c.nombre: conclusiones for c in catalogo.centros
+                 if (conclusiones := fuerza_bruta(catalogo.reglas, c))}
+    assert recomendador.aplicar_motor_logico(catalogo.centros) == esperados
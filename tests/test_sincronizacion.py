@@ -0,0 +1,118 @@
+# Sincronización incremental contra el cliente de Firestore local
+from google.cloud.firestore import SERVER_TIMESTAMP
+
+from benchmarks.datos_sinteticos import crear_cliente_local
+from reciclaje.escritura import escribir_lote
+from reciclaje.instantanea import Instantanea
+from reciclaje.sincronizacion import SincronizadorCatalogo
+
+
+def test_releer_los_empatados_con_el_cursor_no_es_un_cambio(tmp_path):
+    # Las reglas sintéticas comparten 'updated_at' (como un lote con SERVER_TIMESTAMP): todas empatan con el cursor
+    db = crear_cliente_local(100, 10)
+    primero = SincronizadorCatalogo(db, instantanea=Instantanea(str(tmp_path)))
+    primero.arrancar()
+    primero._guardar_pendiente()
+
+    restaurado = SincronizadorCatalogo(db, instantanea=Instantanea(str(tmp_path)))
+    catalogo = restaurado.arrancar()
+    assert restaurado._pendiente_guardar is None
+    assert restaurado.sincronizar(reconciliar=True) is False
+    assert restaurado.catalogo is catalogo and restaurado._pendiente_guardar is None
+
+
+def test_un_lote_con_marca_del_servidor_se_aplica_una_sola_vez(tmp_path):
+    db = crear_cliente_local(100, 10)
+    sincronizador = SincronizadorCatalogo(db, instantanea=Instantanea(str(tmp_path)))
+    sincronizador.arrancar()
+    version = sincronizador.catalogo.version
+
+    escribir_lote(db, "centros_reciclaje", [(f"nuevo{i}", {"nombre": f"Nuevo {i}", "lat": 19.4, "lon": -99.1,
+                                                          "materiales": "Pet", "horario": "9 a 6", "ubicacion": "Roma"})
+                                            for i in range(3)], marca_tiempo=SERVER_TIMESTAMP)
+    assert sincronizador.sincronizar() is True
+    assert sincronizador.catalogo.version == version + 1
+    assert len(sincronizador.catalogo.centros) == 103
+    # El siguiente ciclo relee el lote (empata con el cursor) sin publicar otra versión
+    assert sincronizador.sincronizar() is False
+    assert sincronizador.catalogo.version == version + 1
+
+
+def resumen(catalogo):
+    """Lo que importa del catálogo para comparar dos versiones (centros, reglas y conclusiones)."""
+    centros = [(c.nombre, c.lat, c.lon, c.horario, c.ubicacion, c.materiales) for c in catalogo.centros]
+    reglas = [(r.condiciones_list, r.conclusiones) for r in catalogo.reglas]
+    vista = catalogo.vista_conclusiones
+    return centros, reglas, [vista.conclusiones_de(i) for i in range(len(vista))]
+
+
+def centro(nombre: str, materiales: str = "Pet, Vidrio") -> dict:
+    return {"nombre": nombre, "lat": 19.4, "lon": -99.1, "materiales": materiales, "horario": "9 a 6",
+            "ubicacion": "Roma"}
+
+
+def test_carga_completa_en_orden_de_id():
+    db = crear_cliente_local(50, 5)
+    catalogo = SincronizadorCatalogo(db).carga_completa()
+    esperados = sorted(doc.id for doc in db.collection("centros_reciclaje").stream())
+    assert [c.nombre for c in catalogo.centros] == \
+        [db.collection("centros_reciclaje").document(i).get().to_dict()["nombre"] for i in esperados]
+    assert len(catalogo.reglas) == 5
+
+
+def test_cambios_llegan_por_el_cursor_leyendo_solo_lo_nuevo():
+    db = crear_cliente_local(200, 5)
+    sincronizador = SincronizadorCatalogo(db)
+    sincronizador.carga_completa()
+    cursor = sincronizador._centros.cursor
+
+    escribir_lote(db, "centros_reciclaje", [("centro0000007", centro("Editado")), ("nuevo", centro("Nuevo"))],
+                  marca_tiempo=SERVER_TIMESTAMP)
+    lecturas = db.lecturas
+    assert sincronizador.sincronizar(reconciliar=False) is True
+    # Los dos escritos, el último centro (empata con el cursor anterior) y las reglas (todas empatan)
+    assert db.lecturas - lecturas == 2 + 1 + 5
+    assert sincronizador._centros.cursor > cursor
+    nombres = [c.nombre for c in sincronizador.catalogo.centros]
+    assert "Editado" in nombres and "Nuevo" in nombres and len(nombres) == 201
+
+
+def test_bajas_y_documentos_sin_marca_llegan_por_la_reconciliacion():
+    db = crear_cliente_local(30, 5)
+    sincronizador = SincronizadorCatalogo(db)
+    sincronizador.carga_completa()
+    db.collection("centros_reciclaje").document("centro0000003").delete()
+    db.collection("reglas").document("regla000001").delete()
+    db.collection("centros_reciclaje").document("sin_marca").set(centro("Sin marca"))
+
+    assert sincronizador.sincronizar(reconciliar=False) is False  # La consulta por cursor no ve nada de esto
+    assert sincronizador.sincronizar(reconciliar=True) is True
+    assert len(sincronizador.catalogo.centros) == 30 and len(sincronizador.catalogo.reglas) == 4
+    assert "Sin marca" in [c.nombre for c in sincronizador.catalogo.centros]
+    assert "centro0000003" not in sincronizador._centros.ids_ordenados()
+
+
+def test_varias_rondas_incrementales_igual_que_una_carga_completa():
+    db = crear_cliente_local(300, 30)
+    sincronizador = SincronizadorCatalogo(db)
+    sincronizador.carga_completa()
+    sincronizador.catalogo.vista_conclusiones  # Las siguientes versiones la derivan de esta
+
+    rondas = [
+        [("centros_reciclaje", "centro0000010", centro("Cambia materiales", "Aluminio, Papel"))],
+        [("reglas", "regla000002", {"condicion1": "material:aluminio", "conclusion": "Regla editada"}),
+         ("reglas", "regla_nueva", {"condicion1": "material:pet", "condicion2": "ubicacion:roma",
+                                    "conclusion": "Regla nueva"})],
+        [("centros_reciclaje", f"centro{i:07d}", None) for i in range(20, 40)]
+        + [("centros_reciclaje", f"extra{i}", centro(f"Extra {i}", "Pet")) for i in range(10)],
+        [("reglas", "regla000005", None), ("centros_reciclaje", "centro0000011", centro("Otro", "Vidrio"))],
+    ]
+    for ronda in rondas:
+        for coleccion, doc_id, datos in ronda:
+            referencia = db.collection(coleccion).document(doc_id)
+            if datos is None:
+                referencia.delete()
+            else:
+                escribir_lote(db, coleccion, [(doc_id, datos)], marca_tiempo=SERVER_TIMESTAMP)
+        assert sincronizador.sincronizar(reconciliar=True) is True
+        assert resumen(sincronizador.catalogo) == resumen(SincronizadorCatalogo(db).carga_completa())